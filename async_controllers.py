@@ -0,0 +1,799 @@
+import asyncio
+import json
+import os
+import random
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+from yarl import URL
+
+from controllers import (
+    BaseProxyClient,
+    NeoClient,
+    _build_export_payload,
+    _merge_frames,
+    _paginate_frame,
+    _parse_campaign_html,
+    _parse_candidatures_last_page,
+    _parse_candidatures_page,
+    _read_export_stream,
+)
+from planner import plan_range
+
+
+# requests and aiohttp do not support the same content encodings: let aiohttp pick its own
+_TRANSPORT_HEADERS = {'accept-encoding', 'connection', 'content-length', 'host'}
+
+
+def _form_items(payload):
+    """Expand a requests-style payload (list values, None values) into form tuples"""
+    items = payload.items() if isinstance(payload, dict) else payload
+    form = []
+    for key, value in items:
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            form.extend((key, str(v)) for v in value)
+        else:
+            form.append((key, str(value)))
+    return form
+
+
+class AsyncResponse:
+    """Fully read aiohttp response exposing the bits of requests.Response the clients use"""
+    def __init__(self, status_code, url, headers, content, charset=None):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.charset = charset or 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.charset, errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _BlockingBody:
+    """
+    requests-like iter_content over a streamed aiohttp response, for the
+    export parsers running in a worker thread: each chunk is read on the
+    event loop while the thread waits for it.
+    """
+    def __init__(self, response, loop):
+        self.response = response
+        self.loop = loop
+
+    def iter_content(self, chunk_size=256 * 1024):
+        while True:
+            chunk = asyncio.run_coroutine_threadsafe(self.response.content.read(chunk_size), self.loop).result()
+            if not chunk:
+                return
+            yield chunk
+
+
+class AsyncTransport:
+    """
+    Shared aiohttp transport: one keep-alive connection pool per upstream host,
+    per-request timeouts and proxy rotation on connection failures.
+    """
+    def __init__(self, limit_per_host=None, keepalive_timeout=30, default_timeout=None):
+        self.limit_per_host = limit_per_host or int(os.getenv("ASYNC_LIMIT_PER_HOST", 10))
+        self.keepalive_timeout = keepalive_timeout
+        self.default_timeout = default_timeout or int(os.getenv("ASYNC_DEFAULT_TIMEOUT", 60))
+        self._connectors: Dict[str, aiohttp.TCPConnector] = {}
+
+    def connector_for(self, url: str) -> aiohttp.TCPConnector:
+        """Get (or lazily create) the connection pool for the host of url, on the running loop"""
+        host = urlparse(url).netloc
+        connector = self._connectors.get(host)
+        if connector is None or connector.closed or connector._loop is not asyncio.get_running_loop():
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                # The upstreams are called with verify=False by the sync clients too
+                ssl=False
+            )
+            self._connectors[host] = connector
+        return connector
+
+    def session_for(self, base_url: str) -> aiohttp.ClientSession:
+        """Create a client session (own cookie jar) on top of the host pool"""
+        return aiohttp.ClientSession(
+            connector=self.connector_for(base_url),
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(unsafe=True)
+        )
+
+    def _timeout(self, timeout, stream=False):
+        if stream:
+            # Exports can take minutes to download: bound the silences, not the total
+            return aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=timeout or self.default_timeout)
+        return aiohttp.ClientTimeout(total=timeout or self.default_timeout)
+
+    async def request(self, session, method, url, timeout=None, retry_count=1,
+                      data=None, **kwargs) -> AsyncResponse:
+        """Make a request and read the full body; retries go through a random proxy"""
+        if data is not None:
+            data = _form_items(data)
+
+        last_error = None
+        for attempt in range(retry_count):
+            proxy = None
+            if attempt > 0:
+                proxy = random.choice(BaseProxyClient.PROXY_LIST)
+                print(f"Attempt {attempt + 1} using proxy: {proxy.split('@')[1]}")
+            try:
+                async with session.request(method, url, data=data, timeout=self._timeout(timeout),
+                                           proxy=proxy, **kwargs) as response:
+                    content = await response.read()
+                    return AsyncResponse(
+                        response.status,
+                        str(response.url),
+                        response.headers,
+                        content,
+                        response.charset
+                    )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                last_error = e
+                if attempt < retry_count - 1:
+                    print(f"Request attempt {attempt + 1} failed: {str(e)}")
+                    print("Waiting before retry with new proxy...")
+                    await asyncio.sleep(5)
+                    continue
+        raise last_error
+
+    @asynccontextmanager
+    async def stream(self, session, method, url, timeout=None, data=None, **kwargs):
+        """Open a request whose body is read by the caller while it downloads"""
+        if data is not None:
+            data = _form_items(data)
+        async with session.request(method, url, data=data, timeout=self._timeout(timeout, stream=True),
+                                   **kwargs) as response:
+            yield response
+
+    async def close(self):
+        for connector in self._connectors.values():
+            await connector.close()
+        self._connectors = {}
+
+
+class AsyncClientBase:
+    """
+    Awaitable front of a sync client. The sync client stays the owner of the
+    state (cookies adopted from the shared session store, catalogs, stored
+    data): its cookies are sent with every request and the cookies the
+    upstream sets are written back to it, so both paths share one login.
+    """
+    def __init__(self, transport: AsyncTransport, client):
+        self.transport = transport
+        self.client = client
+        self._session = None
+
+    @property
+    def base_url(self):
+        return self.client.base_url
+
+    @property
+    def sync_session(self):
+        """The requests session holding the client's cookies and headers"""
+        return self.client.session
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed or self._session.connector is not self.transport.connector_for(self.base_url):
+            self._session = self.transport.session_for(self.base_url)
+        return self._session
+
+    def _prepare(self, url, headers):
+        """Headers of the sync session plus the call's own, and its current cookies for the host"""
+        host = urlparse(url).hostname
+        self.session.cookie_jar.update_cookies(
+            {cookie.name: cookie.value for cookie in self.sync_session.cookies
+             if not cookie.domain or host.endswith(cookie.domain.lstrip('.'))},
+            response_url=URL(url)
+        )
+        merged = {k: v for k, v in self.sync_session.headers.items() if k.lower() not in _TRANSPORT_HEADERS}
+        merged.update(headers or {})
+        return merged
+
+    def _keep_cookies(self, url):
+        """Write the cookies the upstream set back to the sync session"""
+        host = urlparse(url).hostname
+        jar = self.sync_session.cookies
+        for morsel in self.session.cookie_jar.filter_cookies(URL(url)).values():
+            current = [c for c in jar if c.name == morsel.key and host.endswith(c.domain.lstrip('.'))]
+            if any(c.value == morsel.value for c in current):
+                continue
+            for cookie in current:
+                jar.clear(cookie.domain, cookie.path, cookie.name)
+            jar.set(morsel.key, morsel.value, domain=host, path='/')
+
+    async def _request(self, method, url, headers=None, **kwargs) -> AsyncResponse:
+        headers = self._prepare(url, headers)
+        try:
+            return await self.transport.request(self.session, method, url, headers=headers, **kwargs)
+        finally:
+            self._keep_cookies(url)
+
+    @asynccontextmanager
+    async def _stream(self, method, url, headers=None, **kwargs):
+        headers = self._prepare(url, headers)
+        try:
+            async with self.transport.stream(self.session, method, url, headers=headers, **kwargs) as response:
+                yield response
+        finally:
+            self._keep_cookies(url)
+
+    def get_cookie(self, name):
+        return self.sync_session.cookies.get(name)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Concurrent shard exports per upstream for the whole process, like the sync shard pools
+_shard_semaphores = {}  # upstream -> (loop, semaphore)
+
+
+def _shard_semaphore(upstream):
+    loop = asyncio.get_running_loop()
+    entry = _shard_semaphores.get(upstream)
+    if entry is None or entry[0] is not loop:
+        entry = _shard_semaphores[upstream] = (loop, asyncio.Semaphore(int(os.getenv("CRM_SHARD_WORKERS", 4))))
+    return entry[1]
+
+
+class AsyncCRMClient(AsyncClientBase):
+    """Awaitable equivalent of CRMClient, sharing its tenant, catalogs and record store"""
+    def __init__(self, transport: AsyncTransport, client, timeout=None):
+        super().__init__(transport, client)
+        self.tenant = client.tenant
+        self.timeout = timeout or int(os.getenv("CRM_EXPORT_TIMEOUT", 300))
+
+    async def login(self, username=None, password=None, account=None):
+        """Login to the CRM system, with the tenant's credentials by default"""
+        default_username, default_password = self.tenant.credentials()
+        payload = {
+            'username': username or default_username,
+            'account': account or self.tenant.account,
+            'password': password or default_password,
+            'poste': '',
+            'code': '',
+            'checkForTwoFactor': '0',
+            'language': 'fr'
+        }
+        try:
+            response = await self._request(
+                'POST', f"{self.base_url}/vvci/login/login_check", data=payload, timeout=30
+            )
+            if response.status_code == 200:
+                if self.tenant.check_dashboard and not await self.check_login():
+                    print(f"{self.tenant.name} login succeeded but dashboard check failed")
+                    return False
+                print(f"Successfully logged into CRM ({self.tenant.name})")
+                return True
+            print(f"Failed to login. Status code: {response.status_code}")
+            return False
+        except Exception as e:
+            print(f"Error during login: {str(e)}")
+            return False
+
+    async def check_login(self):
+        """Check the session is still authenticated: the dashboard does not redirect to the login page"""
+        try:
+            response = await self._request('GET', f"{self.base_url}/vvci/dashboard", timeout=30)
+            return response.status_code == 200 and 'login' not in response.url
+        except Exception as e:
+            print(f"Error checking {self.tenant.name} login status: {str(e)}")
+            return False
+
+    async def fetch_campaigns(self, start_date, end_date):
+        """Get available campaigns for the given date range from prodFilterDate"""
+        url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/prodFilterDate"
+        try:
+            response = await self._request('POST', url, data={'start': start_date, 'end': end_date}, timeout=30)
+            if response.status_code == 200:
+                return await asyncio.to_thread(_parse_campaign_html, response.text)
+            print(f"Failed to get campaigns. Status code: {response.status_code}")
+            return None
+        except Exception as e:
+            print(f"Error getting campaigns: {str(e)}")
+            return None
+
+    async def get_campaigns(self, start_date=None, end_date=None):
+        """Get available campaigns for the given date range, from the sync client's day-bucketed catalog"""
+        if not start_date:
+            start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
+        if not end_date:
+            end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
+        catalog = self.client.campaign_catalog
+        campaigns = catalog.peek(start_date, end_date)
+        if campaigns is not None:
+            return campaigns
+        catalog.misses += 1
+        return catalog.put(start_date, end_date, await self.fetch_campaigns(*catalog.bucket(start_date, end_date)))
+
+    async def _export_frame(self, start_date, end_date, campaign_values):
+        """Export one range of the given campaigns as a DataFrame (None if the CSV cannot be decoded)"""
+        url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
+        payload = _build_export_payload(campaign_values, start_date, end_date, form_model=self.tenant.form_model)
+
+        async with self._stream('POST', url, data=payload, timeout=self.timeout) as response:
+            if response.status != 200:
+                raise Exception(f"Failed to get data. Status code: {response.status}")
+            # Parsed in a thread as the body downloads, raw CSV text like the sync exports
+            body = _BlockingBody(response, asyncio.get_running_loop())
+            return await asyncio.to_thread(_read_export_stream, body, self.base_url, str)
+
+    async def _export_shard(self, start_date, end_date, campaign_values):
+        """Export one shard, retrying it on its own (CRM_SHARD_RETRIES times, with backoff)"""
+        retries = int(os.getenv("CRM_SHARD_RETRIES", 2))
+        for attempt in range(retries + 1):
+            try:
+                async with _shard_semaphore(self.tenant.upstream):
+                    df = await self._export_frame(start_date, end_date, campaign_values)
+                if df is None:
+                    raise Exception("Failed to decode CSV data with any known encoding")
+                return df
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"Shard {start_date} to {end_date} failed ({str(e)}), retry {attempt + 1}/{retries}")
+                await asyncio.sleep(2 ** attempt)
+
+    async def get_export_frame(self, start_date=None, end_date=None, on_shard=None, allow_empty=False):
+        """
+        CRMClient.get_export_frame with every shard export in flight at once
+        (up to CRM_SHARD_WORKERS per upstream) on the event loop.
+        on_shard(start, end, frame) runs in a thread.
+        """
+        try:
+            if not start_date:
+                start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
+            if not end_date:
+                end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
+
+            campaigns = await self.get_campaigns(start_date, end_date)
+            if not campaigns:
+                return {"error": "Failed to get campaigns"}
+            campaign_values = [c['value'] for c in campaigns.get(self.tenant.campaign_group, [])]
+
+            shards = plan_range(start_date, end_date)
+            if len(shards) == 1:
+                df = await self._export_frame(start_date, end_date, campaign_values)
+                if df is None or (df.empty and not allow_empty):
+                    return {"error": "Failed to decode CSV data with any known encoding"}
+                if on_shard is not None:
+                    await asyncio.to_thread(on_shard, *shards[0], df)
+                return {"success": True, "frame": df}
+
+            results = await asyncio.gather(
+                *(self._export_shard(*shard, campaign_values) for shard in shards), return_exceptions=True
+            )
+            frames, failed_shards = [], []
+            # Keep the shards in range order so the merged frame matches a single export
+            for shard, result in zip(shards, results):
+                if isinstance(result, BaseException):
+                    if not isinstance(result, Exception):
+                        raise result
+                    print(f"Shard {shard[0]} to {shard[1]} failed: {str(result)}")
+                    failed_shards.append({"start": shard[0], "end": shard[1], "error": str(result)})
+                    continue
+                frames.append(result)
+                if on_shard is not None:
+                    await asyncio.to_thread(on_shard, *shard, result)
+
+            if len(failed_shards) == len(shards):
+                return {"error": f"All {len(shards)} shards failed: {failed_shards[0]['error']}"}
+
+            df = await asyncio.to_thread(_merge_frames, frames)
+            if df.empty and not failed_shards and not allow_empty:
+                return {"error": "No data exported for the range"}
+
+            print(f"Exported {len(shards)} shards ({len(failed_shards)} failed): {len(df)} rows")
+            result = {"success": True, "frame": df, "shards": len(shards)}
+            if failed_shards:
+                result["failed_shards"] = failed_shards
+            return result
+
+        except Exception as e:
+            print("Error", e)
+            import traceback
+            traceback.print_exc()
+            return {"error": f"Error getting data: {str(e)}"}
+
+    async def get_history_frame(self, start_date=None, end_date=None):
+        """CRMClient.get_history_frame: sealed days from the record store, the rest exported"""
+        client = self.client
+        if client.record_store is None:
+            return await self.get_export_frame(start_date, end_date)
+
+        segments = await asyncio.to_thread(client._history_segments, start_date, end_date)
+        if all(source == "crm" for source, _, _ in segments):
+            return await self.get_export_frame(start_date, end_date, on_shard=client._store_closed_day)
+
+        frames, failed_shards, stored_days = [], [], 0
+        for source, segment_start, segment_end in segments:
+            if source == "store":
+                frames.append(await asyncio.to_thread(client.record_store.read_day, segment_start[:10]))
+                stored_days += 1
+                continue
+            result = await self.get_export_frame(
+                segment_start, segment_end, on_shard=client._store_closed_day, allow_empty=True
+            )
+            if "error" in result:
+                failed_shards.append({"start": segment_start, "end": segment_end, "error": result["error"]})
+                continue
+            frames.append(result["frame"])
+            failed_shards.extend(result.get("failed_shards", []))
+
+        df = await asyncio.to_thread(_merge_frames, frames)
+
+        print(f"Served {stored_days} days from the record store, {len(segments) - stored_days} ranges from the CRM")
+        result = {"success": True, "frame": df, "stored_days": stored_days}
+        if failed_shards:
+            result["failed_shards"] = failed_shards
+        return result
+
+    async def get_data_as_json_full(self, start_date=None, end_date=None, page=1, page_size=1000):
+        """Get CRM data as JSON with pagination"""
+        result = await self.get_history_frame(start_date, end_date)
+        if "error" in result:
+            return result
+
+        try:
+            paginated = await asyncio.to_thread(_paginate_frame, result["frame"], page, page_size)
+            if "failed_shards" in result:
+                paginated["failed_shards"] = result["failed_shards"]
+            return paginated
+
+        except Exception as e:
+            print(f"Error during data conversion: {str(e)}")
+            return {"error": f"Error converting data: {str(e)}"}
+
+
+class AsyncERPClient(AsyncClientBase):
+    """Awaitable equivalent of ERPClient, refreshing the sync client's stored contracts"""
+    def __init__(self, transport: AsyncTransport, client, timeout=None):
+        super().__init__(transport, client)
+        self.timeout = timeout or int(os.getenv("ERP_EXPORT_TIMEOUT", 300))
+        self._refresh_lock = None
+
+    def _xsrf_headers(self):
+        csrf_token = self.get_cookie('XSRF-TOKEN')
+        return {'X-XSRF-TOKEN': unquote(csrf_token)} if csrf_token else {}
+
+    async def login(self, email, password):
+        """Login to the ERP system"""
+        try:
+            await self._request('GET', f"{self.base_url}/", timeout=30)
+
+            headers = {
+                **self._xsrf_headers(),
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Origin': self.base_url,
+                'Referer': f"{self.base_url}/login",
+                'X-Requested-With': 'XMLHttpRequest',
+                'Accept': 'application/json'
+            }
+            payload = {'email': email, 'password': password, 'remember': 'true'}
+            login_response = await self._request(
+                'POST', f"{self.base_url}/login", data=payload, headers=headers,
+                allow_redirects=False, timeout=30
+            )
+
+            if login_response.status_code in (301, 302):
+                redirect_url = login_response.headers.get('Location')
+                if redirect_url:
+                    if not redirect_url.startswith('http'):
+                        redirect_url = f"{self.base_url}{redirect_url}"
+                    await self._request('GET', redirect_url, timeout=30)
+
+            if await self.check_login():
+                print("Successfully logged into ERP")
+                return True
+            print("Login failed - cannot access dashboard")
+            return False
+
+        except Exception as e:
+            print(f"Error during ERP login: {str(e)}")
+            return False
+
+    async def check_login(self):
+        """Check the session is still authenticated: the dashboard does not redirect to the login page"""
+        try:
+            response = await self._request(
+                'GET', f"{self.base_url}/dashboard", timeout=30,
+                headers={'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'}
+            )
+            return response.status_code == 200 and 'login' not in response.url
+        except Exception as e:
+            print(f"Error checking ERP login status: {str(e)}")
+            return False
+
+    async def refresh_contracts(self, force_full_refresh=False):
+        """Refresh the sync client's stored_data with a full export or the contracts added since the last fetch"""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            try:
+                headers = self._xsrf_headers()
+                last_fetch_time = self.client.last_fetch_time
+
+                if last_fetch_time is None or force_full_refresh:
+                    print("Fetching full data...")
+                    response = await self._request(
+                        'GET', f"{self.base_url}/contracts/export", headers=headers, timeout=self.timeout
+                    )
+                    if response.status_code != 200:
+                        return {"error": f"Failed to get contracts. Status code: {response.status_code}"}
+                    # Parsing and the state update run in a thread, under the sync client's lock
+                    await asyncio.to_thread(self.client._store_full_export, response.content)
+                    return {"success": True, "type": "full_refresh"}
+
+                print(f"Fetching incremental data since {last_fetch_time}...")
+                params = {'start_date': last_fetch_time.strftime("%Y-%m-%d %H:%M:%S")}
+                response = await self._request(
+                    'GET', f"{self.base_url}/contracts", params=params, headers=headers, timeout=self.timeout
+                )
+                if response.status_code != 200:
+                    return {"error": f"Failed to get incremental data. Status code: {response.status_code}"}
+                try:
+                    new_records = await asyncio.to_thread(self.client._merge_new_contracts, response.json())
+                except Exception as e:
+                    print(f"Error processing incremental data: {e}")
+                    force_full_refresh = True
+                else:
+                    return {"success": True, "type": "incremental", "new_records": new_records}
+
+            except Exception as e:
+                print(f"Error getting contracts: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                return {"error": f"Error getting contracts: {str(e)}"}
+
+        # If there's an error with incremental update, fall back to full refresh
+        return await self.refresh_contracts(force_full_refresh=True)
+
+    async def get_contracts_as_json(self, force_full_refresh=False):
+        """Get ERP contracts data as JSON with incremental loading, including daily and weekly stats"""
+        result = await self.refresh_contracts(force_full_refresh)
+        if "error" in result:
+            return result
+        return await asyncio.to_thread(self.client.with_contracts, result)
+
+
+class AsyncJobsClient(AsyncClientBase):
+    """Awaitable candidatures crawler for mcdesk.moncallcenter.ma, on a JobsClient's mcdesk session"""
+    def __init__(self, transport: AsyncTransport, client, timeout=30, max_concurrent_pages=None):
+        super().__init__(transport, client)
+        self.timeout = timeout
+        self.max_concurrent_pages = max_concurrent_pages or int(os.getenv("MCDESK_CONCURRENT_PAGES", 4))
+
+    @property
+    def base_url(self):
+        return self.client.mcdesk_url
+
+    @property
+    def sync_session(self):
+        return self.client.mcdesk_client.session
+
+    async def login(self, username: str, password: str) -> bool:
+        """Login to mcdesk.moncallcenter.ma"""
+        try:
+            login_data = {"LOGIN_APP": username, "PASSWORD_APP": password}
+            await self._request(
+                'POST', f"{self.base_url}/components/session/loger.php",
+                data=login_data, timeout=self.timeout, retry_count=3
+            )
+            success = await self.check_login()
+            if success:
+                print(f"Successfully logged into mcdesk.moncallcenter.ma as {username}")
+            return success
+        except Exception as e:
+            print(f"Error logging into mcdesk: {str(e)}")
+            return False
+
+    async def check_login(self) -> bool:
+        """Check the candidatures page does not redirect to the login page"""
+        try:
+            response = await self._request('GET', f"{self.base_url}/candidatures/?", timeout=self.timeout, retry_count=3)
+            return response.status_code == 200 and 'login' not in response.url
+        except Exception as e:
+            print(f"Error checking mcdesk session: {str(e)}")
+            return False
+
+    async def get_candidatures(self, company: Optional[str] = None) -> List[dict]:
+        """Get candidatures listings, fetching up to max_concurrent_pages pages at a time"""
+        try:
+            cands_url = f"{self.base_url}/candidatures/?"
+            print(f"Fetching candidatures from: {cands_url}")
+            response = await self._request('GET', cands_url, timeout=self.timeout, retry_count=3)
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch candidatures: {response.status_code}")
+
+            soup = await asyncio.to_thread(BeautifulSoup, response.text, 'html.parser')
+            last_page = _parse_candidatures_last_page(soup)
+
+            semaphore = asyncio.Semaphore(self.max_concurrent_pages)
+
+            async def fetch_page(page):
+                async with semaphore:
+                    page_response = await self._request(
+                        'GET', f"{cands_url}page={page}", timeout=self.timeout, retry_count=3
+                    )
+                if page_response.status_code != 200:
+                    print(f"Failed to fetch page {page}. Skipping...")
+                    return None
+                return await asyncio.to_thread(BeautifulSoup, page_response.text, 'html.parser')
+
+            page_soups = [soup] + await asyncio.gather(
+                *(fetch_page(page) for page in range(2, last_page + 1))
+            )
+
+            candidates_details = await asyncio.to_thread(self._parse_pages, page_soups)
+            print(f"\nTotal candidates processed: {len(candidates_details)}")
+            return candidates_details
+
+        except Exception as e:
+            print(f"Error getting candidatures: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return []
+
+
+    def _parse_pages(self, page_soups):
+        """Parse in page order so ids and ordering match the sync crawler"""
+        candidates_details = []
+        for page, page_soup in enumerate(page_soups, start=1):
+            if page_soup is None:
+                continue
+            candidates_details.extend(
+                _parse_candidatures_page(page_soup, page, self.base_url, len(candidates_details))
+            )
+        return candidates_details
+
+
+class AsyncNeoClient(AsyncClientBase):
+    """Awaitable equivalent of NeoClient, sharing its session, CSRF token, credentials and MFA callback"""
+    def __init__(self, transport: AsyncTransport, client, timeout=60):
+        super().__init__(transport, client)
+        self.timeout = timeout
+
+    async def login(self, username, password):
+        """Login to Neoliane extranet (MFA code provided through the client's callback)"""
+        try:
+            self.client.username = username
+            self.client.password = password
+
+            await self._request('GET', f"{self.base_url}/connection", timeout=self.timeout)
+            self.client.csrf_token = self.get_cookie('csrf_extranet_cookie_name')
+            if not self.client.csrf_token:
+                print("Failed to get CSRF token")
+                return False
+
+            payload = {
+                'redirect': 'dashboard',
+                'csrf_extranet_token_name': self.client.csrf_token,
+                'lostpage': '',
+                'username': username,
+                'password': password,
+                'g-recaptcha-response': ''
+            }
+            response = await self._request(
+                'POST', f"{self.base_url}/connection", data=payload, timeout=self.timeout
+            )
+
+            if 'mfa' in response.url:
+                if not self.client.mfa_code_callback:
+                    print("MFA required but no callback configured")
+                    return False
+                email = re.search(r'email=([^&]+)', response.url).group(1)
+                who_is_email = re.search(r'whoIsEmail=([^&]+)', response.url).group(1)
+                mfa_payload = {
+                    'whoIsEmail': who_is_email,
+                    'email': email,
+                    'csrf_extranet_token_name': self.client.csrf_token
+                }
+                send_response = await self._request(
+                    'POST', f"{self.base_url}/connection/mfa/send", data=mfa_payload, timeout=self.timeout
+                )
+                if send_response.status_code != 200:
+                    print("Failed to trigger MFA email")
+                    return False
+                mfa_code = await self.client.mfa_code_callback()
+                if not mfa_code:
+                    return False
+                await self._request(
+                    'POST', response.url, data={**mfa_payload, 'code[]': mfa_code}, timeout=self.timeout
+                )
+
+            if await self.check_login():
+                print("Successfully logged into Neoliane")
+                return True
+            print("Login failed - cannot access dashboard")
+            return False
+
+        except Exception as e:
+            print(f"Error during Neoliane login: {e}")
+            return False
+
+    async def check_login(self):
+        """Check if current session is valid"""
+        try:
+            response = await self._request('GET', f"{self.base_url}/dashboard", timeout=self.timeout)
+            return response.status_code == 200 and 'connection' not in response.url
+        except Exception as e:
+            print(f"Error checking login status: {e}")
+            return False
+
+    async def get_contracts(self, start_date=None, end_date=None, page=1, limit=20):
+        """Get contracts data from Neoliane extranet"""
+        try:
+            if not await self.check_login():
+                print("Not logged in, attempting login...")
+                if not await self.login(self.client.username, self.client.password):
+                    return {"success": False, "error": "Failed to login"}
+
+            params = {
+                'page': page,
+                'limit': limit,
+                'csrf_extranet_token_name': self.client.csrf_token or self.get_cookie('csrf_extranet_cookie_name') or ''
+            }
+            if start_date:
+                params.update({
+                    'dateinsertstart': start_date,
+                    'datesignstart': start_date,
+                    'dateeffectstart': start_date
+                })
+            if end_date:
+                params.update({
+                    'dateinsertend': end_date,
+                    'datesignend': end_date,
+                    'dateeffectend': end_date
+                })
+
+            response = await self._request('GET', f"{self.base_url}/search", params=params, timeout=self.timeout)
+            if '/connection' in response.url:
+                return {"success": False, "error": "Session expired during search request"}
+
+            return await asyncio.to_thread(self._parse_contracts, response.text, limit)
+
+        except Exception as e:
+            print(f"Error getting contracts: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return {"success": False, "error": f"Error getting contracts: {str(e)}"}
+
+    @staticmethod
+    def _parse_contracts(html, limit):
+        soup = BeautifulSoup(html, 'html.parser')
+        table = soup.find('table', {'id': 'jsResultSearch'})
+        if not table:
+            return {"success": False, "error": "Could not find contracts table"}
+
+        contracts = []
+        for row in table.find_all('tr', attrs={'data-contract-id': True}):
+            try:
+                contract = NeoClient._parse_contract_row(row)
+                if contract:
+                    contracts.append(contract)
+            except Exception as row_error:
+                print(f"Error parsing row: {str(row_error)}")
+                continue
+
+        return {
+            "success": True,
+            "data": contracts,
+            "pagination": NeoClient._extract_pagination_info(soup, len(contracts), limit)
+        }
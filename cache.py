@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import pickle
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from records import RecordBatch
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Snapshots are pickled frames without pyarrow
+    pa = None
+    pq = None
+
+
+def _parse_date(value):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def estimate_size(value, sample=64):
+    """
+    Approximate memory footprint of a cached result without serializing it:
+    frames report their own usage, long lists are measured on a sample of
+    their items and scaled up.
+    """
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, RecordBatch):
+        return sum(estimate_size(column, sample) for column in value.values)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + estimate_size(v, sample) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        step = max(1, len(value) // sample)
+        picked = value[::step]
+        return sys.getsizeof(value) + sum(estimate_size(item, sample) for item in picked) * len(value) // len(picked)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU cache for CRM export results with an optional on-disk tier.
+
+    Keys are tuples starting with (endpoint, start_date, end_date, ...) as built
+    by dispatch.normalize_range. Ranges that ended before today are immutable in
+    practice and get a long TTL; ranges touching today get a short one.
+    """
+    def __init__(self, max_bytes=None, disk_dir=None, past_ttl=None, live_ttl=None):
+        self.max_bytes = max_bytes or int(os.getenv("CRM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        self.disk_dir = disk_dir or os.getenv("CRM_CACHE_DIR")
+        self.past_ttl = past_ttl or int(os.getenv("CRM_CACHE_PAST_TTL", 24 * 3600))
+        self.live_ttl = live_ttl or int(os.getenv("CRM_CACHE_LIVE_TTL", 60))
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, end_date: Optional[str]) -> int:
+        """Long TTL for ranges closed before today, short TTL for ranges touching now"""
+        end = _parse_date(end_date)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if end is not None and end < today:
+            return self.past_ttl
+        return self.live_ttl
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.pkl")
+
+    def _store_memory(self, key, expires_at, size, value):
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old:
+            self.bytes -= old[1]
+        self._entries[key] = (expires_at, size, value)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def peek(self, key):
+        """Value for key from the memory tier only (no IO, safe on the event loop), or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[2]
+                del self._entries[key]
+                self.bytes -= entry[1]
+        return None
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        value = self.peek(key)
+        if value is not None:
+            return value
+
+        now = time.time()
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                stored_key, expires_at, value = pickle.loads(data)
+                if stored_key == key and expires_at > now:
+                    with self._lock:
+                        self._store_memory(key, expires_at, estimate_size(value), value)
+                        self.disk_hits += 1
+                    return value
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error reading cache entry {path}: {str(e)}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, ttl: Optional[int] = None):
+        """Store a value; the TTL defaults to one derived from the key's end date"""
+        if ttl is None:
+            ttl = self.ttl_for(key[2] if len(key) > 2 else None)
+        expires_at = time.time() + ttl
+        size = estimate_size(value)
+
+        with self._lock:
+            self._store_memory(key, expires_at, size, value)
+
+        if self.disk_dir:
+            # Only the disk tier needs the pickled bytes
+            data = pickle.dumps((key, expires_at, value), protocol=pickle.HIGHEST_PROTOCOL)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"Error writing cache entry {path}: {str(e)}")
+
+    def _matches(self, key, endpoint, date):
+        if endpoint and key[0] != endpoint:
+            return False
+        if date:
+            # Drop every range that covers the given day
+            return key[1][:10] <= date[:10] <= key[2][:10]
+        return True
+
+    def invalidate(self, endpoint: Optional[str] = None, date: Optional[str] = None) -> int:
+        """Drop entries for an endpoint and/or ranges covering a date (all entries if neither is given)"""
+        removed = 0
+        with self._lock:
+            for key in [k for k in self._entries if self._matches(k, endpoint, date)]:
+                self.bytes -= self._entries.pop(key)[1]
+                removed += 1
+
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(self.disk_dir, name)
+                try:
+                    with open(path, 'rb') as f:
+                        stored_key = pickle.load(f)[0]
+                    if self._matches(stored_key, endpoint, date):
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    print(f"Error invalidating cache entry {path}: {str(e)}")
+
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def metrics(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "disk_tier": bool(self.disk_dir),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+class SnapshotStore:
+    """
+    Parsed export frames kept server-side behind a cursor token so the next
+    pages of a paginated endpoint are sliced from a local file instead of
+    re-exported. Snapshots live in a directory shared by all uvicorn workers
+    (a Parquet file, pickled without pyarrow, plus a JSON sidecar holding the
+    query key), so any worker can serve a cursor another one issued.
+    Snapshots expire after a TTL; the oldest ones are evicted past a byte budget.
+    Blocking: call it from a thread.
+    """
+    def __init__(self, root=None, max_bytes=None, ttl=None):
+        self.root = root or os.getenv("CRM_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "ringassur_cursors"))
+        self.max_bytes = max_bytes or int(os.getenv("CRM_SNAPSHOT_MAX_BYTES", 512 * 1024 * 1024))
+        self.ttl = ttl or int(os.getenv("CRM_SNAPSHOT_TTL", 600))
+        self.extension = "parquet" if pq is not None else "pkl"
+        os.makedirs(self.root, exist_ok=True)
+
+        # Metrics (this worker's)
+        self.created = 0
+        self.hits = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _paths(self, cursor):
+        """(frame path, sidecar path) of a cursor, None for a malformed token"""
+        if not cursor or not all(c.isalnum() or c in "-_" for c in cursor):
+            return None
+        return os.path.join(self.root, f"{cursor}.{self.extension}"), os.path.join(self.root, f"{cursor}.json")
+
+    def _remove(self, cursor):
+        for path in self._paths(cursor):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _snapshots(self):
+        """(mtime, cursor, frame bytes) of the stored snapshots, oldest first"""
+        snapshots = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            cursor = name[:-len(".json")]
+            try:
+                mtime = os.path.getmtime(os.path.join(self.root, name))
+                size = os.path.getsize(self._paths(cursor)[0])
+            except OSError:
+                continue  # Removed meanwhile
+            snapshots.append((mtime, cursor, size))
+        return sorted(snapshots)
+
+    def _sweep(self, keep):
+        """Drop expired snapshots, then the oldest ones while over the byte budget"""
+        now = time.time()
+        live = []
+        for mtime, cursor, size in self._snapshots():
+            if mtime + self.ttl <= now and cursor != keep:
+                self._remove(cursor)
+                self.expired += 1
+            else:
+                live.append((cursor, size))
+        total = sum(size for _, size in live)
+        for cursor, size in live:
+            # Never evict the snapshot we just created
+            if total <= self.max_bytes or cursor == keep:
+                continue
+            self._remove(cursor)
+            total -= size
+            self.evictions += 1
+
+    def create(self, key, frame) -> str:
+        """Store a parsed frame and return the cursor token for it"""
+        cursor = secrets.token_urlsafe(16)
+        frame_path, meta_path = self._paths(cursor)
+        tmp_path = f"{frame_path}.tmp"
+        if pq is not None:
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp_path)
+        else:
+            frame.to_pickle(tmp_path)
+        os.replace(tmp_path, frame_path)
+        # The sidecar is written last: a cursor exists once its frame is complete
+        with open(f"{meta_path}.tmp", 'w') as f:
+            json.dump({"key": list(key)}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        self.created += 1
+        self._sweep(keep=cursor)
+        return cursor
+
+    def get(self, cursor):
+        """(key, frame) for a live cursor, or None if unknown or expired"""
+        paths = self._paths(cursor)
+        if paths is None:
+            return None
+        frame_path, meta_path = paths
+        try:
+            if os.path.getmtime(meta_path) + self.ttl <= time.time():
+                self._remove(cursor)
+                self.expired += 1
+                return None
+            with open(meta_path, 'r') as f:
+                key = tuple(json.load(f)["key"])
+            if frame_path.endswith(".parquet"):
+                frame = pq.read_table(frame_path).to_pandas()
+            else:
+                frame = pd.read_pickle(frame_path)
+        except FileNotFoundError:
+            # Unknown, or evicted by another worker
+            return None
+        self.hits += 1
+        return key, frame
+
+    def metrics(self) -> dict:
+        snapshots = self._snapshots()
+        return {
+            "snapshots": len(snapshots),
+            "bytes": sum(size for _, _, size in snapshots),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "dir": self.root,
+            "created": self.created,
+            "hits": self.hits,
+            "expired": self.expired,
+            "evictions": self.evictions
+        }
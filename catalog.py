@@ -0,0 +1,273 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+def _day(value):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime("%Y-%m-%d")
+        except (AttributeError, ValueError):
+            continue
+    return None
+
+
+class CampaignCatalog:
+    """
+    Group -> campaigns mapping from prodFilterDate, cached per day bucket.
+
+    A range is widened to whole days (start day 00:00:00 to end day 23:59:59)
+    so every window of a day shares one lookup; the campaigns of a whole day
+    are a superset of those of any window inside it, which is what the export
+    payloads need. Buckets ending before today rarely change and keep a long
+    TTL, buckets touching today are refreshed in the background.
+    """
+    def __init__(self, fetch, past_ttl=None, live_ttl=None):
+        self.fetch = fetch
+        self.past_ttl = past_ttl or int(os.getenv("CAMPAIGN_CATALOG_PAST_TTL", 24 * 3600))
+        self.live_ttl = live_ttl or int(os.getenv("CAMPAIGN_CATALOG_LIVE_TTL", 900))
+        self._entries = {}  # bucket -> (expires_at, campaigns)
+        self._lock = threading.Lock()
+        self._bucket_locks = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def bucket(start_date, end_date):
+        """(start, end) of the whole days covering a range"""
+        start_day, end_day = _day(start_date), _day(end_date)
+        if start_day is None or end_day is None:
+            return start_date, end_date
+        return f"{start_day} 00:00:00", f"{end_day} 23:59:59"
+
+    def _ttl(self, bucket):
+        today = datetime.now().strftime("%Y-%m-%d")
+        return self.past_ttl if bucket[1][:10] < today else self.live_ttl
+
+    def _bucket_lock(self, bucket):
+        with self._lock:
+            return self._bucket_locks.setdefault(bucket, threading.Lock())
+
+    def refresh(self, start_date, end_date):
+        """
+        Fetch a bucket from the CRM and replace the cached mapping. Failures,
+        including an empty mapping parsed from a login or error page, keep the
+        old one.
+        """
+        return self.put(start_date, end_date, self.fetch(*self.bucket(start_date, end_date)))
+
+    def put(self, start_date, end_date, campaigns):
+        """Cache campaigns fetched for a range's bucket, or serve the previous ones if there are none"""
+        bucket = self.bucket(start_date, end_date)
+        if campaigns:
+            now = time.time()
+            with self._lock:
+                # Drop expired buckets so arbitrary report ranges do not pile up
+                for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    del self._entries[key]
+                    self._bucket_locks.pop(key, None)
+                self._entries[bucket] = (now + self._ttl(bucket), campaigns)
+                self.refreshes += 1
+            return campaigns
+        # Serve the previous mapping, even expired, rather than no campaigns
+        entry = self._entries.get(bucket)
+        return entry[1] if entry else campaigns
+
+    def peek(self, start_date, end_date):
+        """Cached campaigns of a range if its bucket is live, else None (never fetches)"""
+        entry = self._entries.get(self.bucket(start_date, end_date))
+        if entry and entry[0] > time.time():
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def get(self, start_date, end_date):
+        """
+        Campaigns for a range, fetched only when its bucket is missing or
+        expired. The returned mapping is shared: callers must not modify it.
+        """
+        bucket = self.bucket(start_date, end_date)
+        entry = self._entries.get(bucket)
+        if entry and entry[0] > time.time():
+            self.hits += 1
+            return entry[1]
+
+        # One fetch per bucket, concurrent callers wait for it
+        with self._bucket_lock(bucket):
+            entry = self._entries.get(bucket)
+            if entry and entry[0] > time.time():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return self.refresh(*bucket)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "buckets": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes
+        }
+
+
+class QualificationCatalog:
+    """
+    Persistent catalog of CRM qualifications, classified once into the
+    get_campaign_qualifs categories and indexed by campaign, category and id.
+
+    The catalog is a JSON file per tenant shared by the workers: whoever
+    refreshes it rewrites the file atomically and the others reload it when
+    its mtime changes.
+    """
+    def __init__(self, fetch, path=None, ttl=None, namespace="ringassur"):
+        self.fetch = fetch
+        self.path = path or os.path.join(
+            os.getenv("QUALIF_CATALOG_DIR", tempfile.gettempdir()), f"{namespace}_qualifs.json"
+        )
+        self.ttl = ttl or int(os.getenv("QUALIF_CATALOG_TTL", 6 * 3600))
+        self._lock = threading.Lock()
+        self._mtime = None
+
+        self.campaigns = {}
+        self.updated_at = None
+        self.by_type = {}           # category -> qualif ids across all campaigns
+        self.by_campaign_type = {}  # (campaign id, category) -> qualif ids
+        self.by_id = {}             # qualif id -> qualif data with its campaign and category
+        self._resolved = {}         # (campaigns, categories) -> {campaign id: qualif ids}
+
+        self.lookups = 0
+        self.refreshes = 0
+        self._maybe_reload()
+
+    def _build_indexes(self, campaigns):
+        by_type, by_campaign_type, by_id = {}, {}, {}
+        for campaign_id, campaign in campaigns.items():
+            for category, qualifs in campaign.items():
+                if not isinstance(qualifs, list):
+                    continue
+                ids = [qualif["id"] for qualif in qualifs]
+                by_campaign_type[(campaign_id, category)] = ids
+                type_ids = by_type.setdefault(category, [])
+                for qualif in qualifs:
+                    if qualif["id"] not in by_id:
+                        type_ids.append(qualif["id"])
+                    by_id.setdefault(qualif["id"], {**qualif, "campaign_id": campaign_id, "category": category})
+
+        # Swap the references at once so readers never see half-built indexes
+        self.campaigns = campaigns
+        self.by_type, self.by_campaign_type, self.by_id = by_type, by_campaign_type, by_id
+        self._resolved = {}
+
+    def _maybe_reload(self):
+        """Load the catalog file if another worker rewrote it"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            with self._lock:
+                self._build_indexes(stored.get("campaigns", {}))
+                self.updated_at = stored.get("updated_at")
+                self._mtime = mtime
+        except Exception as e:
+            print(f"Error loading qualification catalog {self.path}: {str(e)}")
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"updated_at": self.updated_at, "campaigns": self.campaigns}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def update(self, parsed_qualifs):
+        """Merge parsed campaigns (get_campaign_qualifs data) into the catalog and persist it"""
+        if not parsed_qualifs:
+            return
+        with self._lock:
+            self._build_indexes({**self.campaigns, **parsed_qualifs})
+            self.updated_at = time.time()
+            try:
+                self._save()
+            except Exception as e:
+                print(f"Error saving qualification catalog {self.path}: {str(e)}")
+
+    def refresh(self, campaign_ids):
+        """Fetch the qualifications of the given campaigns in one call; fetch merges them into the catalog"""
+        campaign_ids = [str(c) for c in campaign_ids]
+        if not campaign_ids:
+            return 0
+        result = self.fetch(campaign_ids)
+        self.refreshes += 1
+        if not result.get("success"):
+            print(f"Failed to refresh qualifications of campaigns {campaign_ids}: {result.get('error')}")
+            return 0
+        return len(result["data"])
+
+    def is_stale(self):
+        self._maybe_reload()
+        return self.updated_at is None or time.time() - self.updated_at > self.ttl
+
+    def missing(self, campaign_ids):
+        """Campaigns (num_campagne) the catalog does not know yet"""
+        self._maybe_reload()
+        return [str(c) for c in campaign_ids if str(c) not in self.campaigns]
+
+    def resolve(self, qualif_types, campaign_ids=None):
+        """
+        Qualification ids of the given categories grouped by campaign, for the
+        given campaigns the catalog knows (all campaigns when none are given;
+        campaigns it does not know resolve to nothing). Memoized per
+        (campaigns, categories) until the catalog changes.
+        """
+        self._maybe_reload()
+        self.lookups += 1
+        requested = {str(c) for c in campaign_ids or []}
+        known = tuple(sorted(c for c in requested if c in self.campaigns))
+        if requested and not known:
+            return {}
+        key = (known, tuple(sorted(qualif_types)))
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+
+        resolved = {}
+        for campaign_id in known or self.campaigns:
+            ids = []
+            for qualif_type in qualif_types:
+                ids.extend(self.by_campaign_type.get((campaign_id, qualif_type), []))
+            if ids:
+                resolved[campaign_id] = list(dict.fromkeys(ids))
+        self._resolved[key] = resolved
+        return resolved
+
+    def ids_for_types(self, qualif_types, campaign_ids=None):
+        """Deduplicated qualification ids of the given categories (see resolve)"""
+        resolved = self.resolve(qualif_types, campaign_ids)
+        return list(dict.fromkeys(qualif_id for ids in resolved.values() for qualif_id in ids))
+
+    def qualif(self, qualif_id):
+        self._maybe_reload()
+        return self.by_id.get(str(qualif_id))
+
+    def metrics(self) -> dict:
+        return {
+            "campaigns": len(self.campaigns),
+            "qualifs": len(self.by_id),
+            "updated_at": datetime.fromtimestamp(self.updated_at).isoformat() if self.updated_at else None,
+            "lookups": self.lookups,
+            "refreshes": self.refreshes
+        }
@@ -2,6 +2,8 @@ import requests
 from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime, timedelta
 import re
+import io
+import codecs
 import pandas as pd
 import json
 from io import BytesIO
@@ -9,6 +11,8 @@ from bs4 import BeautifulSoup
 from typing import Optional, List
 import random
 import time
+import threading
+import functools
 import os
 from urllib.parse import urlparse
 import xlsxwriter
@@ -25,238 +29,678 @@ import google.auth
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+from records import RecordBatch
+from catalog import CampaignCatalog, QualificationCatalog
+from planner import plan_range, IntervalPlanner
+from tenants import TENANTS
+from seen_index import SeenIndex
+from record_store import RecordStore
 
 
 # Disable SSL warning
 requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
 
-
-
-class CRMClientFormaExpert: 
-    def __init__(self):
-        self.base_url = "https://formaexpert.comunikcrm.info"
-        self.session = requests.session()
-        
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-            'Accept': '*/*',
-            'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7,ar;q=0.6',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Origin': 'https://formaexpert.comunikcrm.info',
-            'Referer': 'https://formaexpert.comunikcrm.info/vvci/login'
-        })
+def _parse_campaign_html(html_content):
+    """Parse the prodFilterDate HTML response to extract campaign information"""
+    campaigns = {}
+    
+    # Use regex to find optgroup and option elements
+    optgroup_pattern = r'<optgroup label="([^"]+)">(.*?)</optgroup>'
+    option_pattern = r'<option value="(\d+)" data-numcampagne="(\d+)">([^<]+)</option>'
+    
+    # Find all optgroups
+    for group_match in re.finditer(optgroup_pattern, html_content, re.DOTALL):
+        group_name = group_match.group(1)
+        group_content = group_match.group(2)
         
-    def login(self, username='root', password='P@ssW0rd@2024', account='formaexpert'):
-        """Login to the CRM system"""
-        login_url = f"{self.base_url}/vvci/login/login_check"
+        campaigns[group_name] = []
         
-        payload = {
-            'username': username,
-            'account': account,
-            'password': password,
-            'poste': '',
-            'code': '',
-            'checkForTwoFactor': '0',
-            'language': 'fr'
+        # Find all options within the optgroup
+        for option_match in re.finditer(option_pattern, group_content):
+            campaign = {
+                'value': option_match.group(1),
+                'num_campagne': option_match.group(2),
+                'name': option_match.group(3).strip()
+            }
+            campaigns[group_name].append(campaign)
+    
+    return campaigns
+
+
+# Qualification categories returned by get_campaign_qualifs
+QUALIF_TYPES = ('sales_qualifs', 'callback_qualifs', 'rejection_qualifs', 'other_qualifs')
+
+# Define positive qualification names
+_POSITIVE_QUALIFS = {
+    "Vente", "Transfert", "Vente Reprise", "Transfert Reprise"
+}
+
+# Define callback qualification names
+_CALLBACK_QUALIFS = {
+    "Rappel", "Rappel General", "NRP", "Répondeur"
+}
+
+_REJECTION_QUALIFS = {
+    "Bloctel", "Pas interssé", "Ne pas Appeler", "Faux numero",
+    "Hors cible", "CMU", "LIVRET A / Pas de Compte"
+}
+
+
+def _classify_qualif(name):
+    """Category of a qualification, based on its name and business logic"""
+    if name in _POSITIVE_QUALIFS:
+        return "sales_qualifs"      # Ventes et transferts
+    if name in _CALLBACK_QUALIFS:
+        return "callback_qualifs"   # Rappels et NRP
+    if name.startswith("Refus") or name in _REJECTION_QUALIFS:
+        return "rejection_qualifs"  # Refus et autres négatifs
+    return "other_qualifs"          # Autres qualifications
+
+
+def _parse_qualif_campaigns(data):
+    """Parse the getQualifCampagnes tree and organize qualifications by campaign"""
+    parsed_qualifs = {}
+
+    for campaign in data:
+        campaign_id = campaign['li_attr']['num_campagne']
+
+        qualifs = {
+            "campaign_id": campaign_id,
+            "campaign_name": campaign['text'],
+            **{qualif_type: [] for qualif_type in QUALIF_TYPES}
         }
 
+        # Process children (qualifications)
+        for qualif in campaign['children']:
+            qualif_data = {
+                "id": qualif['li_attr']['num_qualif'],
+                "name": qualif['text'],
+                "type": qualif['li_attr']['type'],
+                "argumente": qualif['li_attr']['argumente'],
+                "type_qualif": qualif['li_attr']['type_qualif'],
+                "man_auto": qualif['li_attr']['man_auto']
+            }
+            qualifs[_classify_qualif(qualif['text'])].append(qualif_data)
+
+        parsed_qualifs[campaign_id] = qualifs
+
+    return parsed_qualifs
+
+
+def _build_export_payload(campaign_values, start_date, end_date, form_model='-1', selected_qualifs=None):
+    """Build the CSV export payload used by comunikcrm (same as flashProdScript)"""
+    # Generate unique download token
+    download_token = f"cmk_export_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    
+    payload = {
+        'CMK_FORM_ACTION': 'csv',
+        'CMK_DWNLOAD_TOKEN': download_token,
+        'CMK_FORM_CONTACTS': '-1',
+        'selectGroups[]': campaign_values,
+        'selectGroup': 'on',
+        'dateprod[start]': start_date,
+        'dateprod[end]': end_date,
+        'dateType': '1',
+        'dateTraitement': f'Du {datetime.now().strftime("%d %B %Y")} Au {datetime.now().strftime("%d %B %Y")}',
+        'datetrait[start]': start_date,
+        'datetrait[end]': end_date,
+        'selectChamps[]': '',
+        'selectInputs[]': '-1'
+    }
+    if form_model is not None:
+        payload['CMK_FORM_MODEL'] = form_model
+    if selected_qualifs:
+        payload['selectQualifs[7][]'] = selected_qualifs
+
+    # The form only keeps the last selectItem value
+    if campaign_values:
+        payload['selectItem'] = campaign_values[-1]
+
+    return payload
+
+
+# Encoding last detected for each CRM host, used when a sample is plain ASCII
+_export_encodings = {}
+
+# A valid multi-byte UTF-8 sequence, practically never found in latin1 text
+_UTF8_SEQUENCE = re.compile(rb'[\xc2-\xdf][\x80-\xbf]|[\xe0-\xef][\x80-\xbf]{2}')
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+
+def _sniff_encoding(content, source=None, sample_size=64 * 1024):
+    """
+    Pick the codec of a CSV export once: BOM first, then a UTF-8 check of a
+    sample. An ASCII-only sample is ambiguous, so the last encoding seen for
+    the same source (CRM host) is reused.
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+
+    sample = content[:sample_size]
+    if sample.isascii():
+        return _export_encodings.get(source, 'utf-8')
+
+    try:
+        # final=False: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        encoding = 'utf-8'
+    except UnicodeDecodeError:
+        # Mostly UTF-8 with a few stray bytes: the surrogateescape path repairs those values
+        encoding = 'utf-8' if _UTF8_SEQUENCE.search(sample) else 'latin1'
+
+    if source is not None:
+        _export_encodings[source] = encoding
+    return encoding
+
+
+def _repair_value(value):
+    """Re-decode a value holding surrogate-escaped bytes, as UTF-8 if valid, else latin1"""
+    raw = value.encode('utf-8', errors='surrogateescape')
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin1')
+
+
+def _repair_surrogates(df):
+    """
+    UTF-8 exports are parsed with surrogateescape so stray non-UTF-8 bytes
+    never fail the parse; decode those values as latin1 instead of re-parsing.
+    """
+    for col in df.select_dtypes(include=['object']).columns:
+        values = df[col]
         try:
-            print(f"\nAttempting login to FormaExpert CRM...")
-            print(f"Login URL: {login_url}")
-            print(f"Payload: {payload}")
-            
-            response = self.session.post(
-                login_url,
-                data=payload,
-                verify=False
+            ''.join(v for v in values.tolist() if isinstance(v, str)).encode('utf-8')
+        except UnicodeEncodeError:
+            df[col] = values.map(lambda v: _repair_value(v) if isinstance(v, str) else v)
+    return df
+
+
+def _csv_read_options(content, source):
+    encoding = _sniff_encoding(content, source)
+    options = {'sep': ';', 'encoding': encoding, 'on_bad_lines': 'skip'}
+    if encoding.startswith('utf-8'):
+        options['encoding_errors'] = 'surrogateescape'
+    return options
+
+
+def _read_export_csv(content, source=None):
+    """Read a comunikcrm CSV export, parsing it once with the sniffed encoding"""
+    options = _csv_read_options(content, source)
+    try:
+        df = pd.read_csv(BytesIO(content), **options)
+    except Exception as e:
+        print(f"Failed to read CSV with {options['encoding']} encoding: {str(e)}")
+        return None
+
+    if options['encoding'].startswith('utf-8'):
+        df = _repair_surrogates(df)
+    print(f"Successfully read CSV with {options['encoding']} encoding")
+    return df
+
+
+class _ResponseReader(io.RawIOBase):
+    """Read-only file object over the body chunks of a streamed requests response"""
+    def __init__(self, chunks, head=b''):
+        self._chunks = chunks
+        self._buffer = memoryview(head)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _open_export_stream(response, source=None, sample_size=64 * 1024, block_size=256 * 1024):
+    """
+    Wrap a stream=True export response into a buffered file object for
+    pd.read_csv. Only the first block is held to sniff the encoding; the rest
+    of the body is pulled from the socket as the parser consumes it.
+    Returns (file, read_csv options), or (None, None) for an empty body.
+    """
+    chunks = response.iter_content(chunk_size=block_size)
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= sample_size:
+            break
+    if not head.strip():
+        return None, None
+
+    options = _csv_read_options(head, source)
+    return io.BufferedReader(_ResponseReader(chunks, head), buffer_size=block_size), options
+
+
+def _read_export_stream(response, source=None, dtype=None):
+    """Parse a streamed CSV export response into one DataFrame without holding the raw body"""
+    stream, options = _open_export_stream(response, source)
+    if stream is None:
+        return None
+    try:
+        df = pd.read_csv(stream, dtype=dtype, **options)
+    except Exception as e:
+        print(f"Failed to read CSV with {options['encoding']} encoding: {str(e)}")
+        return None
+
+    if options['encoding'].startswith('utf-8'):
+        df = _repair_surrogates(df)
+    print(f"Successfully read streamed CSV with {options['encoding']} encoding")
+    return df
+
+
+def _iter_export_stream(response, chunk_size=1000, source=None):
+    """
+    Parse a streamed CSV export response into DataFrames of chunk_size rows.
+    Values are kept as the raw CSV text: dtypes inferred per chunk would differ
+    from chunk to chunk (e.g. a numeric column turning float once a gap shows up).
+    """
+    stream, options = _open_export_stream(response, source)
+    if stream is None:
+        return
+
+    reader = pd.read_csv(stream, dtype=str, chunksize=chunk_size, **options)
+    with reader:
+        for chunk in reader:
+            if options['encoding'].startswith('utf-8'):
+                chunk = _repair_surrogates(chunk)
+            yield chunk
+
+
+def _clean_columns(df):
+    """
+    Clean a CRM export frame column-wise: empties become None, values become
+    str and lone surrogates are dropped so every value is valid UTF-8.
+    Returns one list of values per column.
+    """
+    columns = []
+    for i in range(df.shape[1]):
+        values = df.iloc[:, i]
+        empty = values.isna()
+        values = values.astype(str)
+        empty |= values == ''
+
+        # Only text columns can hold lone surrogates (e.g. from a surrogateescape decode):
+        # one encode of the joined column detects them, the slow cleanup only runs if needed
+        if df.iloc[:, i].dtype == object:
+            try:
+                ''.join(values.tolist()).encode('utf-8')
+            except UnicodeEncodeError:
+                values = values.str.encode('utf-8', errors='ignore').str.decode('utf-8')
+
+        columns.append(values.astype(object).where(~empty, None).tolist())
+
+    return columns
+
+
+def _frame_to_records(df):
+    """Clean a CRM export frame and convert it to a list of records"""
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*_clean_columns(df))]
+
+
+def _frame_to_batch(df):
+    """Clean a CRM export frame into a compact column-oriented RecordBatch"""
+    return RecordBatch([str(name) for name in df.columns], _clean_columns(df))
+
+
+# One shard pool per upstream, shared by every request of the process, so CRM_SHARD_WORKERS
+# bounds the concurrent shard exports an upstream gets rather than those of one request
+_shard_executors = {}
+_shard_executors_lock = threading.Lock()
+
+
+def _shard_executor(upstream):
+    with _shard_executors_lock:
+        executor = _shard_executors.get(upstream)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("CRM_SHARD_WORKERS", 4)), thread_name_prefix=f"crm-shard-{upstream}"
             )
-            
-            print(f"Login response status: {response.status_code}")
-            print(f"Login response headers: {dict(response.headers)}")
-            print(f"Login cookies: {self.session.cookies.get_dict()}")
-            
-            if response.status_code == 200:
-                # Verify we're actually logged in by checking dashboard access
-                check_url = f"{self.base_url}/vvci/dashboard"
-                check_response = self.session.get(check_url, verify=False)
-                print(f"Dashboard check status: {check_response.status_code}")
-                print(f"Dashboard URL: {check_response.url}")
-                
-                if check_response.status_code == 200 and 'login' not in check_response.url:
-                    print("Successfully logged into FormaExpert CRM")
-                    return True
-                else:
-                    print("Login succeeded but dashboard check failed")
-                    return False
-            else:
-                print(f"Failed to login. Response content: {response.text[:500]}...")
-                return False
-                
+            _shard_executors[upstream] = executor
+        return executor
+
+
+def _synchronized(method):
+    """
+    Run a client method under the client's lock: the shared clients are
+    called from several pool threads, and these methods mutate their state
+    (session headers, stored data, rate limiter)
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _merge_frames(frames):
+    """Concatenate export frames in range order, keeping the first row of each CMK_S_FIELD_ID_UNIQUE"""
+    non_empty = [frame for frame in frames if not frame.empty]
+    df = pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame()
+    if 'CMK_S_FIELD_ID_UNIQUE' in df.columns:
+        ids = df['CMK_S_FIELD_ID_UNIQUE']
+        df = df[~(ids.notna() & ids.duplicated())].reset_index(drop=True)
+    return df
+
+
+def _batch_to_frame(batch):
+    """DataFrame of a RecordBatch's cleaned values (str or None)"""
+    return pd.DataFrame(dict(zip(batch.columns, batch.values)), columns=list(batch.columns))
+
+
+def _paginate_frame(df, page, page_size):
+    """Slice a CRM export frame and build the paginated response"""
+    # Calculate total records and pages
+    total_records = len(df)
+    total_pages = (total_records + page_size - 1) // page_size
+    
+    # Calculate start and end indices for the requested page
+    start_idx = (page - 1) * page_size
+    end_idx = min(start_idx + page_size, total_records)
+    
+    # Clean and convert the page data
+    records = _frame_to_records(df.iloc[start_idx:end_idx])
+    
+    return {
+        "success": True,
+        "data": records,
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total_records": total_records,
+            "total_pages": total_pages
+        }
+    }
+
+
+def _read_contracts_export(content):
+    """Read and clean the ERP contracts export (xlsx, ods or csv)"""
+    # Wrap the export content in a file-like object
+    temp_file = BytesIO(content)
+
+    # Try reading with different methods
+    read_methods = [
+        # Try openpyxl first for xlsx
+        lambda: pd.read_excel(
+            temp_file,
+            engine='openpyxl'
+        ),
+        # Try odf for ods files
+        lambda: pd.read_excel(
+            temp_file,
+            engine='odf'
+        ),
+        # Try CSV with different encodings
+        lambda: pd.read_csv(
+            temp_file,
+            encoding='utf-8'
+        ),
+        lambda: pd.read_csv(
+            temp_file,
+            encoding='latin1'
+        ),
+        lambda: pd.read_csv(
+            temp_file,
+            encoding='iso-8859-1'
+        )
+    ]
+
+    df = None
+    last_error = None
+    for read_method in read_methods:
+        try:
+            temp_file.seek(0)  # Reset file pointer
+            df = read_method()
+            if not df.empty:
+                print("Successfully read data")
+                break
         except Exception as e:
-            print(f"Error during login: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
-        
-    def get_campaigns(self, start_date=None, end_date=None):
-        """Get available campaigns for the given date range"""
+            print(f"Read attempt failed: {str(e)}")
+            last_error = e
+            continue
+
+    if df is None or df.empty:
+        raise Exception(f"Failed to read data with any method. Last error: {str(last_error)}")
+
+    # Clean the data
+    df = df.replace({pd.NA: None})
+    df = df.fillna('')
+
+    # Convert dates to standard format
+    for col in df.columns:
         try:
-            # Remove hardcoded dates and use parameters
-            if not start_date:
-                start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
-            if not end_date:
-                end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
+            if df[col].dtype == 'object':
+                # Try to convert to datetime
+                df[col] = pd.to_datetime(
+                    df[col], 
+                    errors='ignore',
+                    format='mixed'
+                )
+        except Exception as e:
+            print(f"Error converting column {col}: {str(e)}")
+            continue
 
-            url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/prodFilterDate"
-            
-            payload = {
-                'start': start_date,
-                'end': end_date
-            }
+    # Format datetime columns
+    date_columns = df.select_dtypes(include=['datetime64']).columns
+    for col in date_columns:
+        df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
 
-            print(f"Fetching campaigns from URL: {url}")
-            print(f"With payload: {payload}")
-            print(f"Session cookies: {self.session.cookies.get_dict()}")
-            print(f"Session headers: {self.session.headers}")
+    return df
 
-            response = self.session.post(url, data=payload, verify=False)
-            
-            print(f"Campaign response status: {response.status_code}")
-            print(f"Campaign response content: {response.text[:500]}...")  # First 500 chars
-            
-            if response.status_code == 200:
-                campaigns = self._parse_campaign_response(response.text)
-                print(f"Parsed campaigns: {campaigns}")
-                return campaigns
-            else:
-                print(f"Failed to get campaigns. Status code: {response.status_code}")
-                print(f"Response content: {response.text}")
-                return None
 
-        except Exception as e:
-            print(f"Error getting campaigns: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
+def _daily_stats(stored_data):
+    """Get daily stats of the sales"""
+    try:
+        if stored_data.empty:
+            return {"error": "No data available to calculate daily stats."}
 
-    def get_data_as_json(self, start_date=None, end_date=None):
-        """Get CRM data as JSON"""
-        try:
-            # Use today's date as default
-            if not start_date:
-                start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
-            if not end_date:
-                end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
-            
-            # Get campaigns first
-            campaigns = self.get_campaigns(start_date, end_date)
-            if not campaigns:
-                return {"error": "Failed to get campaigns"}
-            
-            # Get campaign values
-            campaign_values = [c['value'] for c in campaigns.get('Energie_Rabat', [])]
-            
-            # Export the data using the same payload as flashProdScript
-            url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
-            
-            # Generate unique download token
-            download_token = f"cmk_export_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            # Use the exact same payload as in flashProdScript
-            payload = {
-                'CMK_FORM_ACTION': 'csv',
-                'CMK_DWNLOAD_TOKEN': download_token,
-                'CMK_FORM_CONTACTS': '-1',
-                'selectGroups[]': campaign_values,
-                'selectGroup': 'on',
-                'dateprod[start]': start_date,
-                'dateprod[end]': end_date,
-                'dateType': '1',
-                'dateTraitement': f'Du {datetime.now().strftime("%d %B %Y")} Au {datetime.now().strftime("%d %B %Y")}',
-                'datetrait[start]': start_date,
-                'datetrait[end]': end_date,
-                'selectChamps[]': '',
-                'selectInputs[]': '-1'
-            }
+        df = stored_data.copy()
 
-            # Add selectItem entries for each campaign value
-            for value in campaign_values:
-                payload['selectItem'] = value
+        # Ensure 'Créer le' is in datetime format
+        df["Créer le"] = pd.to_datetime(df["Créer le"], errors='coerce')
 
-            response = self.session.post(url, data=payload, verify=False)
-            
-            if response.status_code == 200:
-                try:
-                    # Try different encodings
-                    encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                    df = None
-                    
-                    for encoding in encodings:
-                        try:
-                            df = pd.read_csv(BytesIO(response.content), 
-                                           sep=';', 
-                                           encoding=encoding)
-                            break
-                        except UnicodeDecodeError:
-                            continue
-                    
-                    if df is None:
-                        return {"error": "Failed to decode CSV data with any known encoding"}
-                    
-                    # Convert to JSON
-                    json_data = json.loads(df.to_json(orient='records', date_format='iso'))
-                    return {"success": True, "data": json_data}
-                except Exception as e:
-                    print(f"Error processing CSV: {str(e)}")
-                    return {"error": f"Error processing CSV: {str(e)}"}
-            else:
-                return {"error": f"Failed to get data. Status code: {response.status_code}"}
+        # Group by commercial and day, then count sales
+        daily_stats = df.groupby([df['Commercial'], df['Créer le'].dt.date]).size().reset_index(name='Daily Sales')
 
-        except Exception as e:
-            print("Error", e)
-            return {"error": f"Error getting data: {str(e)}"}
+        # Convert 'Daily Sales' to int to ensure no floats
+        daily_stats['Daily Sales'] = daily_stats['Daily Sales'].astype(int)
 
-    def _parse_campaign_response(self, html_content):
-        """Parse the HTML response to extract campaign information"""
-        campaigns = {}
-        
-        # Use regex to find optgroup and option elements
-        optgroup_pattern = r'<optgroup label="([^"]+)">(.*?)</optgroup>'
-        option_pattern = r'<option value="(\d+)" data-numcampagne="(\d+)">([^<]+)</option>'
-        
-        # Find all optgroups
-        for group_match in re.finditer(optgroup_pattern, html_content, re.DOTALL):
-            group_name = group_match.group(1)
-            group_content = group_match.group(2)
-            
-            campaigns[group_name] = []
-            
-            # Find all options within the optgroup
-            for option_match in re.finditer(option_pattern, group_content):
-                campaign = {
-                    'value': option_match.group(1),
-                    'num_campagne': option_match.group(2),
-                    'name': option_match.group(3).strip()
-                }
-                campaigns[group_name].append(campaign)
-        
-        return campaigns
+        # Convert the dataframe to a list of dictionaries (JSON serializable format)
+        daily_stats = daily_stats.to_dict(orient='records')
 
-    def close(self):
-        """Close the client's session"""
+        return daily_stats
+
+    except Exception as e:
+        return {"error": f"Error getting daily stats: {str(e)}"}
+
+
+def _weekly_stats(stored_data):
+    """Get weekly stats of the sales"""
+    try:
+        if stored_data.empty:
+            return {"error": "No data available to calculate weekly stats."}
+
+        df = stored_data.copy()
+
+        # Ensure 'Créer le' is in datetime format
+        df["Créer le"] = pd.to_datetime(df["Créer le"], errors='coerce')
+
+        # Extract month and week number for each sale relative to the month
+        df['Month'] = df['Créer le'].dt.to_period('M')  # Extracts month in YYYY-MM format
+        df['Day of Month'] = df['Créer le'].dt.day
+        df['Relative Week Number'] = ((df['Day of Month'] - 1) // 7) + 1
+
+        # Group by commercial, month, and relative week number
+        weekly_stats = df.groupby([df['Commercial'], df['Month'], df['Relative Week Number']]).size().reset_index(name='Weekly Sales')
+
+        # Convert 'Weekly Sales' to int to ensure no floats
+        weekly_stats['Weekly Sales'] = weekly_stats['Weekly Sales'].astype(int)
+
+        # Convert the dataframe to a list of dictionaries (JSON serializable format)
+        weekly_stats = weekly_stats.to_dict(orient='records')
+
+        return weekly_stats
+
+    except Exception as e:
+        return {"error": f"Error getting weekly stats: {str(e)}"}
+
+
+def _parse_candidatures_last_page(soup):
+    """Find the last page number of the mcdesk candidatures listing"""
+    pagination = soup.select('ul.pagination li a')
+    page_numbers = []
+    for link in pagination:
+        if link.text.isdigit():
+            page_numbers.append(int(link.text))
+
+    if page_numbers:
+        last_page = max(page_numbers)
+        print(f"Found pagination with {last_page} pages")
+    else:
+        # Look for the last page indicator
+        last_page_elem = soup.select_one('a[href*="page"][href$="-86"]')
+        if last_page_elem:
+            try:
+                last_page_text = last_page_elem.text.strip()
+                if last_page_text.isdigit():
+                    last_page = int(last_page_text)
+                    print(f"Found last page through href: {last_page}")
+                else:
+                    last_page = 1
+            except:
+                last_page = 1
+        else:
+            last_page = 1
+            print("No pagination found, assuming single page")
+
+    return last_page
+
+
+def _parse_candidatures_page(page_soup, page, mcdesk_url, start_index=0):
+    """Parse the candidates table of one mcdesk candidatures page"""
+    candidates = []
+
+    # Find the main candidates table - based on the screenshot it appears to be the only table
+    candidate_table = page_soup.find('table', class_='table-bordered')
+    if not candidate_table:
+        # Try without the class if not found
+        candidate_table = page_soup.find('table')
+
+    if not candidate_table:
+        print(f"No candidate table found on page {page}")
+        return []
+
+    # Get all rows from the table
+    rows = candidate_table.find_all('tr')
+    header_row = rows[0] if rows else None
+
+    if not header_row:
+        print("No header row found in the table")
+        return []
+
+    # Extract table headers to identify columns
+    headers = [th.text.strip() for th in header_row.find_all(['th', 'td'])]
+    print(f"Found table headers: {headers}")
+
+    # Determine column indices
+    date_idx = next((i for i, h in enumerate(headers) if 'date' in h.lower()), 0)
+    name_idx = next((i for i, h in enumerate(headers) if 'nom' in h.lower() or 'name' in h.lower()), 1)
+    cv_idx = next((i for i, h in enumerate(headers) if 'cv' in h.lower()), 2)
+    offer_idx = next((i for i, h in enumerate(headers) if 'offre' in h.lower() or 'offer' in h.lower()), 3)
+
+    # Process each row
+    for row in rows[1:]:  # Skip header
         try:
-            if self.session:
-                self.session.close()
-                self.session = None
+            # Extract cells
+            cells = row.find_all(['td', 'th'])
+            if len(cells) <= max(date_idx, name_idx, cv_idx, offer_idx):
+                continue
+
+            # Extract date and time
+            date_cell = cells[date_idx]
+            date_text = date_cell.text.strip()
+            try:
+                date_parts = date_text.split(' ')
+                date = date_parts[0] if date_parts else "Unknown"
+                time = date_parts[1] if len(date_parts) > 1 else "00:00"
+            except:
+                date = date_text
+                time = "00:00"
+
+            # Extract candidate name
+            name_cell = cells[name_idx]
+            name = name_cell.text.strip()
+
+            # Look for candidate details link
+            candidate_url = None
+            candidate_id = None
+            detail_link = name_cell.find('a')
+            if detail_link and 'href' in detail_link.attrs:
+                candidate_url = detail_link['href']
+                id_match = re.search(r'id-(\d+)', candidate_url)
+                candidate_id = id_match.group(1) if id_match else None
+
+            # Extract CV link
+            cv_cell = cells[cv_idx]
+            cv_link = cv_cell.find('a')
+            cv_url = cv_link['href'] if cv_link and 'href' in cv_link.attrs else None
+
+            # Get offer details
+            offer_cell = cells[offer_idx]
+            offer = offer_cell.text.strip()
+
+            # Create candidate record
+            candidate = {
+                'id': candidate_id or f"unknown-{start_index + len(candidates)}",
+                'name': name,
+                'date': date,
+                'time': time,
+                'offer': offer,
+                'url': f"{mcdesk_url}{candidate_url}" if candidate_url else None,
+                'cv_url': cv_url
+            }
+
+            print(f"Found candidate: {name} ({date})")
+            candidates.append(candidate)
+
         except Exception as e:
-            print(f"Error closing session: {str(e)}")
+            print(f"Error processing candidate row: {str(e)}")
+            continue
+
+    return candidates
+
+
+
 
 class CRMClient:
-    def __init__(self):
-        self.base_url = "https://ringassur.comunikcrm.info"
+    """comunikcrm client for one tenant of the registry (ringassur by default)"""
+    def __init__(self, tenant=None):
+        self.tenant = tenant or TENANTS["ringassur"]
+        self.base_url = self.tenant.base_url
         self.session = requests.Session()
+        # Connection pool sized for the parallel shard exports of this tenant
+        pool_size = int(os.getenv("CRM_HTTP_POOL_SIZE", 16))
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
         # Set up default headers
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
@@ -264,18 +708,25 @@ class CRMClient:
             'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7,ar;q=0.6',
             'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
             'X-Requested-With': 'XMLHttpRequest',
-            'Origin': 'https://ringassur.comunikcrm.info',
-            'Referer': 'https://ringassur.comunikcrm.info/vvci/login'
+            'Origin': self.base_url,
+            'Referer': f'{self.base_url}/vvci/login'
         })
-
-    def login(self, username, password, account="ringassur"):
-        """Login to the CRM system"""
+        self.campaign_catalog = CampaignCatalog(self.fetch_campaigns)
+        self.qualification_catalog = QualificationCatalog(self.get_campaign_qualifs, namespace=self.tenant.name)
+        # Whether the display search honors start/length (None until a response tells)
+        self.search_paging = None
+        # Local day partitions of past records (CRM_STORE=0 to always export from the CRM)
+        self.record_store = RecordStore(namespace=self.tenant.name) if os.getenv("CRM_STORE", "1") != "0" else None
+
+    def login(self, username=None, password=None, account=None):
+        """Login to the CRM system, with the tenant's credentials by default"""
         login_url = f"{self.base_url}/vvci/login/login_check"
+        default_username, default_password = self.tenant.credentials()
         
         payload = {
-            'username': username,
-            'account': account,
-            'password': password,
+            'username': username or default_username,
+            'account': account or self.tenant.account,
+            'password': password or default_password,
             'poste': '',
             'code': '',
             'checkForTwoFactor': '0',
@@ -290,7 +741,11 @@ class CRMClient:
             )
             
             if response.status_code == 200:
-                print("Successfully logged into CRM")
+                # Verify we're actually logged in by checking dashboard access
+                if self.tenant.check_dashboard and not self.check_login():
+                    print(f"{self.tenant.name} login succeeded but dashboard check failed")
+                    return False
+                print(f"Successfully logged into CRM ({self.tenant.name})")
                 return True
             else:
                 print(f"Failed to login. Status code: {response.status_code}")
@@ -301,8 +756,25 @@ class CRMClient:
             print(f"Error during login: {str(e)}")
             return False
 
+    def check_login(self):
+        """Check the session is still authenticated: the dashboard does not redirect to the login page"""
+        try:
+            response = self.session.get(f"{self.base_url}/vvci/dashboard", verify=False)
+            return response.status_code == 200 and 'login' not in response.url
+        except Exception as e:
+            print(f"Error checking {self.tenant.name} login status: {str(e)}")
+            return False
+
     def get_campaigns(self, start_date=None, end_date=None):
-        """Get available campaigns for the given date range"""
+        """Get available campaigns for the given date range, from the day-bucketed catalog"""
+        if not start_date:
+            start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
+        if not end_date:
+            end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
+        return self.campaign_catalog.get(start_date, end_date)
+
+    def fetch_campaigns(self, start_date=None, end_date=None):
+        """Get available campaigns for the given date range from prodFilterDate"""
         # Remove hardcoded dates and use parameters
         if not start_date:
             start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
@@ -332,29 +804,7 @@ class CRMClient:
 
     def _parse_campaign_response(self, html_content):
         """Parse the HTML response to extract campaign information"""
-        campaigns = {}
-        
-        # Use regex to find optgroup and option elements
-        optgroup_pattern = r'<optgroup label="([^"]+)">(.*?)</optgroup>'
-        option_pattern = r'<option value="(\d+)" data-numcampagne="(\d+)">([^<]+)</option>'
-        
-        # Find all optgroups
-        for group_match in re.finditer(optgroup_pattern, html_content, re.DOTALL):
-            group_name = group_match.group(1)
-            group_content = group_match.group(2)
-            
-            campaigns[group_name] = []
-            
-            # Find all options within the optgroup
-            for option_match in re.finditer(option_pattern, group_content):
-                campaign = {
-                    'value': option_match.group(1),
-                    'num_campagne': option_match.group(2),
-                    'name': option_match.group(3).strip()
-                }
-                campaigns[group_name].append(campaign)
-        
-        return campaigns
+        return _parse_campaign_html(html_content)
 
     def get_campaign_data(self, campaign_values, start_date=None, end_date=None):
         """Get data for selected campaigns"""
@@ -591,193 +1041,31 @@ class CRMClient:
             if not campaigns:
                 return {"error": "Failed to get campaigns"}
             
-            # Get campaign values for Prevoyance
-            campaign_values = [c['value'] for c in campaigns.get('Prevoyance', [])]
+            # Get campaign values for the tenant's group
+            campaign_values = [c['value'] for c in campaigns.get(self.tenant.campaign_group, [])]
             
             # Export the data using the same payload as flashProdScript
             url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
-            
-            # Generate unique download token
-            download_token = f"cmk_export_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            # Use the exact same payload as in flashProdScript
-            payload = {
-                'CMK_FORM_ACTION': 'csv',
-                'CMK_DWNLOAD_TOKEN': download_token,
-                'CMK_FORM_MODEL': '-1',
-                'CMK_FORM_CONTACTS': '-1',
-                'selectQualifs[7][]': ['76', '523'],
-                'selectGroups[]': campaign_values,
-                'selectGroup': 'on',
-                'dateprod[start]': start_date,
-                'dateprod[end]': end_date,
-                'dateType': '1',
-                'dateTraitement': f'Du {datetime.now().strftime("%d %B %Y")} Au {datetime.now().strftime("%d %B %Y")}',
-                'datetrait[start]': start_date,
-                'datetrait[end]': end_date,
-                'selectChamps[]': '',
-                'selectInputs[]': '-1'
-            }
-
-            # Add selectItem entries for each campaign value
-            for value in campaign_values:
-                payload['selectItem'] = value
+            payload = _build_export_payload(
+                campaign_values, start_date, end_date,
+                form_model=self.tenant.form_model, selected_qualifs=self.tenant.selected_qualifs
+            )
 
-            response = self.session.post(url, data=payload, verify=False)
-            
-            if response.status_code == 200:
-                # Try different encodings
-                encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                df = None
-                
-                for encoding in encodings:
-                    try:
-                        print(f"Trying encoding {encoding}")
-                        df = pd.read_csv(
-                            BytesIO(response.content),
-                            sep=';',
-                            encoding=encoding,
-                            on_bad_lines='skip'
-                        )
-                        if df is not None and not df.empty:
-                            print(f"Successfully read CSV with {encoding} encoding")
-                            break
-                    except Exception as e:
-                        print(f"Failed with encoding {encoding}: {str(e)}")
-                        continue
-                        
-                if df is None or df.empty:
-                    return {"error": "Failed to decode CSV data with any known encoding"}
-                
-                try:
-                    # Clean and convert the data
-                    df = df.fillna('')
-                    records = []
-                    for _, row in df.iterrows():
-                        clean_row = {}
-                        for col in df.columns:
-                            try:
-                                val = row[col]
-                                if pd.isna(val) or val == '':
-                                    clean_row[col] = None
-                                else:
-                                    clean_row[col] = str(val).encode('utf-8', errors='ignore').decode('utf-8')
-                            except Exception as e:
-                                print(f"Error processing column {col}: {str(e)}")
-                                clean_row[col] = None
-                        records.append(clean_row)
-                    
-                    return {"success": True, "data": records}
-                    
-                except Exception as e:
-                    print(f"Error during data conversion: {str(e)}")
-                    return {"error": f"Error converting data: {str(e)}"}
-            else:
-                return {"error": f"Failed to get data. Status code: {response.status_code}"}
+            with self.session.post(url, data=payload, verify=False, stream=True) as response:
+                if response.status_code != 200:
+                    return {"error": f"Failed to get data. Status code: {response.status_code}"}
+                df = _read_export_stream(response, self.base_url)
 
-        except Exception as e:
-            print("Error", e)
-            import traceback
-            traceback.print_exc()
-            return {"error": f"Error getting data: {str(e)}"}
+            if df is None:
+                return {"error": "Failed to decode CSV data with any known encoding"}
 
-    def get_data_as_json_full(self, start_date=None, end_date=None):
-        """Get CRM data as JSON"""
-        try:
-            # Use today's date as default
-            if not start_date:
-                start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
-            if not end_date:
-                end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
-            
-            # Get campaigns first
-            campaigns = self.get_campaigns(start_date, end_date)
-            if not campaigns:
-                return {"error": "Failed to get campaigns"}
-            
-            # Get campaign values for Prevoyance
-            campaign_values = [c['value'] for c in campaigns.get('Prevoyance', [])]
-            
-            # Export the data using the same payload as flashProdScript
-            url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
-            
-            # Generate unique download token
-            download_token = f"cmk_export_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            # Use the exact same payload as in flashProdScript
-            payload = {
-                'CMK_FORM_ACTION': 'csv',
-                'CMK_DWNLOAD_TOKEN': download_token,
-                'CMK_FORM_MODEL': '-1',
-                'CMK_FORM_CONTACTS': '-1',
-                'selectQualifs[7][]': [],
-                'selectGroups[]': campaign_values,
-                'selectGroup': 'on',
-                'dateprod[start]': start_date,
-                'dateprod[end]': end_date,
-                'dateType': '1',
-                'dateTraitement': f'Du {datetime.now().strftime("%d %B %Y")} Au {datetime.now().strftime("%d %B %Y")}',
-                'datetrait[start]': start_date,
-                'datetrait[end]': end_date,
-                'selectChamps[]': '',
-                'selectInputs[]': '-1'
-            }
-
-            # Add selectItem entries for each campaign value
-            for value in campaign_values:
-                payload['selectItem'] = value
+            try:
+                # Clean and convert the data
+                return {"success": True, "data": _frame_to_records(df)}
 
-            response = self.session.post(url, data=payload, verify=False)
-            
-            if response.status_code == 200:
-                # Try different encodings
-                encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                df = None
-                
-                for encoding in encodings:
-                    try:
-                        print(f"Trying encoding {encoding}")
-                        df = pd.read_csv(
-                            BytesIO(response.content),
-                            sep=';',
-                            encoding=encoding,
-                            on_bad_lines='skip'
-                        )
-                        if df is not None and not df.empty:
-                            print(f"Successfully read CSV with {encoding} encoding")
-                            break
-                    except Exception as e:
-                        print(f"Failed with encoding {encoding}: {str(e)}")
-                        continue
-                        
-                if df is None or df.empty:
-                    return {"error": "Failed to decode CSV data with any known encoding"}
-                
-                try:
-                    # Clean and convert the data
-                    df = df.fillna('')
-                    records = []
-                    for _, row in df.iterrows():
-                        clean_row = {}
-                        for col in df.columns:
-                            try:
-                                val = row[col]
-                                if pd.isna(val) or val == '':
-                                    clean_row[col] = None
-                                else:
-                                    clean_row[col] = str(val).encode('utf-8', errors='ignore').decode('utf-8')
-                            except Exception as e:
-                                print(f"Error processing column {col}: {str(e)}")
-                                clean_row[col] = None
-                        records.append(clean_row)
-                    
-                    return {"success": True, "data": records}
-                    
-                except Exception as e:
-                    print(f"Error during data conversion: {str(e)}")
-                    return {"error": f"Error converting data: {str(e)}"}
-            else:
-                return {"error": f"Failed to get data. Status code: {response.status_code}"}
+            except Exception as e:
+                print(f"Error during data conversion: {str(e)}")
+                return {"error": f"Error converting data: {str(e)}"}
 
         except Exception as e:
             print("Error", e)
@@ -785,8 +1073,44 @@ class CRMClient:
             traceback.print_exc()
             return {"error": f"Error getting data: {str(e)}"}
 
-    def get_data_as_json_full(self, start_date=None, end_date=None, page=1, page_size=1000):
-        """Get CRM data as JSON with pagination"""
+    def _export_frame(self, start_date, end_date, campaign_values):
+        """Export one range of the given campaigns as a DataFrame (None if the CSV cannot be decoded)"""
+        url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
+        payload = _build_export_payload(campaign_values, start_date, end_date, form_model=self.tenant.form_model)
+
+        # The body is parsed while it downloads instead of being buffered first
+        with self.session.post(url, data=payload, verify=False, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Failed to get data. Status code: {response.status_code}")
+            # Raw CSV text: dtypes inferred per shard or window would disagree once merged
+            # (ids and phone numbers losing their leading zeros in some of them only)
+            return _read_export_stream(response, self.base_url, dtype=str)
+
+    def _export_shard(self, start_date, end_date, campaign_values):
+        """Export one shard, retrying it on its own (CRM_SHARD_RETRIES times, with backoff)"""
+        retries = int(os.getenv("CRM_SHARD_RETRIES", 2))
+        for attempt in range(retries + 1):
+            try:
+                df = self._export_frame(start_date, end_date, campaign_values)
+                if df is None:
+                    raise Exception("Failed to decode CSV data with any known encoding")
+                return df
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"Shard {start_date} to {end_date} failed ({str(e)}), retry {attempt + 1}/{retries}")
+                time.sleep(2 ** attempt)
+
+    def get_export_frame(self, start_date=None, end_date=None, on_shard=None, allow_empty=False):
+        """
+        Export the tenant's campaign group and parse the CSV into a DataFrame.
+
+        Ranges spanning several days (or hours, see planner.plan_range) are
+        exported as shards on the upstream's shard pool, then merged
+        and deduplicated on CMK_S_FIELD_ID_UNIQUE. Shards still failing after
+        their retries are listed in "failed_shards" next to the partial frame.
+        on_shard(start, end, frame) is called for every exported shard.
+        """
         try:
             # Use today's date as default
             if not start_date:
@@ -794,108 +1118,48 @@ class CRMClient:
             if not end_date:
                 end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
             
-            # Get campaigns first
+            # Get campaigns first, once for the whole range
             campaigns = self.get_campaigns(start_date, end_date)
             if not campaigns:
                 return {"error": "Failed to get campaigns"}
             
-            # Get campaign values for Prevoyance
-            campaign_values = [c['value'] for c in campaigns.get('Prevoyance', [])]
-            
-            url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
-            download_token = f"cmk_export_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            payload = {
-                'CMK_FORM_ACTION': 'csv',
-                'CMK_DWNLOAD_TOKEN': download_token,
-                'CMK_FORM_MODEL': '-1',
-                'CMK_FORM_CONTACTS': '-1',
-                'selectGroups[]': campaign_values,
-                'selectGroup': 'on',
-                'dateprod[start]': start_date,
-                'dateprod[end]': end_date,
-                'dateType': '1',
-                'dateTraitement': f'Du {datetime.now().strftime("%d %B %Y")} Au {datetime.now().strftime("%d %B %Y")}',
-                'datetrait[start]': start_date,
-                'datetrait[end]': end_date,
-                'selectChamps[]': '',
-                'selectInputs[]': '-1'
-            }
+            # Get campaign values for the tenant's group
+            campaign_values = [c['value'] for c in campaigns.get(self.tenant.campaign_group, [])]
 
-            for value in campaign_values:
-                payload['selectItem'] = value
-
-            response = self.session.post(url, data=payload, verify=False)
-            
-            if response.status_code == 200:
-                encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                df = None
-                
-                for encoding in encodings:
-                    try:
-                        print(f"Trying encoding {encoding}")
-                        df = pd.read_csv(
-                            BytesIO(response.content),
-                            sep=';',
-                            encoding=encoding,
-                            on_bad_lines='skip'
-                        )
-                        if df is not None and not df.empty:
-                            print(f"Successfully read CSV with {encoding} encoding")
-                            break
-                    except Exception as e:
-                        print(f"Failed with encoding {encoding}: {str(e)}")
-                        continue
-                        
-                if df is None or df.empty:
+            shards = plan_range(start_date, end_date)
+            if len(shards) == 1:
+                df = self._export_frame(start_date, end_date, campaign_values)
+                if df is None or (df.empty and not allow_empty):
                     return {"error": "Failed to decode CSV data with any known encoding"}
-                
+                if on_shard is not None:
+                    on_shard(*shards[0], df)
+                return {"success": True, "frame": df}
+
+            frames, failed_shards = [], []
+            executor = _shard_executor(self.tenant.upstream)
+            futures = [executor.submit(self._export_shard, *shard, campaign_values) for shard in shards]
+            # Keep the shards in range order so the merged frame matches a single export
+            for shard, future in zip(shards, futures):
                 try:
-                    # Calculate total records and pages
-                    total_records = len(df)
-                    total_pages = (total_records + page_size - 1) // page_size
-                    
-                    # Calculate start and end indices for the requested page
-                    start_idx = (page - 1) * page_size
-                    end_idx = min(start_idx + page_size, total_records)
-                    
-                    # Get the subset of data for this page
-                    df_page = df.iloc[start_idx:end_idx]
-                    
-                    # Clean and convert the page data
-                    df_page = df_page.fillna('')
-                    records = []
-                    for _, row in df_page.iterrows():
-                        clean_row = {}
-                        for col in df_page.columns:
-                            try:
-                                val = row[col]
-                                if pd.isna(val) or val == '':
-                                    clean_row[col] = None
-                                else:
-                                    clean_row[col] = str(val).encode('utf-8', errors='ignore').decode('utf-8')
-                            except Exception as e:
-                                print(f"Error processing column {col}: {str(e)}")
-                                clean_row[col] = None
-                        records.append(clean_row)
-                    
-                    return {
-                        "success": True,
-                        "data": records,
-                        "pagination": {
-                            "page": page,
-                            "page_size": page_size,
-                            "total_records": total_records,
-                            "total_pages": total_pages
-                        }
-                    }
-                    
+                    frames.append(future.result())
+                    if on_shard is not None:
+                        on_shard(*shard, frames[-1])
                 except Exception as e:
-                    print(f"Error during data conversion: {str(e)}")
-                    return {"error": f"Error converting data: {str(e)}"}
-            
-            else: 
-                return {"error": f"Failed to get data. Status code: {response.status_code}"}
+                    print(f"Shard {shard[0]} to {shard[1]} failed: {str(e)}")
+                    failed_shards.append({"start": shard[0], "end": shard[1], "error": str(e)})
+
+            if len(failed_shards) == len(shards):
+                return {"error": f"All {len(shards)} shards failed: {failed_shards[0]['error']}"}
+
+            df = _merge_frames(frames)
+            if df.empty and not failed_shards and not allow_empty:
+                return {"error": "No data exported for the range"}
+
+            print(f"Exported {len(shards)} shards ({len(failed_shards)} failed): {len(df)} rows")
+            result = {"success": True, "frame": df, "shards": len(shards)}
+            if failed_shards:
+                result["failed_shards"] = failed_shards
+            return result
 
         except Exception as e:
             print("Error", e)
@@ -903,6 +1167,108 @@ class CRMClient:
             traceback.print_exc()
             return {"error": f"Error getting data: {str(e)}"}
 
+    def _store_closed_day(self, shard_start, shard_end, df):
+        """Keep the export of a whole closed day in the record store"""
+        day = shard_start[:10]
+        whole_day = shard_start.endswith("00:00:00") and shard_end.endswith("23:59:59") and shard_end[:10] == day
+        if not whole_day or day >= datetime.now().strftime("%Y-%m-%d") or self.record_store.is_sealed(day):
+            return
+        try:
+            self.record_store.write_day(day, _batch_to_frame(_frame_to_batch(df)))
+        except Exception as e:
+            print(f"Error storing CRM day {day}: {str(e)}")
+
+    def _history_segments(self, start_date, end_date):
+        """[source, start, end] runs of a range in order: "store" for sealed past days, "crm" for the rest"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        segments = []
+        for shard_start, shard_end in plan_range(start_date, end_date, "day"):
+            day = shard_start[:10]
+            whole_day = shard_start.endswith("00:00:00") and shard_end.endswith("23:59:59")
+            source = "store" if whole_day and day < today and self.record_store.is_sealed(day) else "crm"
+            if segments and segments[-1][0] == source == "crm":
+                segments[-1][2] = shard_end
+            else:
+                segments.append([source, shard_start, shard_end])
+        return segments
+
+    def get_history_frame(self, start_date=None, end_date=None):
+        """
+        get_export_frame answered from the record store where it can: sealed
+        whole days come from their local partition, the rest of the range
+        (today, partial days, days not stored yet) is exported from the CRM,
+        and closed days exported whole are stored for the next time.
+        """
+        if self.record_store is None:
+            return self.get_export_frame(start_date, end_date)
+
+        segments = self._history_segments(start_date, end_date)
+        if all(source == "crm" for source, _, _ in segments):
+            return self.get_export_frame(start_date, end_date, on_shard=self._store_closed_day)
+
+        frames, failed_shards, stored_days = [], [], 0
+        for source, segment_start, segment_end in segments:
+            if source == "store":
+                frames.append(self.record_store.read_day(segment_start[:10]))
+                stored_days += 1
+                continue
+            result = self.get_export_frame(
+                segment_start, segment_end, on_shard=self._store_closed_day, allow_empty=True
+            )
+            if "error" in result:
+                failed_shards.append({"start": segment_start, "end": segment_end, "error": result["error"]})
+                continue
+            frames.append(result["frame"])
+            failed_shards.extend(result.get("failed_shards", []))
+
+        df = _merge_frames(frames)
+
+        print(f"Served {stored_days} days from the record store, {len(segments) - stored_days} ranges from the CRM")
+        result = {"success": True, "frame": df, "stored_days": stored_days}
+        if failed_shards:
+            result["failed_shards"] = failed_shards
+        return result
+
+    def get_data_as_json_full(self, start_date=None, end_date=None, page=1, page_size=1000):
+        """Get CRM data as JSON with pagination"""
+        result = self.get_history_frame(start_date, end_date)
+        if "error" in result:
+            return result
+
+        try:
+            paginated = _paginate_frame(result["frame"], page, page_size)
+            if "failed_shards" in result:
+                paginated["failed_shards"] = result["failed_shards"]
+            return paginated
+
+        except Exception as e:
+            print(f"Error during data conversion: {str(e)}")
+            return {"error": f"Error converting data: {str(e)}"}
+
+    def iter_data_records(self, start_date=None, end_date=None, chunk_size=1000):
+        """Export the tenant's campaign group and yield the records in batches as they are parsed"""
+        # Use today's date as default
+        if not start_date:
+            start_date = datetime.now().strftime("%Y-%m-%d 00:00:00")
+        if not end_date:
+            end_date = datetime.now().strftime("%Y-%m-%d 23:59:59")
+
+        campaigns = self.get_campaigns(start_date, end_date)
+        if not campaigns:
+            raise Exception("Failed to get campaigns")
+
+        campaign_values = [c['value'] for c in campaigns.get(self.tenant.campaign_group, [])]
+
+        url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
+        payload = _build_export_payload(campaign_values, start_date, end_date, form_model=self.tenant.form_model)
+
+        with self.session.post(url, data=payload, verify=False, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Failed to get data. Status code: {response.status_code}")
+
+            for chunk in _iter_export_stream(response, chunk_size, self.base_url):
+                yield _frame_to_records(chunk)
+
     def close(self):
         """Close the client's session"""
         try:
@@ -917,70 +1283,18 @@ class CRMClient:
         try:
             url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/getQualifCampagnes"
             
-            # Prepare payload
-            payload = {f'campagnes[]': campaign_ids} if isinstance(campaign_ids, str) else {
-                f'campagnes[]': id for id in campaign_ids
-            }
+            # One campagnes[] pair per campaign so a single call covers all of them
+            if isinstance(campaign_ids, str):
+                campaign_ids = [campaign_ids]
+            payload = [('campagnes[]', campaign_id) for campaign_id in campaign_ids]
             
             response = self.session.post(url, data=payload, verify=False)
             
             if response.status_code != 200:
                 return {"error": f"Failed to fetch qualifications. Status code: {response.status_code}"}
             
-            data = response.json()
-            
-            # Define positive qualification names
-            positive_names = {
-                "Vente", "Transfert", "Vente Reprise", "Transfert Reprise"
-            }
-            
-            # Define callback qualification names
-            callback_names = {
-                "Rappel", "Rappel General", "NRP", "Répondeur"
-            }
-            
-            # Parse and organize qualifications by campaign
-            parsed_qualifs = {}
-            
-            for campaign in data:
-                campaign_id = campaign['li_attr']['num_campagne']
-                campaign_name = campaign['text']
-                
-                qualifs = {
-                    "campaign_id": campaign_id,
-                    "campaign_name": campaign_name,
-                    "sales_qualifs": [],      # Ventes et transferts
-                    "callback_qualifs": [],   # Rappels et NRP
-                    "rejection_qualifs": [],  # Refus et autres négatifs
-                    "other_qualifs": []      # Autres qualifications
-                }
-                
-                # Process children (qualifications)
-                for qualif in campaign['children']:
-                    qualif_data = {
-                        "id": qualif['li_attr']['num_qualif'],
-                        "name": qualif['text'],
-                        "type": qualif['li_attr']['type'],
-                        "argumente": qualif['li_attr']['argumente'],
-                        "type_qualif": qualif['li_attr']['type_qualif'],
-                        "man_auto": qualif['li_attr']['man_auto']
-                    }
-                    
-                    # Categorize based on name and business logic
-                    name = qualif['text']
-                    if name in positive_names:
-                        qualifs["sales_qualifs"].append(qualif_data)
-                    elif name in callback_names:
-                        qualifs["callback_qualifs"].append(qualif_data)
-                    elif name.startswith("Refus") or name in {
-                        "Bloctel", "Pas interssé", "Ne pas Appeler", "Faux numero",
-                        "Hors cible", "CMU", "LIVRET A / Pas de Compte"
-                    }:
-                        qualifs["rejection_qualifs"].append(qualif_data)
-                    else:
-                        qualifs["other_qualifs"].append(qualif_data)
-                
-                parsed_qualifs[campaign_id] = qualifs
+            parsed_qualifs = _parse_qualif_campaigns(response.json())
+            self.qualification_catalog.update(parsed_qualifs)
                 
             return {
                 "success": True,
@@ -993,122 +1307,153 @@ class CRMClient:
             traceback.print_exc()
             return {"error": str(e)}
 
-    def search_data(self, campaign_ids=None, qualif_types=None, qualif_ids=None, 
-                    start_date=None, end_date=None):
-        """Dynamic search for CRM data"""
-        try:
-            # Set default dates to today if not provided
-            today = datetime.now().strftime("%Y-%m-%d")
-            if not start_date:
-                start_date = f"{today} 00:00:00"
-            if not end_date:
-                end_date = f"{today} 23:59:59"
-
-            print(f"\n=== Search Data Debug ===")
-            print(f"Date range: {start_date} to {end_date}")
-            print(f"Campaign IDs: {campaign_ids}")
-            print(f"Qualif types: {qualif_types}")
-            print(f"Initial qualif IDs: {qualif_ids}")
-
-            # Get campaigns if not provided
-            if not campaign_ids:
-                campaigns_result = self.get_campaigns(start_date, end_date)
-                if campaigns_result and 'Prevoyance' in campaigns_result:
-                    campaign_ids = [c['value'] for c in campaigns_result['Prevoyance']]
-                    print(f"Auto-selected campaigns: {campaign_ids}")
-
-            # Get qualifications if qualif_types provided but no specific IDs
-            if qualif_types and not qualif_ids:
-                qualifs_result = self.get_campaign_qualifs(campaign_ids[0])
-                if "success" in qualifs_result and qualifs_result["success"]:
-                    qualif_ids = []
-                    campaign_data = list(qualifs_result["data"].values())[0]
-                    for qualif_type in qualif_types:
-                        qualif_ids.extend([q["id"] for q in campaign_data[qualif_type]])
-                    print(f"Selected qualif IDs based on types {qualif_types}: {qualif_ids}")
-
-            # Generate unique download token
-            download_token = f"cmk_export_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-
-            # Base payload with single values
-            base_payload = {
-                'CMK_FORM_ACTION': 'display',
-                'CMK_DWNLOAD_TOKEN': '',
-                'CMK_FORM_MODEL': '-1',
-                'CMK_FORM_CONTACTS': '-1',
-                'selectGroup': 'on',
-                'dateprod[start]': start_date,
-                'dateprod[end]': end_date,
-                'dateType': '1',
-                'qualifType': '1',  # Changed back to '1'
-                'dateTraitement': f'Du {datetime.strptime(start_date.split()[0], "%Y-%m-%d").strftime("%d %B %Y")} Au {datetime.strptime(end_date.split()[0], "%Y-%m-%d").strftime("%d %B %Y")}',
-                'datetrait[start]': start_date,
-                'datetrait[end]': end_date,
-                'selectChamps[]': '',
-                'selectInputs[]': '-1'
-            }
+    def resolve_qualifs(self, campaign_ids, qualif_types, start_date, end_date):
+        """
+        Qualification ids of the given types grouped by num_campagne for the
+        searched campaigns (selectGroups values). Campaigns missing from the
+        catalog are fetched together in one getQualifCampagnes call; the
+        catalog memoizes the result per (campaigns, types). Raises if some
+        campaigns are still unknown, rather than searching with a filter
+        that leaves their qualifications out.
+        """
+        campaigns = self.get_campaigns(start_date, end_date) or {}
+        value_to_num = {c['value']: c['num_campagne'] for group in campaigns.values() for c in group}
+        nums = {str(campaign_id): value_to_num.get(str(campaign_id), str(campaign_id)) for campaign_id in campaign_ids}
+
+        missing = set(self.qualification_catalog.missing(nums.values()))
+        if missing:
+            self.get_campaign_qualifs([value for value, num in nums.items() if num in missing])
+            missing = set(self.qualification_catalog.missing(nums.values()))
+            if missing:
+                raise Exception(f"Failed to get the qualifications of campaigns {sorted(missing)}")
+        return self.qualification_catalog.resolve(qualif_types, nums.values())
+
+    def _search_payload(self, campaign_ids, qualif_types, qualif_ids, start_date, end_date):
+        """Display-mode search payload (list of tuples, several keys repeat)"""
+        # Get campaigns if not provided
+        if not campaign_ids:
+            campaigns_result = self.get_campaigns(start_date, end_date)
+            if campaigns_result and self.tenant.campaign_group in campaigns_result:
+                campaign_ids = [c['value'] for c in campaigns_result[self.tenant.campaign_group]]
+
+        # Get qualifications if qualif_types provided but no specific IDs
+        selected_qualifs = {}
+        if qualif_types and not qualif_ids:
+            selected_qualifs = self.resolve_qualifs(campaign_ids or [], qualif_types, start_date, end_date)
+        elif qualif_ids:
+            # Explicit ids go under their own campaign when the catalog knows it
+            for qualif_id in qualif_ids:
+                qualif = self.qualification_catalog.qualif(qualif_id)
+                campaign_num = qualif["campaign_id"] if qualif else '7'
+                selected_qualifs.setdefault(campaign_num, []).append(qualif_id)
+
+        # Base payload with single values
+        base_payload = {
+            'CMK_FORM_ACTION': 'display',
+            'CMK_DWNLOAD_TOKEN': '',
+            'CMK_FORM_MODEL': '-1',
+            'CMK_FORM_CONTACTS': '-1',
+            'selectGroup': 'on',
+            'dateprod[start]': start_date,
+            'dateprod[end]': end_date,
+            'dateType': '1',
+            'qualifType': '1',  # Changed back to '1'
+            'dateTraitement': f'Du {datetime.strptime(start_date.split()[0], "%Y-%m-%d").strftime("%d %B %Y")} Au {datetime.strptime(end_date.split()[0], "%Y-%m-%d").strftime("%d %B %Y")}',
+            'datetrait[start]': start_date,
+            'datetrait[end]': end_date,
+            'selectChamps[]': '',
+            'selectInputs[]': '-1'
+        }
 
-            # Create a list for items that can have multiple values
-            multi_value_items = []
+        # Create a list for items that can have multiple values
+        multi_value_items = []
 
-            # Add campaign IDs
-            if campaign_ids:
-                for campaign_id in campaign_ids:
-                    multi_value_items.extend([
-                        ('selectGroups[]', campaign_id),
-                        ('selectItem', campaign_id)
-                    ])
+        # Add campaign IDs
+        if campaign_ids:
+            for campaign_id in campaign_ids:
+                multi_value_items.extend([
+                    ('selectGroups[]', campaign_id),
+                    ('selectItem', campaign_id)
+                ])
 
-            # Add qualification IDs
-            if qualif_ids:
-                for qualif_id in qualif_ids:
-                    multi_value_items.append(('selectQualifs[7][]', qualif_id))
+        # Add qualification IDs, keyed by the campaign they belong to
+        for campaign_num, ids in selected_qualifs.items():
+            for qualif_id in ids:
+                multi_value_items.append((f'selectQualifs[{campaign_num}][]', qualif_id))
 
-            # Add default system qualifs (as seen in the example)
-            for i in range(10, 31):
-                multi_value_items.append(('selectQualifs[-1][]', f'-{i}'))
+        # Add default system qualifs (as seen in the example)
+        for i in range(10, 31):
+            multi_value_items.append(('selectQualifs[-1][]', f'-{i}'))
 
-            print("\n=== Request Details ===")
-            print(f"URL: {self.base_url}/vvci/gestioncontacts/gestioncontacts/search")
-            print(f"Headers: {dict(self.session.headers)}")
+        return [(k, v) for k, v in base_payload.items()] + multi_value_items
 
-            # Convert base_payload to list of tuples and combine with multi_value_items
-            final_payload = [(k, v) for k, v in base_payload.items()] + multi_value_items
-            print(f"Final Payload: {final_payload}")
+    def _search_page(self, payload, offset=0, limit=None):
+        """
+        One display-mode search request. With a limit, only that slice is asked
+        for through the display table's start/length paging parameters. When
+        the upstream ignores them, the slice is cut locally and the full
+        result set is returned as "all_data" so callers can page it without
+        downloading it again.
+        """
+        if limit is not None:
+            payload = payload + [('start', str(offset)), ('length', str(limit))]
 
-            # Make the search request
-            url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
-            response = self.session.post(url, data=final_payload, verify=False)
+        url = f"{self.base_url}/vvci/gestioncontacts/gestioncontacts/search"
+        response = self.session.post(url, data=payload, verify=False)
+        if response.status_code != 200:
+            return {"error": f"Search request failed with status {response.status_code}"}
 
-            print("\n=== Response Details ===")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response Headers: {dict(response.headers)}")
-            print(f"Response Content (first 1000 chars): {response.text[:1000]}")
+        try:
+            data = response.json()
+        except json.JSONDecodeError as e:
+            print(f"Search JSON decode error: {str(e)} (first 200 chars: {response.text[:200]!r})")
+            return {"error": "Failed to parse response JSON"}
+
+        rows = data.get("data", [])
+        total = int(data.get("countresult", 0) or 0)
+        if limit is None:
+            return {"data": rows[offset:], "total": total}
+        if len(rows) > limit or (offset and len(rows) == total):
+            # Upstream ignored the paging parameters: slice locally
+            self.search_paging = False
+            return {"data": rows[offset:offset + limit], "total": total, "all_data": rows}
+        if total > limit:
+            self.search_paging = True
+        return {"data": rows, "total": total}
+
+    def search_data(self, campaign_ids=None, qualif_types=None, qualif_ids=None,
+                    start_date=None, end_date=None, offset=0, limit=None):
+        """Dynamic search for CRM data, optionally one offset/limit page of it"""
+        try:
+            # Set default dates to today if not provided
+            today = datetime.now().strftime("%Y-%m-%d")
+            if not start_date:
+                start_date = f"{today} 00:00:00"
+            if not end_date:
+                end_date = f"{today} 23:59:59"
 
-            if response.status_code != 200:
-                return {"error": f"Search request failed with status {response.status_code}"}
+            payload = self._search_payload(campaign_ids, qualif_types, qualif_ids, start_date, end_date)
+            page = self._search_page(payload, offset, limit)
+            if "error" in page:
+                return page
 
-            # Parse the response
-            try:
-                data = response.json()
-                print("\n=== Parsed Response ===")
-                print(f"Response Keys: {data.keys()}")
-                print(f"Data Length: {len(data.get('data', []))}")
-                print(f"Count Result: {data.get('countresult', 0)}")
-                
-                return {
-                    "success": True,
-                    "data": data.get("data", []),
-                    "total": data.get("countresult", 0),
-                    "date_range": {
-                        "start": start_date,
-                        "end": end_date
-                    }
+            print(f"CRM search {start_date} to {end_date}: {len(page['data'])} of {page['total']} rows (offset {offset})")
+            result = {
+                "success": True,
+                "data": page["data"],
+                "total": page["total"],
+                "date_range": {
+                    "start": start_date,
+                    "end": end_date
+                }
+            }
+            if limit is not None:
+                result["pagination"] = {
+                    "offset": offset,
+                    "limit": limit,
+                    "has_more": offset + len(page["data"]) < page["total"]
                 }
-            except json.JSONDecodeError as e:
-                print(f"\nJSON Decode Error: {str(e)}")
-                print(f"Raw Response: {response.text}")
-                return {"error": "Failed to parse response JSON"}
+            return result
 
         except Exception as e:
             print(f"\nError in search_data: {str(e)}")
@@ -1116,102 +1461,255 @@ class CRMClient:
             traceback.print_exc()
             return {"error": str(e)}
 
+    def iter_search_records(self, campaign_ids=None, qualif_types=None, qualif_ids=None,
+                            start_date=None, end_date=None, page_size=500):
+        """
+        Yield the search results page by page from the display endpoint, so
+        memory depends on page_size rather than on the size of the result set
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        start_date = start_date or f"{today} 00:00:00"
+        end_date = end_date or f"{today} 23:59:59"
+
+        payload = self._search_payload(campaign_ids, qualif_types, qualif_ids, start_date, end_date)
+        offset = 0
+        while True:
+            page = self._search_page(payload, offset, page_size)
+            if "error" in page:
+                raise Exception(page["error"])
+            if "all_data" in page:
+                # The whole result set came back: page it locally instead of fetching it again per page
+                rows = page["all_data"]
+                for start in range(offset, len(rows), page_size):
+                    yield rows[start:start + page_size]
+                return
+            if not page["data"]:
+                return
+            yield page["data"]
+            offset += len(page["data"])
+            if offset >= page["total"]:
+                return
+
+class CRMClientFormaExpert(CRMClient):
+    """The formaexpert tenant (Energie_Rabat campaigns)"""
+    def __init__(self):
+        super().__init__(TENANTS["formaexpert"])
+
+
 class CRMIncrementalClient(CRMClient):
     def __init__(self):
         super().__init__()
         self.last_fetch_file = "last_fetch.json"
         self.load_last_fetch()
+        # Ids delivered by earlier runs, in any worker (CRM_SEEN_INDEX=0 to disable)
+        self.seen_index = SeenIndex(namespace=self.tenant.name) if os.getenv("CRM_SEEN_INDEX", "1") != "0" else None
+        # Window sizes learned from past exports (CRM_ADAPTIVE_INTERVALS=0 for fixed 15-minute windows)
+        self.interval_planner = (
+            IntervalPlanner(namespace=self.tenant.name) if os.getenv("CRM_ADAPTIVE_INTERVALS", "1") != "0" else None
+        )
         
+    def _read_last_fetch(self):
+        if not os.path.exists(self.last_fetch_file):
+            return None
+        with open(self.last_fetch_file, 'r') as f:
+            data = json.load(f)
+        return datetime.fromisoformat(data.get('last_fetch', '2024-01-01 00:00:00'))
+
     def load_last_fetch(self):
         """Load the last fetch time from file"""
         try:
-            if os.path.exists(self.last_fetch_file):
-                with open(self.last_fetch_file, 'r') as f:
-                    data = json.load(f)
-                    self.last_fetch_time = datetime.fromisoformat(data.get('last_fetch', '2024-01-01 00:00:00'))
-            else:
-                # Default to start of year if no file exists
-                self.last_fetch_time = datetime(2024, 1, 1)
+            # Default to start of year if no file exists
+            self.last_fetch_time = self._read_last_fetch() or datetime(2024, 1, 1)
         except Exception as e:
             print(f"Error loading last fetch time: {e}")
             self.last_fetch_time = datetime(2024, 1, 1)
 
     def save_last_fetch(self, fetch_time):
-        """Save the last fetch time to file"""
+        """
+        Checkpoint the last fetch time: written to a temp file then renamed
+        over last_fetch.json so a crash never leaves a torn file, and never
+        moved back behind a checkpoint another worker already wrote
+        """
         try:
-            with open(self.last_fetch_file, 'w') as f:
+            stored = self._read_last_fetch()
+            if stored is not None and stored > fetch_time:
+                return
+            tmp_path = f"{self.last_fetch_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
                 json.dump({
                     'last_fetch': fetch_time.isoformat()
                 }, f)
+            os.replace(tmp_path, self.last_fetch_file)
+            self.last_fetch_time = fetch_time
         except Exception as e:
             print(f"Error saving last fetch time: {e}")
 
-    def get_incremental_data(self, current_time=None):
-        """Get data since last fetch in 15-minute chunks"""
+    def count_rows(self, start_time, end_time):
+        """
+        countresult of a one-row display search over the range, None if it
+        fails or if the upstream ignores paging (the probe would download
+        every row of the range just to read the total)
+        """
+        if self.search_paging is False:
+            return None
         try:
-            if current_time is None:
-                current_time = datetime.now()
-
-            # If we've never fetched or it's been more than a day, limit to last 24 hours
-            if (current_time - self.last_fetch_time).days >= 1:
-                self.last_fetch_time = current_time - timedelta(days=1)
-
-            # Calculate time ranges for all 15-minute intervals we need to fetch
-            time_ranges = []
-            interval_start = self.last_fetch_time
-            while interval_start < current_time:
-                interval_end = min(
-                    interval_start + timedelta(minutes=15),
-                    current_time
-                )
-                time_ranges.append((interval_start, interval_end))
-                interval_start = interval_end
-
-            all_records = []
-            total_records = 0
+            payload = self._search_payload(
+                None, None, None, start_time.strftime("%Y-%m-%d %H:%M:%S"), end_time.strftime("%Y-%m-%d %H:%M:%S")
+            )
+            page = self._search_page(payload, 0, 1)
+            return None if "error" in page else page["total"]
+        except Exception as e:
+            print(f"Error counting rows from {start_time} to {end_time}: {str(e)}")
+            return None
 
-            # Fetch data for each time range
-            for start_time, end_time in time_ranges:
-                try:
-                    print(f"Fetching data from {start_time} to {end_time}")
-                    result = self.get_data_as_json_full(
-                        start_date=start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                        end_date=end_time.strftime("%Y-%m-%d %H:%M:%S")
-                    )
+    def _incremental_ranges(self, current_time):
+        """Windows from the last fetch (at most a day back) up to current_time"""
+        # Resume from the latest checkpoint, whichever worker wrote it
+        self.load_last_fetch()
 
-                    if result.get("success") and "data" in result:
-                        # Filter out duplicates based on unique identifier
-                        new_records = []
-                        seen_ids = set()
-                        for record in result["data"]:
-                            record_id = record.get("CMK_S_FIELD_ID_UNIQUE")
-                            if record_id and record_id not in seen_ids:
-                                seen_ids.add(record_id)
-                                new_records.append(record)
+        # If we've never fetched or it's been more than a day, limit to last 24 hours
+        if (current_time - self.last_fetch_time).days >= 1:
+            self.last_fetch_time = current_time - timedelta(days=1)
+
+        if self.interval_planner is not None:
+            return self.interval_planner.plan(self.last_fetch_time, current_time, count_fn=self.count_rows)
+
+        time_ranges = []
+        interval_start = self.last_fetch_time
+        while interval_start < current_time:
+            # Windows never cross midnight: each one holds the records of a single day
+            interval_end = min(
+                interval_start + timedelta(minutes=15),
+                interval_start.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1),
+                current_time
+            )
+            time_ranges.append((interval_start, interval_end))
+            interval_start = interval_end
+        return time_ranges
+
+    def _fetch_interval(self, start_time, end_time, campaign_values):
+        """Export one window; errors are returned so one bad window doesn't stop the run"""
+        # dateprod bounds are inclusive: a window ending at midnight stops at 23:59:59
+        # so the records of the next day only come with the next window
+        if end_time.time() == datetime.min.time() and end_time > start_time:
+            end_time = end_time - timedelta(seconds=1)
+        try:
+            df = self._export_frame(
+                start_time.strftime("%Y-%m-%d %H:%M:%S"), end_time.strftime("%Y-%m-%d %H:%M:%S"), campaign_values
+            )
+            if df is None:
+                return None, "Failed to decode CSV data with any known encoding"
+            return df, None
+        except Exception as e:
+            return None, str(e)
 
-                        all_records.extend(new_records)
-                        total_records += len(new_records)
-                        print(f"Found {len(new_records)} new records in this interval")
+    def iter_incremental_batches(self, current_time=None, stats=None):
+        """
+        Fetch the windows since the last fetch (sized by the interval planner,
+        15 minutes when it is disabled), CRM_INCREMENTAL_WORKERS
+        at a time, and yield each window's new records (a RecordBatch) in
+        window order as soon as it and the windows before it are done.
+        The campaigns are looked up once for the whole run.
+
+        The watermark is checkpointed after every delivered window, up to the
+        first failed one, so an interrupted run resumes where it stopped and
+        empty windows are not fetched again.
+        """
+        if current_time is None:
+            current_time = datetime.now()
+        time_ranges = self._incremental_ranges(current_time)
+        stats = stats if stats is not None else {}
+        stats.update({
+            "total_records": 0,
+            "intervals_processed": len(time_ranges),
+            "failed_intervals": [],
+            "time_range": {"start": self.last_fetch_time.isoformat(), "end": current_time.isoformat()}
+        })
+        if not time_ranges:
+            return
+
+        campaigns = self.get_campaigns(
+            time_ranges[0][0].strftime("%Y-%m-%d %H:%M:%S"), current_time.strftime("%Y-%m-%d %H:%M:%S")
+        )
+        if not campaigns:
+            raise Exception("Failed to get campaigns")
+        campaign_values = [c['value'] for c in campaigns.get(self.tenant.campaign_group, [])]
+
+        workers = max(1, int(os.getenv("CRM_INCREMENTAL_WORKERS", 4)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crm-incremental")
+        pending = deque()
+        upcoming = iter(time_ranges)
+        seen = set()
+        # Windows are delivered in order: the watermark follows them until one fails
+        contiguous = True
+        try:
+            while True:
+                # Keep a bounded number of windows ahead of the one being yielded
+                while len(pending) < workers * 2:
+                    window = next(upcoming, None)
+                    if window is None:
+                        break
+                    pending.append((window, executor.submit(self._fetch_interval, *window, campaign_values)))
+                if not pending:
+                    break
 
-                except Exception as e:
-                    print(f"Error fetching interval {start_time} to {end_time}: {e}")
+                (start_time, end_time), future = pending.popleft()
+                df, error = future.result()
+                if error:
+                    print(f"Error fetching interval {start_time} to {end_time}: {error}")
+                    stats["failed_intervals"].append({"start": start_time.isoformat(), "end": end_time.isoformat()})
+                    contiguous = False
                     continue
+                if self.interval_planner is not None:
+                    self.interval_planner.observe(start_time, end_time, len(df))
+
+                window_records = _frame_to_batch(df)
+                if self.record_store is not None:
+                    # The whole window goes to the store, rows delivered before or without an id
+                    # included; windows stay within one day, so that is the day of their records
+                    self.record_store.append(start_time.strftime("%Y-%m-%d"), _batch_to_frame(window_records))
+
+                # Filter out duplicates based on unique identifier, across windows
+                new_records = window_records.unique("CMK_S_FIELD_ID_UNIQUE", seen)
+                fresh = set()
+                if self.seen_index is not None and len(new_records):
+                    # ...and records already delivered by previous runs
+                    ids = new_records.column("CMK_S_FIELD_ID_UNIQUE")
+                    fresh = self.seen_index.claim(ids)
+                    new_records = new_records.take([i for i, record_id in enumerate(ids) if str(record_id) in fresh])
+                stats["total_records"] += len(new_records)
+                print(f"Found {len(new_records)} new records from {start_time} to {end_time}")
+                try:
+                    yield new_records
+                except BaseException:
+                    # Closed (e.g. client disconnect) before the batch was taken: hand the ids out again next run
+                    if fresh:
+                        self.seen_index.release(fresh)
+                    raise
+
+                # The consumer took the window: checkpoint it
+                if contiguous:
+                    self.save_last_fetch(end_time)
+                    if self.record_store is not None:
+                        self.record_store.mark_covered(start_time, end_time)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self.interval_planner is not None:
+                self.interval_planner.save()
+
+    def get_incremental_data(self, current_time=None):
+        """Get data since last fetch in adaptive (or 15-minute) windows"""
+        try:
+            if current_time is None:
+                current_time = datetime.now()
 
-            # Update last fetch time only if we successfully got data
-            if all_records:
-                self.save_last_fetch(current_time)
+            stats = {}
+            batches = list(self.iter_incremental_batches(current_time, stats))
 
             return {
                 "success": True,
-                "data": all_records,
-                "metadata": {
-                    "total_records": total_records,
-                    "intervals_processed": len(time_ranges),
-                    "time_range": {
-                        "start": self.last_fetch_time.isoformat(),
-                        "end": current_time.isoformat()
-                    }
-                }
+                "data": RecordBatch.concat(batches),
+                "metadata": stats
             }
 
         except Exception as e:
@@ -1238,6 +1736,8 @@ class BaseProxyClient:
     def __init__(self):
         self.session = requests.Session()
         self.current_proxy = None
+        # Reentrant: locked methods call each other (see _synchronized)
+        self.lock = threading.RLock()
         
         # Configure session with retries
         self.session.mount('https://', requests.adapters.HTTPAdapter(
@@ -1290,6 +1790,7 @@ class ERPClient(BaseProxyClient):
         # Initialize stored data
         self.stored_data = pd.DataFrame()
 
+    @_synchronized
     def login(self, email, password):
         """Login to the ERP system"""
         try:
@@ -1374,8 +1875,18 @@ class ERPClient(BaseProxyClient):
             traceback.print_exc()
             return False
 
-    def get_contracts_as_json(self, force_full_refresh=False):
-        """Get ERP contracts data as JSON with incremental loading, including daily and weekly stats"""
+    def check_login(self):
+        """Check the session is still authenticated: the dashboard does not redirect to the login page"""
+        try:
+            response = self.session.get(f"{self.base_url}/dashboard", verify=False)
+            return response.status_code == 200 and 'login' not in response.url
+        except Exception as e:
+            print(f"Error checking ERP login status: {str(e)}")
+            return False
+
+    @_synchronized
+    def refresh_contracts(self, force_full_refresh=False):
+        """Refresh stored_data with a full export or the contracts added since the last fetch"""
         try:
             # Get CSRF token for the request
             csrf_token = self.session.cookies.get('XSRF-TOKEN')
@@ -1392,95 +1903,13 @@ class ERPClient(BaseProxyClient):
 
                 if response.status_code == 200:
                     try:
-                        # Save response content to a temporary file
-                        temp_file = BytesIO(response.content)
-                        
                         # Try to detect file type from content
                         content_type = response.headers.get('Content-Type', '').lower()
                         print(f"Content-Type: {content_type}")
-                        
-                        # Try reading with different methods
-                        read_methods = [
-                            # Try openpyxl first for xlsx
-                            lambda: pd.read_excel(
-                                temp_file,
-                                engine='openpyxl'
-                            ),
-                            # Try odf for ods files
-                            lambda: pd.read_excel(
-                                temp_file,
-                                engine='odf'
-                            ),
-                            # Try CSV with different encodings
-                            lambda: pd.read_csv(
-                                temp_file,
-                                encoding='utf-8'
-                            ),
-                            lambda: pd.read_csv(
-                                temp_file,
-                                encoding='latin1'
-                            ),
-                            lambda: pd.read_csv(
-                                temp_file,
-                                encoding='iso-8859-1'
-                            )
-                        ]
-                        
-                        last_error = None
-                        for read_method in read_methods:
-                            try:
-                                temp_file.seek(0)  # Reset file pointer
-                                self.stored_data = read_method()
-                                if not self.stored_data.empty:
-                                    print("Successfully read data")
-                                    break
-                            except Exception as e:
-                                print(f"Read attempt failed: {str(e)}")
-                                last_error = e
-                                continue
-                        
-                        if self.stored_data is None or self.stored_data.empty:
-                            raise Exception(f"Failed to read data with any method. Last error: {str(last_error)}")
-
-                        # Clean the data
-                        self.stored_data = self.stored_data.replace({pd.NA: None})
-                        self.stored_data = self.stored_data.fillna('')
-                        
-                        # Convert dates to standard format
-                        for col in self.stored_data.columns:
-                            try:
-                                if self.stored_data[col].dtype == 'object':
-                                    # Try to convert to datetime
-                                    self.stored_data[col] = pd.to_datetime(
-                                        self.stored_data[col], 
-                                        errors='ignore',
-                                        format='mixed'
-                                    )
-                            except Exception as e:
-                                print(f"Error converting column {col}: {str(e)}")
-                                continue
-                        
-                        # Format datetime columns
-                        date_columns = self.stored_data.select_dtypes(include=['datetime64']).columns
-                        for col in date_columns:
-                            self.stored_data[col] = self.stored_data[col].dt.strftime('%Y-%m-%d %H:%M:%S')
 
-                        self.last_fetch_time = datetime.now()
+                        self._store_full_export(response.content)
 
-                        # Convert to JSON
-                        json_data = self.stored_data.to_dict(orient='records')
-
-                        # Get daily and weekly stats
-                        daily_stats = self.get_daily_stats()
-                        weekly_stats = self.get_weekly_stats()
-
-                        return {
-                            "success": True,
-                            "data": json_data,
-                            "type": "full_refresh",
-                            "daily_stats": daily_stats,
-                            "weekly_stats": weekly_stats
-                        }
+                        return {"success": True, "type": "full_refresh"}
 
                     except Exception as e:
                         print(f"Error processing data: {str(e)}")
@@ -1501,36 +1930,15 @@ class ERPClient(BaseProxyClient):
 
                 if response.status_code == 200:
                     try:
-                        # Parse new data
-                        new_data = pd.DataFrame(response.json())
-
-                        if not new_data.empty:
-                            # Append new data to stored data
-                            self.stored_data = pd.concat([self.stored_data, new_data], ignore_index=True)
-                            # Remove duplicates if any
-                            self.stored_data = self.stored_data.drop_duplicates(subset=['id'], keep='last')
-
-                        self.last_fetch_time = datetime.now()
-
-                        # Convert to JSON
-                        json_data = json.loads(self.stored_data.to_json(orient='records', date_format='iso'))
-
-                        # Get daily and weekly stats
-                        daily_stats = self.get_daily_stats()
-                        weekly_stats = self.get_weekly_stats()
-
                         return {
                             "success": True,
-                            "data": json_data,
                             "type": "incremental",
-                            "new_records": len(new_data) if not new_data.empty else 0,
-                            "daily_stats": daily_stats,
-                            "weekly_stats": weekly_stats
+                            "new_records": self._merge_new_contracts(response.json())
                         }
                     except Exception as e:
                         print(f"Error processing incremental data: {e}")
                         # If there's an error with incremental update, fall back to full refresh
-                        return self.get_contracts_as_json(force_full_refresh=True)
+                        return self.refresh_contracts(force_full_refresh=True)
                 else:
                     return {"error": f"Failed to get incremental data. Status code: {response.status_code}"}
 
@@ -1540,63 +1948,69 @@ class ERPClient(BaseProxyClient):
             traceback.print_exc()
             return {"error": f"Error getting contracts: {str(e)}"}
 
-    def get_daily_stats(self):
-        """Get daily stats of the sales"""
-        try:
-            if self.stored_data.empty:
-                return {"error": "No data available to calculate daily stats."}
-
-            df = self.stored_data.copy()
+    @_synchronized
+    def _store_full_export(self, content):
+        """Replace the stored contracts with a full export"""
+        self.stored_data = _read_contracts_export(content)
+        self.last_fetch_time = datetime.now()
+
+    @_synchronized
+    def _merge_new_contracts(self, records):
+        """Add the contracts fetched since the last fetch (latest version of each id wins), return their count"""
+        new_data = pd.DataFrame(records)
+        if not new_data.empty:
+            # Append new data to stored data
+            self.stored_data = pd.concat([self.stored_data, new_data], ignore_index=True)
+            # Remove duplicates if any
+            self.stored_data = self.stored_data.drop_duplicates(subset=['id'], keep='last')
+        self.last_fetch_time = datetime.now()
+        return len(new_data)
+
+    @_synchronized
+    def get_contracts_as_json(self, force_full_refresh=False):
+        """Get ERP contracts data as JSON with incremental loading, including daily and weekly stats"""
+        result = self.refresh_contracts(force_full_refresh)
+        if "error" in result:
+            return result
+        return self.with_contracts(result)
 
-            # Ensure 'Créer le' is in datetime format
-            df["Créer le"] = pd.to_datetime(df["Créer le"], errors='coerce')
+    @_synchronized
+    def with_contracts(self, result):
+        """Add the stored contracts and their daily and weekly stats to a refresh result"""
+        try:
+            # Records keep their pandas/numpy values, the response layer encodes them
+            result["data"] = self.stored_data.to_dict(orient='records')
 
-            # Group by commercial and day, then count sales
-            daily_stats = df.groupby([df['Commercial'], df['Créer le'].dt.date]).size().reset_index(name='Daily Sales')
+            # Get daily and weekly stats
+            result["daily_stats"] = self.get_daily_stats()
+            result["weekly_stats"] = self.get_weekly_stats()
+            return result
 
-            # Convert 'Daily Sales' to int to ensure no floats
-            daily_stats['Daily Sales'] = daily_stats['Daily Sales'].astype(int)
+        except Exception as e:
+            print(f"Error getting contracts: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return {"error": f"Error getting contracts: {str(e)}"}
 
-            # Convert the dataframe to a list of dictionaries (JSON serializable format)
-            daily_stats = daily_stats.to_dict(orient='records')
+    def iter_contract_records(self, force_full_refresh=False, chunk_size=1000):
+        """Refresh the contracts and yield them in batches of records instead of one list"""
+        result = self.refresh_contracts(force_full_refresh)
+        if "error" in result:
+            raise Exception(result["error"])
 
-            return daily_stats
+        # Keep a reference so a concurrent refresh does not change the frame mid-stream
+        df = self.stored_data
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].to_dict(orient='records')
 
-        except Exception as e:
-            return {"error": f"Error getting daily stats: {str(e)}"}
+    def get_daily_stats(self):
+        """Get daily stats of the sales"""
+        return _daily_stats(self.stored_data)
 
     def get_weekly_stats(self):
         """Get weekly stats of the sales"""
-        try:
-            if self.stored_data.empty:
-                return {"error": "No data available to calculate weekly stats."}
-
-            df = self.stored_data.copy()
-
-            # Ensure 'Créer le' is in datetime format
-            df["Créer le"] = pd.to_datetime(df["Créer le"], errors='coerce')
-
-            # Extract month and week number for each sale relative to the month
-            df['Month'] = df['Créer le'].dt.to_period('M')  # Extracts month in YYYY-MM format
-            df['Day of Month'] = df['Créer le'].dt.day
-            df['Relative Week Number'] = ((df['Day of Month'] - 1) // 7) + 1
-
-            # Group by commercial, month, and relative week number
-            weekly_stats = df.groupby([df['Commercial'], df['Month'], df['Relative Week Number']]).size().reset_index(name='Weekly Sales')
-
-            # Convert 'Weekly Sales' to int to ensure no floats
-            weekly_stats['Weekly Sales'] = weekly_stats['Weekly Sales'].astype(int)
-
-            # Convert the dataframe to a list of dictionaries (JSON serializable format)
-            weekly_stats = weekly_stats.to_dict(orient='records')
-
-            return weekly_stats
-
-        except Exception as e:
-            return {"error": f"Error getting weekly stats: {str(e)}"}
-
+        return _weekly_stats(self.stored_data)
 
-        
     def close(self):
         """Close the client's session"""
         try:
@@ -1633,6 +2047,7 @@ class JobsClient(BaseProxyClient):
         if not os.path.exists(self.cvs_folder):
             os.makedirs(self.cvs_folder)
 
+    @_synchronized
     def login(self, username: str, password: str, timeout=None) -> bool:
         """Login to moncallcenter.ma and mcdesk subdomain"""
         try:
@@ -1684,6 +2099,7 @@ class JobsClient(BaseProxyClient):
             traceback.print_exc()
             return False
 
+    @_synchronized
     def _wait_for_rate_limit(self):
         """Ensure minimum time between requests"""
         now = time.time()
@@ -1692,6 +2108,7 @@ class JobsClient(BaseProxyClient):
             time.sleep(self.min_request_interval - time_since_last)
         self.last_request_time = time.time()
 
+    @_synchronized
     def login_mcdesk(self, username: str, password: str) -> bool:
         """Login to mcdesk.moncallcenter.ma"""
         try:
@@ -1921,6 +2338,7 @@ class JobsClient(BaseProxyClient):
         except requests.exceptions.RequestException as e:
             print(f"Error downloading {cv_url}: {e}")
 
+    @_synchronized
     def get_candidatures(self, company: Optional[str] = None) -> List[dict]:
         """Get candidatures listings and details from mcdesk."""
         try:
@@ -1949,31 +2367,7 @@ class JobsClient(BaseProxyClient):
                     print(f"Found {total_candidatures} total candidatures")
             
             # Get pagination information
-            pagination = soup.select('ul.pagination li a')
-            page_numbers = []
-            for link in pagination:
-                if link.text.isdigit():
-                    page_numbers.append(int(link.text))
-            
-            if page_numbers:
-                last_page = max(page_numbers)
-                print(f"Found pagination with {last_page} pages")
-            else:
-                # Look for the last page indicator
-                last_page_elem = soup.select_one('a[href*="page"][href$="-86"]')
-                if last_page_elem:
-                    try:
-                        last_page_text = last_page_elem.text.strip()
-                        if last_page_text.isdigit():
-                            last_page = int(last_page_text)
-                            print(f"Found last page through href: {last_page}")
-                        else:
-                            last_page = 1
-                    except:
-                        last_page = 1
-                else:
-                    last_page = 1
-                    print("No pagination found, assuming single page")
+            last_page = _parse_candidatures_last_page(soup)
             
             # Initialize storage
             candidates_details = []
@@ -1992,92 +2386,9 @@ class JobsClient(BaseProxyClient):
                 else:
                     page_soup = soup  # Use the already parsed soup
                 
-                # Find the main candidates table - based on the screenshot it appears to be the only table
-                candidate_table = page_soup.find('table', class_='table-bordered')
-                if not candidate_table:
-                    # Try without the class if not found
-                    candidate_table = page_soup.find('table')
-                
-                if not candidate_table:
-                    print(f"No candidate table found on page {page}")
-                    continue
-                
-                # Get all rows from the table
-                rows = candidate_table.find_all('tr')
-                header_row = rows[0] if rows else None
-                
-                if not header_row:
-                    print("No header row found in the table")
-                    continue
-                
-                # Extract table headers to identify columns
-                headers = [th.text.strip() for th in header_row.find_all(['th', 'td'])]
-                print(f"Found table headers: {headers}")
-                
-                # Determine column indices
-                date_idx = next((i for i, h in enumerate(headers) if 'date' in h.lower()), 0)
-                name_idx = next((i for i, h in enumerate(headers) if 'nom' in h.lower() or 'name' in h.lower()), 1)
-                cv_idx = next((i for i, h in enumerate(headers) if 'cv' in h.lower()), 2)
-                offer_idx = next((i for i, h in enumerate(headers) if 'offre' in h.lower() or 'offer' in h.lower()), 3)
-                
-                # Process each row
-                for row in rows[1:]:  # Skip header
-                    try:
-                        # Extract cells
-                        cells = row.find_all(['td', 'th'])
-                        if len(cells) <= max(date_idx, name_idx, cv_idx, offer_idx):
-                            continue
-                        
-                        # Extract date and time
-                        date_cell = cells[date_idx]
-                        date_text = date_cell.text.strip()
-                        try:
-                            date_parts = date_text.split(' ')
-                            date = date_parts[0] if date_parts else "Unknown"
-                            time = date_parts[1] if len(date_parts) > 1 else "00:00"
-                        except:
-                            date = date_text
-                            time = "00:00"
-                        
-                        # Extract candidate name
-                        name_cell = cells[name_idx]
-                        name = name_cell.text.strip()
-                        
-                        # Look for candidate details link
-                        candidate_url = None
-                        candidate_id = None
-                        detail_link = name_cell.find('a')
-                        if detail_link and 'href' in detail_link.attrs:
-                            candidate_url = detail_link['href']
-                            id_match = re.search(r'id-(\d+)', candidate_url)
-                            candidate_id = id_match.group(1) if id_match else None
-                        
-                        # Extract CV link
-                        cv_cell = cells[cv_idx]
-                        cv_link = cv_cell.find('a')
-                        cv_url = cv_link['href'] if cv_link and 'href' in cv_link.attrs else None
-                        
-                        # Get offer details
-                        offer_cell = cells[offer_idx]
-                        offer = offer_cell.text.strip()
-                        
-                        # Create candidate record
-                        candidate = {
-                            'id': candidate_id or f"unknown-{len(candidates_details)}",
-                            'name': name,
-                            'date': date,
-                            'time': time,
-                            'offer': offer,
-                            'url': f"{self.mcdesk_url}{candidate_url}" if candidate_url else None,
-                            'cv_url': cv_url
-                        }
-                        
-                        print(f"Found candidate: {name} ({date})")
-                        candidates_details.append(candidate)
-                        
-                    except Exception as e:
-                        print(f"Error processing candidate row: {str(e)}")
-                        continue
+                candidates_details.extend(
+                    _parse_candidatures_page(page_soup, page, self.mcdesk_url, len(candidates_details))
+                )
             
             print(f"\nTotal candidates processed: {len(candidates_details)}")
             return candidates_details
@@ -2088,6 +2399,7 @@ class JobsClient(BaseProxyClient):
             traceback.print_exc()
             return []
 
+    @_synchronized
     def get_jobs(self, company: Optional[str] = None):
         """Get job listings from moncallcenter.ma"""
         try:
@@ -2135,6 +2447,7 @@ class JobsClient(BaseProxyClient):
             traceback.print_exc()
             raise
 
+    @_synchronized
     def duplicate_job(self, job_id: str) -> bool:
         """Duplicate a specific job offer"""
         try:
@@ -2172,6 +2485,7 @@ class JobsClient(BaseProxyClient):
             print(f"Error checking login status: {e}")
             return False
 
+    @_synchronized
     def _wait_for_rate_limit(self):
         """Ensure minimum time between requests"""
         now = time.time()
@@ -2180,6 +2494,7 @@ class JobsClient(BaseProxyClient):
             time.sleep(self.min_request_interval - time_since_last)
         self.last_request_time = time.time()
         
+    @_synchronized
     def get_duplicatable_jobs(self, company: str) -> list:
         """Get all jobs and filter those that can be duplicated"""
         try:
@@ -2249,6 +2564,7 @@ class JobsClient(BaseProxyClient):
             traceback.print_exc()
             return []
 
+    @_synchronized
     def duplicate_random_job(self, company: str) -> dict:
         """Get duplicatable jobs and duplicate a random one for specific company"""
         try:
@@ -2310,6 +2626,7 @@ class JobsClient(BaseProxyClient):
                 "error": str(e)
             }
 
+    @_synchronized
     def export_candidatures_to_csv(self, company: Optional[str] = None, output_file: str = 'candidatures.csv') -> str:
         """
         Export candidatures to a CSV file without downloading CV files
@@ -2363,6 +2680,7 @@ class JobsClient(BaseProxyClient):
             traceback.print_exc()
             return error_msg
 
+    @_synchronized
     def export_candidatures_to_google_sheet(self, sheet_id: str, company: Optional[str] = None, sheet_name: Optional[str] = None) -> str:
         """
         Export candidatures to a Google Sheet and only add new candidates.
@@ -2902,7 +3220,8 @@ class NeoClient:
                 "error": f"Error getting contracts: {str(e)}"
             }
 
-    def _parse_contract_row(self, row):
+    @staticmethod
+    def _parse_contract_row(row):
         """Helper method to parse a contract row"""
         try:
             contract_id = row.get('data-contract-id')
@@ -2939,7 +3258,8 @@ class NeoClient:
             print(f"Error parsing contract row {contract_id}: {str(e)}")
             return None
 
-    def _extract_pagination_info(self, soup, contracts_count, limit):
+    @staticmethod
+    def _extract_pagination_info(soup, contracts_count, limit):
         """Helper method to extract pagination information"""
         try:
             # Try multiple patterns to find total results
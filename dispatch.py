@@ -0,0 +1,248 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+
+# Default pool configuration per upstream: (max_workers, max_queue)
+# mcdesk covers both moncallcenter.ma portals (main site + mcdesk subdomain)
+DEFAULT_POOLS = {
+    "crm": (4, 16),
+    "formaexpert": (2, 8),
+    "erp": (2, 8),
+    "mcdesk": (2, 8),
+    "neo": (1, 4),
+}
+
+
+class UpstreamBusyError(HTTPException):
+    """Raised when an upstream pool has no room left in its queue"""
+    def __init__(self, upstream: str):
+        super().__init__(
+            status_code=503,
+            detail=f"Upstream '{upstream}' is busy, please retry later"
+        )
+        self.upstream = upstream
+
+
+class UpstreamPool:
+    """Bounded thread pool for the blocking calls of a single upstream"""
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"upstream-{name}"
+        )
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.active = 0
+        self.queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def _reserve(self):
+        """Reserve a slot in the pool or raise if the queue is full"""
+        with self._lock:
+            if self.active + self.queued >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusyError(self.name)
+            self.queued += 1
+            self.submitted += 1
+
+    def _call(self, fn, args, kwargs, enqueued_at):
+        """Run fn in a worker thread while keeping the counters up to date"""
+        started_at = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait += started_at - enqueued_at
+
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            duration = time.monotonic() - started_at
+            with self._lock:
+                self.active -= 1
+                self.total_time += duration
+                self.max_time = max(self.max_time, duration)
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+    def _release(self, future=None):
+        """Give back the slot of a job that never reached _call"""
+        if future is not None and not future.cancelled():
+            return
+        with self._lock:
+            self.queued = max(0, self.queued - 1)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking callable on this pool and await its result"""
+        self._reserve()
+        try:
+            future = self.executor.submit(self._call, fn, args, kwargs, time.monotonic())
+        except RuntimeError:
+            # Executor was shut down before the job could be scheduled
+            self._release()
+            raise
+        # A job cancelled while still queued (caller cancelled or timed out, pool
+        # shut down) never runs _call: its slot is released here instead
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        """Snapshot of the pool counters"""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / finished * 1000, 2) if finished else 0.0,
+                "avg_time_ms": round(self.total_time / finished * 1000, 2) if finished else 0.0,
+                "max_time_ms": round(self.max_time * 1000, 2)
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class UpstreamDispatcher:
+    """Routes blocking client calls to one bounded thread pool per upstream"""
+    def __init__(self, pools: Optional[Dict[str, tuple]] = None):
+        self.pools: Dict[str, UpstreamPool] = {}
+        for name, (max_workers, max_queue) in (pools or DEFAULT_POOLS).items():
+            # Allow overriding the limits from the environment, e.g. CRM_POOL_SIZE / CRM_POOL_QUEUE
+            max_workers = int(os.getenv(f"{name.upper()}_POOL_SIZE", max_workers))
+            max_queue = int(os.getenv(f"{name.upper()}_POOL_QUEUE", max_queue))
+            self.pools[name] = UpstreamPool(name, max_workers, max_queue)
+
+    def add_pool(self, name: str, max_workers: int = 2, max_queue: int = 8):
+        """Create the pool of an upstream registered at runtime (e.g. an extra CRM tenant)"""
+        if name not in self.pools:
+            max_workers = int(os.getenv(f"{name.upper()}_POOL_SIZE", max_workers))
+            max_queue = int(os.getenv(f"{name.upper()}_POOL_QUEUE", max_queue))
+            self.pools[name] = UpstreamPool(name, max_workers, max_queue)
+        return self.pools[name]
+
+    async def run(self, upstream: str, fn, *args, **kwargs):
+        """Run a blocking client call on the pool of the given upstream"""
+        pool = self.pools.get(upstream)
+        if pool is None:
+            raise KeyError(f"Unknown upstream pool: {upstream}")
+        return await pool.run(fn, *args, **kwargs)
+
+    async def run_coroutine(self, upstream: str, coro_fn, *args, **kwargs):
+        """
+        Run an async client method that blocks internally (e.g. NeoClient)
+        on its own event loop inside the upstream pool.
+        """
+        return await self.run(upstream, lambda: asyncio.run(coro_fn(*args, **kwargs)))
+
+    async def iterate(self, upstream: str, gen_fn, *args, **kwargs):
+        """
+        Drive a blocking generator on the pool of the given upstream, one item
+        per pool job, and yield its items to the event loop as they come.
+        """
+        sentinel = object()
+        generator = gen_fn(*args, **kwargs)
+        try:
+            while True:
+                item = await self.run(upstream, next, generator, sentinel)
+                if item is sentinel:
+                    break
+                yield item
+        finally:
+            try:
+                generator.close()
+            except ValueError:
+                # Still running in a pool thread after a client disconnect
+                pass
+
+    def metrics(self) -> dict:
+        return {name: pool.metrics() for name, pool in self.pools.items()}
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.shutdown()
+
+
+def normalize_range(start_date: Optional[str], end_date: Optional[str]):
+    """
+    Canonical (start, end) strings for a CRM time range, applying the same
+    today defaults as the clients so equivalent requests share a key.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    normalized = []
+    for value, default in ((start_date, f"{today} 00:00:00"), (end_date, f"{today} 23:59:59")):
+        value = (value or default).strip()
+        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                value = datetime.strptime(value, fmt).strftime("%Y-%m-%d %H:%M:%S")
+                break
+            except ValueError:
+                continue
+        normalized.append(value)
+    return tuple(normalized)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests: the first caller for a key runs
+    the fetch, later callers await the same future and share its result.
+    """
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: tuple, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) (a coroutine function), sharing it with identical in-flight calls"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The fetch runs in its own task: a cancelled caller, leader included,
+            # must not cancel it for the others
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            self.leaders += 1
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody awaited anymore is not logged as never retrieved
+            task.exception()
+
+    def metrics(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
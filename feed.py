@@ -0,0 +1,146 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to a process-local lock
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+from responses import dumps
+
+
+class FeedCursorExpired(Exception):
+    """The consumer's cursor points to runs no longer retained (or past the newest one)"""
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class IncrementalFeed:
+    """
+    Append-only feed of incremental CRM runs, shared by all uvicorn workers.
+
+    Every run is stored as its own JSON file named after a sequence number
+    assigned under a file lock. Consumers read with the cursor of the last run
+    they processed and get every run after it: reading never advances any
+    state, so a slow consumer loses nothing and two consumers don't steal
+    each other's records. Runs past the retention are deleted.
+    """
+    def __init__(self, root=None, retention_days=None, namespace="ringassur"):
+        self.root = os.path.join(
+            root or os.getenv("CRM_FEED_DIR", os.path.join(tempfile.gettempdir(), "ringassur_feed")),
+            namespace
+        )
+        self.retention_days = retention_days or int(os.getenv("CRM_FEED_RETENTION_DAYS", 7))
+        self._thread_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+        # Metrics
+        self.appends = 0
+        self.reads = 0
+        self.pruned = 0
+
+    @contextmanager
+    def _lock(self):
+        """Exclusive lock on the sequence, across threads and processes"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sequences(self):
+        """Sequence numbers of the stored runs, oldest first"""
+        return sorted(
+            int(name[:-len(".json")]) for name in os.listdir(self.root)
+            if name.endswith(".json") and name[:-len(".json")].isdigit()
+        )
+
+    def _path(self, seq):
+        return os.path.join(self.root, f"{seq:012d}.json")
+
+    def append(self, data, metadata=None):
+        """Store one run's records and return its sequence number"""
+        with self._lock():
+            sequences = self._sequences()
+            seq = sequences[-1] + 1 if sequences else 1
+            path = self._path(seq)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(dumps({
+                    "seq": seq,
+                    "published_at": time.time(),
+                    "metadata": metadata or {},
+                    "data": data
+                }))
+            # Renamed under the lock: runs become visible in sequence order
+            os.replace(tmp_path, path)
+        self.appends += 1
+        return seq
+
+    def read(self, since=0, limit=100):
+        """
+        Runs after the cursor `since` (0 for the oldest retained run), at most
+        `limit` of them, as (runs, cursor, has_more) where cursor is the
+        sequence number of the last run returned (`since` when there is none).
+        Raises FeedCursorExpired when runs after `since` were already pruned.
+        """
+        sequences = self._sequences()
+        if since and sequences and since < sequences[0] - 1:
+            raise FeedCursorExpired(
+                f"Cursor {since} is older than the oldest retained run ({sequences[0]}), read again from since=0"
+            )
+        if since > (sequences[-1] if sequences else 0):
+            raise FeedCursorExpired(f"Cursor {since} is ahead of the feed (was it reset?), read again from since=0")
+        pending = [seq for seq in sequences if seq > since]
+        runs = []
+        for seq in pending[:limit]:
+            try:
+                with open(self._path(seq), 'rb') as f:
+                    runs.append(_loads(f.read()))
+            except FileNotFoundError:
+                # Pruned while we were reading: the consumer is behind the retention
+                raise FeedCursorExpired(f"Run {seq} was pruned while reading, read again from since=0")
+        self.reads += 1
+        cursor = runs[-1]["seq"] if runs else since
+        return runs, cursor, len(pending) > limit
+
+    def prune(self):
+        """Delete runs older than the retention, always keeping the newest one"""
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+        with self._lock():
+            for seq in self._sequences()[:-1]:
+                path = self._path(seq)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        self.pruned += removed
+        return removed
+
+    def metrics(self) -> dict:
+        sequences = self._sequences()
+        return {
+            "runs": len(sequences),
+            "oldest": sequences[0] if sequences else None,
+            "latest": sequences[-1] if sequences else None,
+            "appends": self.appends,
+            "reads": self.reads,
+            "pruned": self.pruned,
+            "retention_days": self.retention_days
+        }
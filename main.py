@@ -1,10 +1,12 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import requests
 from urllib3.exceptions import InsecureRequestWarning
 from typing import Optional, Union, List
+from functools import partial
 import os
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
@@ -20,10 +22,26 @@ from controllers import (
     BaseProxyClient,
     CRMClient, 
     ERPClient, 
-    CRMClientFormaExpert, 
     JobsClient, 
     CRMIncrementalClient, 
-    NeoClient
+    NeoClient,
+    _paginate_frame
+)
+from tenants import TENANTS
+from dispatch import UpstreamDispatcher, UpstreamBusyError, SingleFlight, normalize_range
+from session_store import SharedSessionStore
+from cache import ResultCache, SnapshotStore
+from scheduler import BackgroundScheduler
+from feed import IncrementalFeed, FeedCursorExpired
+from async_controllers import AsyncTransport, AsyncCRMClient, AsyncERPClient, AsyncJobsClient, AsyncNeoClient
+from responses import (
+    FastJSONResponse,
+    encoded_response,
+    wants_ndjson,
+    ndjson_response,
+    columnar_format,
+    encode_frame,
+    columnar_response
 )
 
 # Disable SSL warning
@@ -31,9 +49,10 @@ requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
 
 
-# Global client instances
-crm_client = CRMClient()
-crm_client_formaexpert = CRMClientFormaExpert()
+# Global client instances, one CRM client per registered comunikcrm tenant
+crm_clients = {name: CRMClient(tenant) for name, tenant in TENANTS.items()}
+crm_client = crm_clients["ringassur"]
+crm_client_formaexpert = crm_clients["formaexpert"]
 erp_client = ERPClient()
 jobs_client = JobsClient()
 
@@ -52,8 +71,199 @@ perextel_client = JobsClient()
 # Add the new client instance
 crm_incremental_client = CRMIncrementalClient()
 
+# Shared aiohttp transport (one keep-alive pool per upstream host): the async fronts of the
+# clients above keep many upstream calls in flight without threads, on the same logins and state
+async_transport = AsyncTransport()
+async_crm_clients = {name: AsyncCRMClient(async_transport, client) for name, client in crm_clients.items()}
+async_crm_client = async_crm_clients["ringassur"]
+async_erp_client = AsyncERPClient(async_transport, erp_client)
+async_xpercia_client = AsyncJobsClient(async_transport, xpercia_client)
+async_perextel_client = AsyncJobsClient(async_transport, perextel_client)
+
+# Dedicated thread pools for the blocking upstream calls
+dispatcher = UpstreamDispatcher()
+for tenant in TENANTS.values():
+    dispatcher.add_pool(tenant.upstream)
+
+# Identical concurrent CRM export queries share one upstream fetch
+crm_flights = SingleFlight()
+
+# Parsed CRM export results, long-lived for closed past ranges
+crm_cache = ResultCache()
+
+# Parsed exports behind pagination cursors for /api/crm/data/assurance
+crm_snapshots = SnapshotStore()
+
+async def coalesced_crm_fetch(endpoint, pool, group, fn, start_date, end_date, *args):
+    """
+    Serve a CRM export from the result cache, otherwise run it (on its pool
+    unless fn is a coroutine function), joining an identical request already in flight
+    """
+    key = (endpoint, *normalize_range(start_date, end_date), group, *args)
+    cached = crm_cache.peek(key)
+    if cached is None:
+        # Disk tier reads, unpickling and pickling stay off the event loop
+        cached = await asyncio.to_thread(crm_cache.get, key)
+    if cached is not None:
+        return cached
+    if asyncio.iscoroutinefunction(fn):
+        result = await crm_flights.do(key, fn, start_date, end_date, *args)
+    else:
+        result = await crm_flights.do(key, dispatcher.run, pool, fn, start_date, end_date, *args)
+    # Partial results (some shards failed) are served but not cached
+    if isinstance(result, dict) and "error" not in result and "failed_shards" not in result:
+        await asyncio.to_thread(crm_cache.set, key, result)
+    return result
+
+# Cookies and CSRF tokens shared by all uvicorn workers
+session_store = SharedSessionStore()
+
+def login_shared(name, client, *args, **kwargs):
+    """Log in through the shared session store so only one worker re-authenticates"""
+    return session_store.relogin(name, client, lambda: client.login(*args, **kwargs))
+
+async def ensure_erp_login():
+    """Re-authenticate the ERP client when the dashboard redirects to the login page"""
+    if not await async_erp_client.check_login():
+        # Re-authenticate
+        erp_email = os.getenv("ERP_EMAIL")
+        erp_password = os.getenv("ERP_PASSWORD")
+        if not await dispatcher.run("erp", login_shared, "erp", erp_client, erp_email, erp_password):
+            print("Failed to authenticate with ERP")
+            print(f"Using email: {erp_email}")
+            print("Cookies:", erp_client.session.cookies.get_dict())
+            return False
+    return True
+
+# Background refresh jobs, run by one leader worker and served to all as snapshots
+scheduler = BackgroundScheduler()
+
+async def ensure_incremental_login():
+    """Log the incremental client in (through the shared crm session) when it has no session cookies"""
+    if crm_incremental_client.session.cookies:
+        return True
+    return await dispatcher.run("crm", login_shared, "crm", crm_incremental_client)
+
+# Incremental CRM runs, read by consumers through their own cursor
+crm_feed = IncrementalFeed(namespace=crm_incremental_client.tenant.name)
+
+def append_incremental_run(current_time):
+    """
+    Fetch the windows since the last checkpoint and append each one with new
+    records to the feed. A window is appended before the fetcher checkpoints
+    it, so a failure can repeat it in the feed but never loses it.
+    """
+    stats = {}
+    for batch in crm_incremental_client.iter_incremental_batches(current_time, stats):
+        if len(batch):
+            crm_feed.append(batch, {"time_range": stats["time_range"], "new_records": len(batch)})
+    print(f"Incremental run appended {stats.get('total_records', 0)} records to the feed")
+    return None
+
+async def refresh_crm_incremental():
+    if not await ensure_incremental_login():
+        return {"error": "CRM authentication failed"}
+    # Nothing to publish: consumers read the feed
+    return await dispatcher.run("crm", append_incremental_run, datetime.now())
+
+async def refresh_erp_contracts():
+    if not await ensure_erp_login():
+        return {"error": "ERP authentication failed"}
+    result = await async_erp_client.get_contracts_as_json()
+    if "error" in result:
+        return result
+    return {
+        "success": result.get("success", False),
+        "data": result.get("data", []),
+        "type": result.get("type", "incremental"),
+        "new_records": result.get("new_records", 0),
+        "daily_stats": result.get("daily_stats", []),
+        "weekly_stats": result.get("weekly_stats", [])
+    }
+
+async def refresh_candidatures(name, client, async_client, login, password):
+    if not await async_client.check_login():
+        if not await dispatcher.run("mcdesk", login_shared, name, client, login, password):
+            return {"error": f"Failed to authenticate {name} account"}
+    candidatures = await async_client.get_candidatures()
+    # get_candidatures returns [] on failure: keep the previous snapshot
+    return candidatures or None
+
+async def refresh_campaign_catalogs():
+    """Keep today's campaign bucket warm in this worker's catalogs"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    for client in (*crm_clients.values(), crm_incremental_client):
+        await dispatcher.run(
+            client.tenant.upstream, client.campaign_catalog.refresh, f"{today} 00:00:00", f"{today} 23:59:59"
+        )
+    # Nothing to publish: every worker holds its own catalog
+    return None
+
+def refresh_qualification_catalog():
+    """Reload the qualifications of every campaign active today into the shared catalog"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    campaigns = crm_client.get_campaigns(f"{today} 00:00:00", f"{today} 23:59:59")
+    if not campaigns:
+        return {"error": "Failed to get campaigns"}
+    campaign_ids = list(dict.fromkeys(c['value'] for group in campaigns.values() for c in group))
+    crm_client.qualification_catalog.refresh(campaign_ids)
+    return None
+
+def maintain_record_stores():
+    """Compact sealed days and apply the retention of every tenant's record store and of the incremental feed"""
+    for name, client in crm_clients.items():
+        if client.record_store is not None:
+            print(f"Record store {name}: {client.record_store.maintain()}")
+    print(f"Incremental feed: {crm_feed.prune()} runs pruned")
+    return None
+
+scheduler.add_job("crm_incremental", refresh_crm_incremental, int(os.getenv("CRM_INCREMENTAL_INTERVAL", 900)))
+scheduler.add_job("erp_contracts", refresh_erp_contracts, int(os.getenv("ERP_REFRESH_INTERVAL", 900)))
+scheduler.add_job(
+    "campaign_catalog",
+    refresh_campaign_catalogs,
+    int(os.getenv("CAMPAIGN_CATALOG_INTERVAL", 300)),
+    leader_only=False
+)
+scheduler.add_job(
+    "qualification_catalog",
+    partial(dispatcher.run, "crm", refresh_qualification_catalog),
+    int(os.getenv("QUALIF_CATALOG_INTERVAL", 3600))
+)
+scheduler.add_job(
+    "record_store_maintenance",
+    partial(dispatcher.run, "crm", maintain_record_stores),
+    int(os.getenv("CRM_STORE_MAINTENANCE_INTERVAL", 3600))
+)
+scheduler.add_job(
+    "perextel_candidatures",
+    partial(refresh_candidatures, "perextel", perextel_client, async_perextel_client, PEREXTEL_LOGIN, PEREXTEL_PASSWORD),
+    int(os.getenv("CANDIDATURES_INTERVAL", 3600))
+)
+scheduler.add_job(
+    "xpercia_candidatures",
+    partial(refresh_candidatures, "xpercia", xpercia_client, async_xpercia_client, XPERCIA_LOGIN, XPERCIA_PASSWORD),
+    int(os.getenv("CANDIDATURES_INTERVAL", 3600))
+)
+
+async def snapshot_response(name):
+    """Serve the latest published snapshot of a job, if it is recent enough"""
+    if os.getenv("SCHEDULER_ENABLED", "1") == "0":
+        return None
+    # Allow one missed run before falling back to a live fetch; the file is read off the event loop
+    snapshot = await asyncio.to_thread(scheduler.snapshot, name, 2 * scheduler.jobs[name].interval)
+    if snapshot is None:
+        return None
+    published_at, body = snapshot
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"X-Snapshot-Published-At": datetime.fromtimestamp(published_at).isoformat()}
+    )
+
 # Initialize neo_client as None
 neo_client = None
+async_neo_client = None
 
 # Add these new imports and globals
 mfa_queue = Queue()
@@ -73,13 +283,20 @@ async def wait_for_mfa_code():
 
 async def initialize_neo_client():
     """Initialize the Neo client with MFA handling"""
-    global neo_client
+    global neo_client, async_neo_client
     if neo_client is None:
         neo_client = NeoClient()
+        async_neo_client = AsyncNeoClient(async_transport, neo_client)
+        main_loop = asyncio.get_running_loop()
         
         # Set up MFA callback
         async def mfa_callback():
-            return await wait_for_mfa_code()
+            # Neo calls run on their own loop inside the dispatcher pool,
+            # so hop back to the main loop where the MFA queue lives
+            if asyncio.get_running_loop() is main_loop:
+                return await wait_for_mfa_code()
+            future = asyncio.run_coroutine_threadsafe(wait_for_mfa_code(), main_loop)
+            return await asyncio.wrap_future(future)
             
         neo_client.set_mfa_callback(mfa_callback)
     return neo_client
@@ -125,22 +342,21 @@ async def lifespan(app: FastAPI):
         # Initialize all clients
         print("\nInitializing clients...")
         
-        # Login to CRM systems
-        print("Logging into CRM...")
-        if not crm_client.login(crm_username, crm_password):
-            print("Error: Failed to login to CRM")
-        else:
-            print("Successfully logged into CRM")
-            
-        print("Logging into FormaExpert CRM...")
-        if not crm_client_formaexpert.login():
-            print("Error: Failed to login to FormaExpert CRM")
-        else:
-            print("Successfully logged into FormaExpert CRM")
+        # Login to CRM systems, each tenant with its own shared session
+        for name, client in crm_clients.items():
+            print(f"Logging into CRM tenant {name}...")
+            if not session_store.ensure_login(client.tenant.upstream, client, client.login):
+                print(f"Error: Failed to login to CRM tenant {name}")
+            else:
+                print(f"Successfully logged into CRM tenant {name}")
+
+        # The incremental fetcher has its own client on the ringassur account
+        if not session_store.ensure_login("crm", crm_incremental_client, crm_incremental_client.login):
+            print("Error: Failed to login the incremental CRM client")
             
         # Login to ERP
         print("Logging into ERP...")
-        if not erp_client.login(erp_email, erp_password):
+        if not session_store.ensure_login("erp", erp_client, lambda: erp_client.login(erp_email, erp_password)):
             print("Error: Failed to login to ERP")
         else:
             print("Successfully logged into ERP")
@@ -148,7 +364,10 @@ async def lifespan(app: FastAPI):
         # Login to job portals
         print("Logging into Xpercia job portal...")
         try:
-            if not xpercia_client.login(XPERCIA_LOGIN, XPERCIA_PASSWORD, timeout=30):
+            if not session_store.ensure_login(
+                "xpercia", xpercia_client,
+                lambda: xpercia_client.login(XPERCIA_LOGIN, XPERCIA_PASSWORD, timeout=30)
+            ):
                 print("Error: Failed to login to Xpercia job portal")
             else:
                 print("Successfully logged into Xpercia job portal")
@@ -161,7 +380,10 @@ async def lifespan(app: FastAPI):
         
         print("Logging into Perextel job portal...")
         try:
-            if not perextel_client.login(PEREXTEL_LOGIN, PEREXTEL_PASSWORD, timeout=30):
+            if not session_store.ensure_login(
+                "perextel", perextel_client,
+                lambda: perextel_client.login(PEREXTEL_LOGIN, PEREXTEL_PASSWORD, timeout=30)
+            ):
                 print("Error: Failed to login to Perextel job portal")
             else:
                 print("Successfully logged into Perextel job portal")
@@ -179,6 +401,10 @@ async def lifespan(app: FastAPI):
         #     print("Error: Failed to login to Neoliane")
         # else:
         #     print("Successfully logged into Neoliane")
+
+        if os.getenv("SCHEDULER_ENABLED", "1") != "0":
+            print("Starting background refresh scheduler...")
+            scheduler.start()
         
         yield
     except Exception as e:
@@ -189,7 +415,7 @@ async def lifespan(app: FastAPI):
     finally:
         # Cleanup code - close sessions
         print("\nClosing client sessions...")
-        for client in [crm_client, crm_client_formaexpert, erp_client, 
+        for client in [*crm_clients.values(), erp_client, 
                       xpercia_client, perextel_client]:
             try:
                 client.close()
@@ -203,6 +429,14 @@ async def lifespan(app: FastAPI):
             except:
                 pass
 
+        await scheduler.stop()
+        dispatcher.shutdown()
+        for async_client in [*async_crm_clients.values(), async_erp_client, async_xpercia_client, async_perextel_client,
+                             async_neo_client]:
+            if async_client is not None:
+                await async_client.close()
+        await async_transport.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="API Service",
@@ -210,7 +444,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -235,11 +470,48 @@ async def root():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/api/dispatch/metrics")
+async def get_dispatch_metrics():
+    """Per-upstream thread pool metrics and CRM request coalescing counters"""
+    metrics = dispatcher.metrics()
+    metrics["crm_singleflight"] = crm_flights.metrics()
+    return metrics
+
+@app.get("/api/scheduler/status")
+async def get_scheduler_status():
+    """Background refresh jobs: leadership, last run and errors"""
+    return scheduler.status()
+
+@app.get("/api/cache/metrics")
+async def get_cache_metrics():
+    """CRM result cache hit/miss counters and pagination snapshots"""
+    metrics = crm_cache.metrics()
+    metrics["snapshots"] = await asyncio.to_thread(crm_snapshots.metrics)
+    metrics["qualification_catalog"] = crm_client.qualification_catalog.metrics()
+    metrics["campaign_catalog"] = {name: client.campaign_catalog.metrics() for name, client in crm_clients.items()}
+    if crm_incremental_client.seen_index is not None:
+        metrics["incremental_seen_index"] = await asyncio.to_thread(crm_incremental_client.seen_index.metrics)
+    if crm_incremental_client.interval_planner is not None:
+        metrics["incremental_interval_planner"] = crm_incremental_client.interval_planner.metrics()
+    metrics["incremental_feed"] = await asyncio.to_thread(crm_feed.metrics)
+    metrics["record_store"] = {
+        name: await asyncio.to_thread(client.record_store.metrics)
+        for name, client in crm_clients.items() if client.record_store is not None
+    }
+    return metrics
+
+@app.post("/api/cache/invalidate")
+async def invalidate_cache(endpoint: Optional[str] = None, date: Optional[str] = None):
+    """Drop cached CRM results for an endpoint (e.g. data/full) and/or ranges covering a date"""
+    removed = await asyncio.to_thread(crm_cache.invalidate, endpoint, date)
+    return {"success": True, "removed": removed}
+
 class TimeRange(BaseModel):
     start_date: Optional[str] = None
     end_date: Optional[str] = None
     page: Optional[int] = 1
     page_size: Optional[int] = 1000
+    cursor: Optional[str] = None  # returned by the first page, serves the next pages from the same export
 
     class Config:
         json_schema_extra = {
@@ -261,12 +533,28 @@ class CampaignRequest(BaseModel):
             }
         }
 
+class TenantsRequest(BaseModel):
+    tenants: Optional[List[str]] = None  # registered tenant names, all of them by default
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "tenants": ["ringassur", "formaexpert"],
+                "start_date": datetime.now().strftime("%Y-%m-%d 00:00:00"),
+                "end_date": datetime.now().strftime("%Y-%m-%d 23:59:59")
+            }
+        }
+
 class SearchRequest(BaseModel):
     campaign_ids: Optional[List[str]] = None
     qualif_types: Optional[List[str]] = None  # ['sales_qualifs', 'callback_qualifs', 'rejection_qualifs', 'other_qualifs']
     qualif_ids: Optional[List[str]] = None
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    offset: Optional[int] = 0
+    limit: Optional[int] = None  # rows per page; None returns the whole result set
 
     class Config:
         json_schema_extra = {
@@ -275,7 +563,9 @@ class SearchRequest(BaseModel):
                 "qualif_types": ["sales_qualifs", "callback_qualifs"],
                 "qualif_ids": None,
                 "start_date": datetime.now().strftime("%Y-%m-%d 00:00:00"),
-                "end_date": datetime.now().strftime("%Y-%m-%d 23:59:59")
+                "end_date": datetime.now().strftime("%Y-%m-%d 23:59:59"),
+                "offset": 0,
+                "limit": 500
             }
         }
 
@@ -296,49 +586,96 @@ async def submit_mfa_code(code: str):
 
 
 @app.post("/api/crm/data")
-async def get_crm_data(time_range: TimeRange = TimeRange()):
+async def get_crm_data(request: Request, time_range: TimeRange = TimeRange()):
     try:
         # Get the data using the global client instance
-        result = crm_client.get_data_as_json(time_range.start_date, time_range.end_date)
+        result = await coalesced_crm_fetch(
+            "data", "crm", crm_client.tenant.name, crm_client.get_data_as_json, time_range.start_date, time_range.end_date
+        )
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
             
-        return result
+        return encoded_response(request, result)
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/api/crm/data/full")
-async def get_crm_data(time_range: TimeRange = TimeRange()):
+async def get_crm_data(
+    request: Request, time_range: TimeRange = TimeRange(), stream: bool = False, format: Optional[str] = None
+):
     try:
+        # Arrow IPC / Parquet: the whole parsed frame, without the row-wise JSON conversion
+        output_format = columnar_format(request, format)
+        if output_format:
+            key = ("data/full-frame", *normalize_range(time_range.start_date, time_range.end_date), crm_client.tenant.name)
+            result = await crm_flights.do(
+                key, async_crm_client.get_export_frame, time_range.start_date, time_range.end_date
+            )
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=result["error"])
+            body = await asyncio.to_thread(encode_frame, result["frame"], output_format)
+            return columnar_response(body, output_format)
+
+        if wants_ndjson(request, stream):
+            return await ndjson_response(dispatcher.iterate(
+                "crm", crm_client.iter_data_records, time_range.start_date, time_range.end_date
+            ))
+
         # Get the data using the global client instance
-        result = crm_client.get_data_as_json_full(time_range.start_date, time_range.end_date)
+        result = await coalesced_crm_fetch(
+            "data/full", "crm", crm_client.tenant.name, async_crm_client.get_data_as_json_full, time_range.start_date, time_range.end_date
+        )
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
             
-        return result
+        return encoded_response(request, result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/crm/data/assurance")
-async def get_sales_data(time_range: TimeRange = TimeRange()):
+async def get_sales_data(request: Request, time_range: TimeRange = TimeRange()):
     try:
-        # Get the data using the global client instance with pagination
-        result = crm_client.get_data_as_json_full(
-            time_range.start_date, 
-            time_range.end_date,
-            time_range.page,
-            time_range.page_size
-        )
-        
-        if "error" in result:
-            raise HTTPException(status_code=500, detail=result["error"])
-            
-        return result
+        key = ("data/assurance", *normalize_range(time_range.start_date, time_range.end_date), crm_client.tenant.name)
+        cursor = time_range.cursor
+        # Snapshots are shared files: any worker serves a cursor another one issued
+        snapshot = await asyncio.to_thread(crm_snapshots.get, cursor) if cursor else None
+        if snapshot and snapshot[0] != key:
+            raise HTTPException(status_code=400, detail="Cursor was issued for another date range")
+
+        failed_shards = None
+        if snapshot:
+            frame = snapshot[1]
+        else:
+            if cursor:
+                print(f"Cursor {cursor} expired, exporting the range again")
+            # Export and parse once, following pages are sliced from the snapshot
+            result = await crm_flights.do(
+                key, async_crm_client.get_export_frame, time_range.start_date, time_range.end_date
+            )
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=result["error"])
+            frame = result["frame"]
+            failed_shards = result.get("failed_shards")
+            # Partial exports are not snapshotted: the next page exports the range again
+            cursor = None if failed_shards else await asyncio.to_thread(crm_snapshots.create, key, frame)
+
+        result = await asyncio.to_thread(_paginate_frame, frame, time_range.page, time_range.page_size)
+        result["pagination"]["cursor"] = cursor
+        if failed_shards:
+            result["partial"] = True
+            result["failed_shards"] = failed_shards
+        return encoded_response(request, result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -353,11 +690,11 @@ async def get_crm_data(time_range: TimeRange = TimeRange()):
             print("No session cookies found - attempting to re-login")
             crm_username = os.getenv("CRM_USERNAME")
             crm_password = os.getenv("CRM_PASSWORD")
-            if not crm_client.login(crm_username, crm_password):
+            if not await dispatcher.run("crm", login_shared, "crm", crm_client, crm_username, crm_password):
                 raise HTTPException(status_code=401, detail="Failed to authenticate with CRM")
         
         # Get the campaigns using the client instance
-        campaigns = crm_client.get_campaigns(time_range.start_date, time_range.end_date)
+        campaigns = await async_crm_client.get_campaigns(time_range.start_date, time_range.end_date)
         
         if campaigns is None:
             raise HTTPException(status_code=500, detail="Failed to fetch campaign groups")
@@ -367,6 +704,8 @@ async def get_crm_data(time_range: TimeRange = TimeRange()):
             "campaigns": campaigns
         }
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_crm_data/filter_groups: {str(e)}")
         import traceback
@@ -374,7 +713,7 @@ async def get_crm_data(time_range: TimeRange = TimeRange()):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/crm/data/temara")
-async def get_crm_data(time_range: TimeRange = TimeRange()):
+async def get_crm_data(request: Request, time_range: TimeRange = TimeRange()):
     try:
         print("\nProcessing /api/crm/data/temara request...")
         print(f"Time range: {time_range}")
@@ -382,42 +721,113 @@ async def get_crm_data(time_range: TimeRange = TimeRange()):
         # Check if we're logged in
         if not crm_client_formaexpert.session.cookies:
             print("No session cookies found - attempting to re-login")
-            if not crm_client_formaexpert.login():
+            if not await dispatcher.run("formaexpert", login_shared, "formaexpert", crm_client_formaexpert):
                 raise HTTPException(status_code=401, detail="Failed to authenticate with FormaExpert CRM")
         
         # Get the data using the global client instance
-        result = crm_client_formaexpert.get_data_as_json(time_range.start_date, time_range.end_date)
+        result = await coalesced_crm_fetch(
+            "data", "formaexpert", crm_client_formaexpert.tenant.name,
+            crm_client_formaexpert.get_data_as_json, time_range.start_date, time_range.end_date
+        )
         
         if "error" in result:
             print(f"Error in result: {result['error']}")
             raise HTTPException(status_code=500, detail=result["error"])
             
-        return result
+        return encoded_response(request, result)
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_crm_data/temara: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/crm/tenants")
+async def list_crm_tenants():
+    """Registered comunikcrm tenants"""
+    return {"tenants": [client.tenant.to_dict() for client in crm_clients.values()]}
+
+async def fetch_tenant_data(name, start_date, end_date):
+    """One tenant's export through its own pool, session and cache namespace"""
+    client = crm_clients[name]
+    upstream = client.tenant.upstream
+    if not client.session.cookies:
+        if not await dispatcher.run(upstream, login_shared, upstream, client):
+            return {"error": f"Failed to authenticate with CRM tenant {name}"}
+    return await coalesced_crm_fetch("data", upstream, name, client.get_data_as_json, start_date, end_date)
+
+@app.post("/api/crm/tenants/data")
+async def get_tenants_data(request: Request, tenants_request: TenantsRequest):
+    """
+    Fan-out export: queries the requested tenants (all by default) at the
+    same time. A failing tenant reports its error without failing the others.
+    """
+    try:
+        names = tenants_request.tenants or list(crm_clients)
+        unknown = [name for name in names if name not in crm_clients]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown CRM tenants: {', '.join(unknown)}")
+
+        results = await asyncio.gather(
+            *(fetch_tenant_data(name, tenants_request.start_date, tenants_request.end_date) for name in names),
+            return_exceptions=True
+        )
+        tenants = {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                detail = result.detail if isinstance(result, HTTPException) else str(result)
+                print(f"Error fetching CRM tenant {name}: {detail}")
+                result = {"error": detail}
+            tenants[name] = result
+
+        return encoded_response(request, {
+            "success": any("error" not in result for result in tenants.values()),
+            "tenants": tenants
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_tenants_data: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @app.get("/api/erp/data")
-async def get_erp_data(force_refresh: bool = False):
+async def get_erp_data(
+    request: Request, force_refresh: bool = False, stream: bool = False, format: Optional[str] = None
+):
     try:
+        output_format = columnar_format(request, format)
+        streaming = wants_ndjson(request, stream)
+
+        # Plain JSON reads are served from the scheduler's snapshot
+        if not (force_refresh or output_format or streaming or "msgpack" in request.headers.get("accept", "")):
+            snapshot = await snapshot_response("erp_contracts")
+            if snapshot is not None:
+                return snapshot
+
         # Check if we need to re-authenticate
-        dashboard_response = erp_client.session.get(f"{erp_client.base_url}/dashboard", verify=False)
-        if dashboard_response.status_code != 200 or 'login' in dashboard_response.url:
-            # Re-authenticate
-            erp_email = os.getenv("ERP_EMAIL")
-            erp_password = os.getenv("ERP_PASSWORD")
-            if not erp_client.login(erp_email, erp_password):
-                print("Failed to authenticate with ERP")
-                print(f"Using email: {erp_email}")
-                print("Cookies:", erp_client.session.cookies.get_dict())
-                raise HTTPException(status_code=401, detail="ERP authentication failed")
+        if not await ensure_erp_login():
+            raise HTTPException(status_code=401, detail="ERP authentication failed")
+
+        if output_format:
+            result = await async_erp_client.refresh_contracts(force_full_refresh=force_refresh)
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=result["error"])
+            body = await asyncio.to_thread(encode_frame, erp_client.stored_data, output_format)
+            return columnar_response(body, output_format)
+
+        if streaming:
+            return await ndjson_response(dispatcher.iterate(
+                "erp", erp_client.iter_contract_records, force_full_refresh=force_refresh
+            ))
 
         # Get the data with optional force refresh
-        result = erp_client.get_contracts_as_json(force_full_refresh=force_refresh)
+        result = await async_erp_client.get_contracts_as_json(force_full_refresh=force_refresh)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -427,15 +837,17 @@ async def get_erp_data(force_refresh: bool = False):
         weekly_stats = result.get("weekly_stats", [])
         
         # Prepare the final response
-        return {
+        return encoded_response(request, {
             "success": result.get("success", False),
             "data": result.get("data", []),
             "type": result.get("type", "incremental"),
             "new_records": result.get("new_records", 0),
             "daily_stats": daily_stats,
             "weekly_stats": weekly_stats
-        }
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_erp_data: {str(e)}")
         import traceback
@@ -466,15 +878,18 @@ async def get_jobs(company: Optional[str] = None):
         
         # Login if needed
         if not jobs_client.session.cookies:
-            if not jobs_client.login(username, password):
+            session_name = company.lower() if company else "moncallcenter"
+            if not await dispatcher.run("mcdesk", login_shared, session_name, jobs_client, username, password):
                 raise HTTPException(
                     status_code=401,
                     detail=f"Failed to authenticate with {company.upper() if company else 'MONCALLCENTER'}"
                 )
         
         # Get and return jobs
-        return jobs_client.get_jobs(company)
+        return await dispatcher.run("mcdesk", jobs_client.get_jobs, company)
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_jobs: {str(e)}")
         import traceback
@@ -486,7 +901,7 @@ async def duplicate_random_job():
     """Duplicate a random job offer"""
     try:
         # Check if logged in
-        if not jobs_client.check_login():
+        if not await dispatcher.run("mcdesk", jobs_client.check_login):
             # Try to login
             username = os.getenv("MONCALLCENTER_LOGIN")
             password = os.getenv("MONCALLCENTER_PASSWORD")
@@ -497,14 +912,14 @@ async def duplicate_random_job():
                     detail="Missing moncallcenter.ma credentials"
                 )
                 
-            if not jobs_client.login(username, password):
+            if not await dispatcher.run("mcdesk", login_shared, "moncallcenter", jobs_client, username, password):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate with moncallcenter.ma"
                 )
 
         # Try to duplicate a random job
-        result = jobs_client.duplicate_random_job()
+        result = await dispatcher.run("mcdesk", jobs_client.duplicate_random_job)
         
         if not result["success"]:
             raise HTTPException(
@@ -531,7 +946,7 @@ async def duplicate_random_xpercia_job():
     """Duplicate a random Xpercia job offer"""
     try:
         # Check if logged in
-        if not xpercia_client.check_login():
+        if not await dispatcher.run("mcdesk", xpercia_client.check_login):
             # Try to login
             if not all([XPERCIA_LOGIN, XPERCIA_PASSWORD]):
                 raise HTTPException(
@@ -539,14 +954,14 @@ async def duplicate_random_xpercia_job():
                     detail="Missing Xpercia credentials"
                 )
                 
-            if not xpercia_client.login(XPERCIA_LOGIN, XPERCIA_PASSWORD):
+            if not await dispatcher.run("mcdesk", login_shared, "xpercia", xpercia_client, XPERCIA_LOGIN, XPERCIA_PASSWORD):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate Xpercia account"
                 )
 
         # Try to duplicate a random job
-        result = xpercia_client.duplicate_random_job("xpercia")
+        result = await dispatcher.run("mcdesk", xpercia_client.duplicate_random_job, "xpercia")
         
         if not result["success"]:
             raise HTTPException(
@@ -571,23 +986,29 @@ async def duplicate_random_xpercia_job():
 async def get_cands(company: Optional[str] = None):
     """Get candidate listings from moncallcenter.ma"""
     try:
-        if not perextel_client.check_login():
+        snapshot = await snapshot_response("perextel_candidatures")
+        if snapshot is not None:
+            return snapshot
+
+        if not await async_perextel_client.check_login():
             if not all([PEREXTEL_LOGIN, PEREXTEL_PASSWORD]):
                 raise HTTPException(
                     status_code=500, 
                     detail="Missing Perextel credentials"
                 )
-            if not perextel_client.login(PEREXTEL_LOGIN, PEREXTEL_PASSWORD):
+            if not await dispatcher.run("mcdesk", login_shared, "perextel", perextel_client, PEREXTEL_LOGIN, PEREXTEL_PASSWORD):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate Perextel account"
                 )
         
-        result = perextel_client.get_candidatures()
+        result = await async_perextel_client.get_candidatures()
         
         
         return result
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_cands: {str(e)}")
         import traceback
@@ -598,23 +1019,29 @@ async def get_cands(company: Optional[str] = None):
 async def get_cands(company: Optional[str] = None):
     """Get candidate listings from moncallcenter.ma"""
     try:
-        if not xpercia_client.check_login():
+        snapshot = await snapshot_response("xpercia_candidatures")
+        if snapshot is not None:
+            return snapshot
+
+        if not await async_xpercia_client.check_login():
             if not all([XPERCIA_LOGIN, XPERCIA_PASSWORD]):
                 raise HTTPException(
                     status_code=500, 
                     detail="Missing xpercia credentials"
                 )
-            if not xpercia_client.login(XPERCIA_LOGIN, XPERCIA_PASSWORD):
+            if not await dispatcher.run("mcdesk", login_shared, "xpercia", xpercia_client, XPERCIA_LOGIN, XPERCIA_PASSWORD):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate xpercia account"
                 )
         
-        result = xpercia_client.get_candidatures()
+        result = await async_xpercia_client.get_candidatures()
         
         
         return result
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_cands: {str(e)}")
         import traceback
@@ -627,7 +1054,7 @@ async def duplicate_random_perextel_job():
     """Duplicate a random Perextel job offer"""
     try:
         # Check if logged in
-        if not perextel_client.check_login():
+        if not await dispatcher.run("mcdesk", perextel_client.check_login):
             # Try to login
             if not all([PEREXTEL_LOGIN, PEREXTEL_PASSWORD]):
                 raise HTTPException(
@@ -635,14 +1062,14 @@ async def duplicate_random_perextel_job():
                     detail="Missing Perextel credentials"
                 )
                 
-            if not perextel_client.login(PEREXTEL_LOGIN, PEREXTEL_PASSWORD):
+            if not await dispatcher.run("mcdesk", login_shared, "perextel", perextel_client, PEREXTEL_LOGIN, PEREXTEL_PASSWORD):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate Perextel account"
                 )
 
         # Try to duplicate a random job
-        result = perextel_client.duplicate_random_job("perextel")
+        result = await dispatcher.run("mcdesk", perextel_client.duplicate_random_job, "perextel")
         
         if not result["success"]:
             raise HTTPException(
@@ -672,17 +1099,19 @@ async def get_campaign_qualifications(request: CampaignRequest):
             print("No session cookies found - attempting to re-login")
             crm_username = os.getenv("CRM_USERNAME")
             crm_password = os.getenv("CRM_PASSWORD")
-            if not crm_client.login(crm_username, crm_password):
+            if not await dispatcher.run("crm", login_shared, "crm", crm_client, crm_username, crm_password):
                 raise HTTPException(status_code=401, detail="Failed to authenticate with CRM")
         
         # Get qualifications using the client instance
-        result = crm_client.get_campaign_qualifs(request.campaign_ids)
+        result = await dispatcher.run("crm", crm_client.get_campaign_qualifs, request.campaign_ids)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
             
         return result
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_campaign_qualifications: {str(e)}")
         import traceback
@@ -691,31 +1120,56 @@ async def get_campaign_qualifications(request: CampaignRequest):
 
 
 @app.post("/api/crm/search")
-async def search_crm_data(request: SearchRequest):
-    """Dynamic search endpoint for CRM data"""
+async def search_crm_data(search: SearchRequest, request: Request, stream: bool = False):
+    """
+    Dynamic search endpoint for CRM data. offset/limit return one page of the
+    results; ?stream=1 (or Accept: application/x-ndjson) pages through all of
+    them in limit-sized requests (SEARCH_PAGE_SIZE by default).
+    """
     try:
         # Check if we're logged in
         if not crm_client.session.cookies:
             print("No session cookies found - attempting to re-login")
             crm_username = os.getenv("CRM_USERNAME")
             crm_password = os.getenv("CRM_PASSWORD")
-            if not crm_client.login(crm_username, crm_password):
+            if not await dispatcher.run("crm", login_shared, "crm", crm_client, crm_username, crm_password):
                 raise HTTPException(status_code=401, detail="Failed to authenticate with CRM")
 
+        if (search.limit is not None and search.limit <= 0) or (search.offset or 0) < 0:
+            raise HTTPException(status_code=422, detail="offset must be >= 0 and limit > 0")
+
+        if wants_ndjson(request, stream):
+            return await ndjson_response(dispatcher.iterate(
+                "crm",
+                crm_client.iter_search_records,
+                campaign_ids=search.campaign_ids,
+                qualif_types=search.qualif_types,
+                qualif_ids=search.qualif_ids,
+                start_date=search.start_date,
+                end_date=search.end_date,
+                page_size=search.limit or int(os.getenv("SEARCH_PAGE_SIZE", 500))
+            ))
+
         # Get the data using the client instance
-        result = crm_client.search_data(
-            campaign_ids=request.campaign_ids,
-            qualif_types=request.qualif_types,
-            qualif_ids=request.qualif_ids,
-            start_date=request.start_date,
-            end_date=request.end_date
+        result = await dispatcher.run(
+            "crm",
+            crm_client.search_data,
+            campaign_ids=search.campaign_ids,
+            qualif_types=search.qualif_types,
+            qualif_ids=search.qualif_ids,
+            start_date=search.start_date,
+            end_date=search.end_date,
+            offset=search.offset or 0,
+            limit=search.limit
         )
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
             
-        return result
+        return encoded_response(request, result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in search_crm_data: {str(e)}")
         import traceback
@@ -723,23 +1177,51 @@ async def search_crm_data(request: SearchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/crm/data/incremental")
-async def get_incremental_data():
+async def get_incremental_data(request: Request, since: int = 0, limit: int = 100, stream: bool = False):
     """
-    Endpoint for getting incremental CRM data in 15-minute chunks.
-    Designed to be called by a cron job every 15 minutes.
+    Endpoint for reading the incremental CRM feed. Each scheduler run appends
+    its windows with new records to the feed; a consumer passes the cursor
+    returned by its previous call as ?since= and gets every run after it
+    (at most `limit` runs, `has_more` tells to call again). Passing a cursor
+    is the acknowledgement: nothing is consumed by reading, so consumers
+    never lose or steal each other's records. since=0 reads from the oldest
+    retained run; 410 means the cursor fell behind the retention.
+    ?stream=1 (or Accept: application/x-ndjson) streams the records, with
+    the next cursor in the X-Feed-Cursor header.
     """
     try:
-        # Get current time
-        current_time = datetime.now()
-        
-        # Get incremental data
-        result = crm_incremental_client.get_incremental_data(current_time)
-        
-        if "error" in result:
-            raise HTTPException(status_code=500, detail=result["error"])
-            
-        return result
+        if os.getenv("SCHEDULER_ENABLED", "1") == "0":
+            # No background run: fetch the new windows into the feed first
+            if not await ensure_incremental_login():
+                raise HTTPException(status_code=401, detail="Failed to authenticate with CRM")
+            await dispatcher.run("crm", append_incremental_run, datetime.now())
+
+        try:
+            runs, cursor, has_more = await asyncio.to_thread(crm_feed.read, since, max(1, limit))
+        except FeedCursorExpired as e:
+            raise HTTPException(status_code=410, detail=str(e))
+
+        if wants_ndjson(request, stream):
+            async def batches():
+                for run in runs:
+                    yield run["data"]
+            response = await ndjson_response(batches())
+            response.headers["X-Feed-Cursor"] = str(cursor)
+            return response
+
+        return encoded_response(request, {
+            "success": True,
+            "data": [record for run in runs for record in run["data"]],
+            "cursor": cursor,
+            "has_more": has_more,
+            "runs": [
+                {"seq": run["seq"], "published_at": datetime.fromtimestamp(run["published_at"]).isoformat(), **run["metadata"]}
+                for run in runs
+            ]
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in incremental endpoint: {str(e)}")
         import traceback
@@ -757,7 +1239,7 @@ async def get_neo_contracts(
     """Get contracts data from Neoliane extranet"""
     try:
         # Get the contracts data
-        result = await neo_client.get_contracts(
+        result = await async_neo_client.get_contracts(
             start_date=start_date,
             end_date=end_date,
             page=page,
@@ -772,6 +1254,8 @@ async def get_neo_contracts(
             
         return result
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in get_neo_contracts: {str(e)}")
         import traceback
@@ -785,13 +1269,13 @@ async def export_perextel_cands_to_csv(
 ):
     """Export Perextel candidate listings to a CSV file"""
     try:
-        if not perextel_client.check_login():
+        if not await dispatcher.run("mcdesk", perextel_client.check_login):
             if not all([PEREXTEL_LOGIN, PEREXTEL_PASSWORD]):
                 raise HTTPException(
                     status_code=500, 
                     detail="Missing Perextel credentials"
                 )
-            if not perextel_client.login(PEREXTEL_LOGIN, PEREXTEL_PASSWORD):
+            if not await dispatcher.run("mcdesk", login_shared, "perextel", perextel_client, PEREXTEL_LOGIN, PEREXTEL_PASSWORD):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate Perextel account"
@@ -803,10 +1287,12 @@ async def export_perextel_cands_to_csv(
             filename = f"perextel_candidatures_{timestamp}.csv"
         
         # Export to CSV
-        result = perextel_client.export_candidatures_to_csv(company, filename)
+        result = await dispatcher.run("mcdesk", perextel_client.export_candidatures_to_csv, company, filename)
         
         return {"message": result, "filename": filename}
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in export_perextel_cands_to_csv: {str(e)}")
         import traceback
@@ -820,13 +1306,13 @@ async def export_xpercia_cands_to_csv(
 ):
     """Export Xpercia candidate listings to a CSV file"""
     try:
-        if not xpercia_client.check_login():
+        if not await dispatcher.run("mcdesk", xpercia_client.check_login):
             if not all([XPERCIA_LOGIN, XPERCIA_PASSWORD]):
                 raise HTTPException(
                     status_code=500, 
                     detail="Missing Xpercia credentials"
                 )
-            if not xpercia_client.login(XPERCIA_LOGIN, XPERCIA_PASSWORD):
+            if not await dispatcher.run("mcdesk", login_shared, "xpercia", xpercia_client, XPERCIA_LOGIN, XPERCIA_PASSWORD):
                 raise HTTPException(
                     status_code=401, 
                     detail="Failed to authenticate Xpercia account"
@@ -838,10 +1324,12 @@ async def export_xpercia_cands_to_csv(
             filename = f"xpercia_candidatures_{timestamp}.csv"
         
         # Export to CSV
-        result = xpercia_client.export_candidatures_to_csv(company, filename)
+        result = await dispatcher.run("mcdesk", xpercia_client.export_candidatures_to_csv, company, filename)
         
         return {"message": result, "filename": filename}
         
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in export_xpercia_cands_to_csv: {str(e)}")
         import traceback
@@ -875,14 +1363,14 @@ async def export_cands_to_csv(
             )
         
         # Check login and authenticate if needed
-        if not client.check_login():
+        if not await dispatcher.run("mcdesk", client.check_login):
             login, password = credentials
             if not all([login, password]):
                 raise HTTPException(
                     status_code=500,
                     detail=f"Missing {company} credentials"
                 )
-            if not client.login(login, password):
+            if not await dispatcher.run("mcdesk", login_shared, company.lower(), client, login, password):
                 raise HTTPException(
                     status_code=401,
                     detail=f"Failed to authenticate {company} account"
@@ -894,7 +1382,7 @@ async def export_cands_to_csv(
             filename = f"{company}_candidatures_{timestamp}.csv"
         
         # Export to CSV
-        result = client.export_candidatures_to_csv(company, filename)
+        result = await dispatcher.run("mcdesk", client.export_candidatures_to_csv, company, filename)
         
         return {
             "message": result,
@@ -952,21 +1440,21 @@ async def export_cands_to_sheet(
             )
         
         # Check login and authenticate if needed
-        if not client.check_login():
+        if not await dispatcher.run("mcdesk", client.check_login):
             login, password = credentials
             if not all([login, password]):
                 raise HTTPException(
                     status_code=500,
                     detail=f"Missing {company} credentials"
                 )
-            if not client.login(login, password):
+            if not await dispatcher.run("mcdesk", login_shared, company.lower(), client, login, password):
                 raise HTTPException(
                     status_code=401,
                     detail=f"Failed to authenticate {company} account"
                 )
         
         # Export to Google Sheet
-        result = client.export_candidatures_to_google_sheet(SHEET_ID, company, sheet_name)
+        result = await dispatcher.run("mcdesk", client.export_candidatures_to_google_sheet, SHEET_ID, company, sheet_name)
         
         return {
             "message": result,
@@ -996,6 +1484,8 @@ async def export_perextel_cands_to_sheet(
     """
     try:
         return await export_cands_to_sheet(company="perextel", sheet_name=sheet_name)
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in export_perextel_cands_to_sheet: {str(e)}")
         import traceback
@@ -1015,6 +1505,8 @@ async def export_xpercia_cands_to_sheet(
     """
     try:
         return await export_cands_to_sheet(company="xpercia", sheet_name=sheet_name)
+    except UpstreamBusyError:
+        raise
     except Exception as e:
         print(f"Error in export_xpercia_cands_to_sheet: {str(e)}")
         import traceback
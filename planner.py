@@ -0,0 +1,190 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from dispatch import normalize_range
+
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SHARD_SPANS = {
+    "day": timedelta(days=1),
+    "hour": timedelta(hours=1),
+}
+
+
+def _next_boundary(moment: datetime, span: str) -> datetime:
+    """Start of the day or hour following moment"""
+    if span == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0) + SHARD_SPANS["hour"]
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0) + SHARD_SPANS["day"]
+
+
+def plan_range(start_date, end_date, span=None) -> List[Tuple[str, str]]:
+    """
+    Split a CRM range into consecutive (start, end) shards aligned on whole
+    days or hours (CRM_SHARD_SPAN, "day" by default). Bounds are inclusive
+    to the second like the export's dateprod fields; the first and last
+    shards keep the requested start and end.
+    """
+    span = span or os.getenv("CRM_SHARD_SPAN", "day")
+    if span not in SHARD_SPANS:
+        raise ValueError(f"Unknown shard span {span!r}, expected one of {sorted(SHARD_SPANS)}")
+
+    start_date, end_date = normalize_range(start_date, end_date)
+    try:
+        start, end = datetime.strptime(start_date, DATE_FORMAT), datetime.strptime(end_date, DATE_FORMAT)
+    except ValueError:
+        # Unparseable dates: let the CRM answer for the range as given
+        return [(start_date, end_date)]
+
+    shards = []
+    while start <= end:
+        shard_end = min(_next_boundary(start, span) - timedelta(seconds=1), end)
+        shards.append((start.strftime(DATE_FORMAT), shard_end.strftime(DATE_FORMAT)))
+        start = shard_end + timedelta(seconds=1)
+    return shards or [(start_date, end_date)]
+
+
+class IntervalPlanner:
+    """
+    Adaptive windows for the incremental CRM fetcher.
+
+    Learns the row density (rows per minute) of each quarter hour of the day
+    with an EWMA over past exports, persisted in a JSON file shared by the
+    workers. Quiet stretches are merged into windows of up to max_window,
+    dense quarter hours are split so each export stays near target_rows.
+    Windows never cross midnight. Quarter hours never observed are seeded
+    from one countresult probe over the planned range.
+    """
+    SLOT_MINUTES = 15
+    SLOTS = 24 * 60 // SLOT_MINUTES
+
+    def __init__(self, path=None, target_rows=None, max_window=None, min_window=None, alpha=None,
+                 namespace="ringassur"):
+        self.path = path or os.path.join(
+            os.getenv("CRM_DENSITY_DIR", tempfile.gettempdir()), f"{namespace}_density.json"
+        )
+        self.target_rows = target_rows or int(os.getenv("CRM_TARGET_ROWS", 2000))
+        self.max_window = timedelta(seconds=max_window or int(os.getenv("CRM_MAX_WINDOW", 6 * 3600)))
+        self.min_window = timedelta(seconds=min_window or int(os.getenv("CRM_MIN_WINDOW", 60)))
+        self.alpha = alpha or float(os.getenv("CRM_DENSITY_ALPHA", 0.3))
+        self._lock = threading.Lock()
+        self.density = [None] * self.SLOTS  # rows per minute, None until observed
+        self.load()
+
+    @classmethod
+    def _slot(cls, moment):
+        return (moment.hour * 60 + moment.minute) // cls.SLOT_MINUTES
+
+    @classmethod
+    def _slot_end(cls, moment):
+        """Start of the quarter hour following moment"""
+        start = moment.replace(minute=moment.minute - moment.minute % cls.SLOT_MINUTES, second=0, microsecond=0)
+        return start + timedelta(minutes=cls.SLOT_MINUTES)
+
+    def _segments(self, start, end):
+        """(slot, minutes) pieces of [start, end) cut on quarter hours"""
+        cursor = start
+        while cursor < end:
+            piece_end = min(self._slot_end(cursor), end)
+            yield self._slot(cursor), (piece_end - cursor).total_seconds() / 60
+            cursor = piece_end
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                density = json.load(f).get("density", [])
+            if len(density) == self.SLOTS:
+                self.density = density
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading interval densities {self.path}: {str(e)}")
+
+    def save(self):
+        """Atomically rewrite the shared density file"""
+        try:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"density": self.density, "updated_at": datetime.now().isoformat()}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving interval densities {self.path}: {str(e)}")
+
+    def observe(self, start, end, rows):
+        """Fold the row count of an exported window into the densities of its quarter hours"""
+        minutes = (end - start).total_seconds() / 60
+        if minutes <= 0:
+            return
+        rate = rows / minutes
+        with self._lock:
+            for slot, _ in self._segments(start, end):
+                previous = self.density[slot]
+                self.density[slot] = rate if previous is None else (1 - self.alpha) * previous + self.alpha * rate
+
+    def expected_rows(self, start, end):
+        return sum((self.density[slot] or 0) * minutes for slot, minutes in self._segments(start, end))
+
+    def _seed(self, start, end, count_fn):
+        """Give unobserved quarter hours of the range the average density reported by countresult"""
+        unknown = {slot for slot, _ in self._segments(start, end) if self.density[slot] is None}
+        if not unknown or count_fn is None:
+            return
+        total = count_fn(start, end)
+        if total is None:
+            return
+        minutes = (end - start).total_seconds() / 60
+        with self._lock:
+            for slot in unknown:
+                self.density[slot] = total / minutes if minutes else 0
+
+    def _split(self, start, end, expected):
+        """Cut a dense stretch into equal windows of about target_rows (not shorter than min_window)"""
+        parts = max(1, int(expected // self.target_rows) + (expected % self.target_rows > 0))
+        step = max((end - start) / parts, self.min_window)
+        windows = []
+        cursor = start
+        while cursor < end:
+            window_end = min(cursor + step, end)
+            windows.append((cursor, window_end))
+            cursor = window_end
+        return windows
+
+    def plan(self, start, end, count_fn=None):
+        """Consecutive (start, end) datetimes covering [start, end), sized for target_rows"""
+        # Pick up what the other workers learned
+        self.load()
+        self._seed(start, end, count_fn)
+        windows = []
+        cursor = start
+        while cursor < end:
+            midnight = cursor.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            limit = min(end, midnight, cursor + self.max_window)
+
+            # Grow the window one quarter hour at a time while it stays under target
+            window_end, expected = cursor, 0
+            while window_end < limit:
+                step_end = min(self._slot_end(window_end), limit)
+                step_rows = self.expected_rows(window_end, step_end)
+                if window_end > cursor and expected + step_rows > self.target_rows:
+                    break
+                window_end, expected = step_end, expected + step_rows
+
+            if expected > self.target_rows:
+                windows.extend(self._split(cursor, window_end, expected))
+            else:
+                windows.append((cursor, window_end))
+            cursor = window_end
+        return windows
+
+    def metrics(self) -> dict:
+        known = [d for d in self.density if d is not None]
+        return {
+            "observed_slots": len(known),
+            "peak_rows_per_minute": round(max(known), 2) if known else None,
+            "target_rows": self.target_rows
+        }
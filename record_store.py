@@ -0,0 +1,241 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to a process-local lock
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parts are pickled frames without pyarrow
+    pa = None
+    pq = None
+
+
+UNIQUE_KEY = 'CMK_S_FIELD_ID_UNIQUE'
+
+
+def _dedup(df):
+    """Keep the last (most recently stored) row of each non-empty CMK_S_FIELD_ID_UNIQUE"""
+    if UNIQUE_KEY not in df.columns:
+        return df
+    ids = df[UNIQUE_KEY]
+    return df[~(ids.notna() & ids.duplicated(keep="last"))].reset_index(drop=True)
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class RecordStore:
+    """
+    Append-only local store of cleaned CRM records, one directory per tenant
+    and day holding Parquet parts (pickled frames without pyarrow).
+
+    The incremental fetcher appends every window and records which part of
+    the day it covered; a closed day covered from 00:00 to 24:00 is sealed
+    and compacted into one deduplicated part. Closed days exported in full
+    for a historical query are written sealed directly. Sealed days are
+    served locally; days past the retention are deleted.
+    """
+    def __init__(self, root=None, retention_days=None, namespace="ringassur"):
+        self.root = os.path.join(
+            root or os.getenv("CRM_STORE_DIR", os.path.join(tempfile.gettempdir(), "ringassur_store")),
+            namespace
+        )
+        self.retention_days = retention_days or int(os.getenv("CRM_STORE_RETENTION_DAYS", 90))
+        self.extension = "parquet" if pq is not None else "pkl"
+        self._thread_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+        # Metrics
+        self.reads = 0
+        self.appends = 0
+        self.compactions = 0
+
+    def _day_dir(self, day):
+        return os.path.join(self.root, day)
+
+    @contextmanager
+    def _lock(self, day):
+        """Exclusive lock on one day, across threads and processes"""
+        os.makedirs(self._day_dir(day), exist_ok=True)
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self._day_dir(day), ".lock"), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _parts(self, day):
+        """Part files of a day, oldest first (their names start with the write time)"""
+        try:
+            names = os.listdir(self._day_dir(day))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            os.path.join(self._day_dir(day), name) for name in names
+            if name.startswith("part-") and name.endswith((".parquet", ".pkl"))
+        )
+
+    def _write_part(self, day, frame):
+        path = os.path.join(self._day_dir(day), f"part-{time.time_ns()}-{os.getpid()}.{self.extension}")
+        tmp_path = f"{path}.tmp"
+        if pq is not None:
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp_path)
+        else:
+            frame.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _read_part(path):
+        if path.endswith(".parquet"):
+            return pq.read_table(path).to_pandas()
+        return pd.read_pickle(path)
+
+    def _read_parts(self, parts):
+        frames = [frame for frame in (self._read_part(path) for path in parts) if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return _dedup(pd.concat(frames, ignore_index=True))
+
+    def _state_path(self, day):
+        return os.path.join(self._day_dir(day), "state.json")
+
+    def _read_state(self, day):
+        try:
+            with open(self._state_path(day), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"sealed": False, "covered": []}
+
+    def _write_state(self, day, state):
+        tmp_path = f"{self._state_path(day)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._state_path(day))
+
+    def _expired(self, day):
+        return day < (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+
+    def is_sealed(self, day):
+        return self._read_state(day).get("sealed", False)
+
+    def append(self, day, frame):
+        """Add a part of cleaned records to a day (duplicates are dropped on read and compaction)"""
+        if frame is None or frame.empty or self._expired(day):
+            return
+        with self._lock(day):
+            self._write_part(day, frame)
+            self.appends += 1
+
+    def write_day(self, day, frame):
+        """Store the full export of a closed day as its only part and seal it"""
+        if self._expired(day):
+            return
+        with self._lock(day):
+            old_parts = self._parts(day)
+            self._write_part(day, _dedup(frame))
+            self._write_state(day, {"sealed": True, "covered": [[f"{day}T00:00:00", self._next_day(day)]]})
+            for path in old_parts:
+                os.remove(path)
+
+    @staticmethod
+    def _next_day(day):
+        return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S")
+
+    def mark_covered(self, start_time, end_time):
+        """Record that the incremental fetcher stored [start_time, end_time); seals closed days fully covered"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        day_start = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day_start < end_time:
+            day = day_start.strftime("%Y-%m-%d")
+            next_day = day_start + timedelta(days=1)
+            interval = [max(start_time, day_start).isoformat(), min(end_time, next_day).isoformat()]
+            seal = False
+            with self._lock(day):
+                state = self._read_state(day)
+                if not state.get("sealed"):
+                    state["covered"] = _merge_intervals([*state.get("covered", []), interval])
+                    covered = state["covered"]
+                    seal = (
+                        day < today and len(covered) == 1
+                        and covered[0][0] <= day_start.isoformat() and covered[0][1] >= next_day.isoformat()
+                    )
+                    state["sealed"] = seal
+                    self._write_state(day, state)
+            if seal:
+                self.compact(day)
+            day_start = next_day
+
+    def read_day(self, day):
+        """Deduplicated records of a day (empty frame if nothing is stored)"""
+        self.reads += 1
+        # Under the day lock so a concurrent compaction can't remove parts mid-read
+        with self._lock(day):
+            return self._read_parts(self._parts(day))
+
+    def compact(self, day):
+        """Rewrite a day's parts as one deduplicated part"""
+        with self._lock(day):
+            parts = self._parts(day)
+            if len(parts) <= 1:
+                return False
+            self._write_part(day, self._read_parts(parts))
+            for path in parts:
+                os.remove(path)
+            self.compactions += 1
+            return True
+
+    def days(self):
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def maintain(self) -> dict:
+        """Compact sealed days and delete the ones past the retention"""
+        compacted, deleted = 0, 0
+        for day in self.days():
+            try:
+                if self._expired(day):
+                    shutil.rmtree(self._day_dir(day))
+                    deleted += 1
+                elif self.is_sealed(day) and self.compact(day):
+                    compacted += 1
+            except Exception as e:
+                print(f"Error maintaining record store day {day}: {str(e)}")
+        return {"compacted": compacted, "deleted": deleted}
+
+    def metrics(self) -> dict:
+        days = self.days()
+        parts = [path for day in days for path in self._parts(day)]
+        return {
+            "days": len(days),
+            "sealed_days": sum(1 for day in days if self.is_sealed(day)),
+            "parts": len(parts),
+            "bytes": sum(os.path.getsize(path) for path in parts if os.path.exists(path)),
+            "format": self.extension,
+            "retention_days": self.retention_days,
+            "reads": self.reads,
+            "appends": self.appends,
+            "compactions": self.compactions
+        }
@@ -0,0 +1,100 @@
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+# Columns whose values repeat a lot (agents, qualifications, campaigns...) are
+# interned when at most this fraction of their values is distinct
+INTERN_RATIO = 0.25
+
+
+def _intern_column(values: List) -> List:
+    """Share one string object per distinct value of a low-cardinality column"""
+    distinct = len(set(values))
+    if distinct > max(1, len(values) * INTERN_RATIO):
+        return values
+    return [sys.intern(v) if type(v) is str else v for v in values]
+
+
+class RecordBatch:
+    """
+    Column-oriented batch of CRM records.
+
+    Holds one list per column instead of one dict per row, with the column
+    names stored once and repeated strings interned. Converts to plain dicts
+    only at the edge (iteration, to_records, the response encoders).
+    """
+    __slots__ = ('columns', 'values')
+
+    def __init__(self, columns: Sequence[str], values: Sequence[List]):
+        self.columns = tuple(columns)
+        self.values = [_intern_column(list(column)) for column in values]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'RecordBatch':
+        records = list(records)
+        columns = []
+        for record in records:
+            for name in record:
+                if name not in columns:
+                    columns.append(name)
+        return cls(columns, [[record.get(name) for record in records] for name in columns])
+
+    @classmethod
+    def empty(cls) -> 'RecordBatch':
+        return cls((), [])
+
+    def __len__(self) -> int:
+        return len(self.values[0]) if self.values else 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in zip(*self.values):
+            yield dict(zip(self.columns, row))
+
+    def __getstate__(self):
+        return self.columns, self.values
+
+    def __setstate__(self, state):
+        self.columns, self.values = state
+
+    def to_records(self) -> List[Dict]:
+        return list(self)
+
+    def column(self, name: str) -> List:
+        return self.values[self.columns.index(name)]
+
+    def take(self, indices: Sequence[int]) -> 'RecordBatch':
+        """New batch with the rows at the given positions"""
+        return RecordBatch(self.columns, [[column[i] for i in indices] for column in self.values])
+
+    def unique(self, key: str, seen: Optional[set] = None) -> 'RecordBatch':
+        """Rows with a non-empty key not in seen (first occurrence wins); seen is updated"""
+        if key not in self.columns:
+            return RecordBatch.empty()
+        seen = set() if seen is None else seen
+        keep = []
+        for i, value in enumerate(self.column(key)):
+            if value and value not in seen:
+                seen.add(value)
+                keep.append(i)
+        return self.take(keep)
+
+    @classmethod
+    def concat(cls, batches: Iterable['RecordBatch']) -> 'RecordBatch':
+        """Concatenate batches, filling columns missing from a batch with None"""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        columns = list(batches[0].columns)
+        for batch in batches[1:]:
+            columns.extend(name for name in batch.columns if name not in columns)
+
+        values = []
+        for name in columns:
+            merged = []
+            for batch in batches:
+                if name in batch.columns:
+                    merged.extend(batch.column(name))
+                else:
+                    merged.extend([None] * len(batch))
+            values.append(merged)
+        return cls(columns, values)
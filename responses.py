@@ -0,0 +1,179 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from records import RecordBatch
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack output is optional
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar formats are optional
+    pa = None
+    pq = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# ?format= values and the media types they map to
+COLUMNAR_FORMATS = {
+    "arrow": ARROW_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE
+}
+
+
+def _default(value):
+    """Types orjson/msgpack do not encode natively: record batches, pandas/numpy scalars, dates, decimals"""
+    if isinstance(value, RecordBatch):
+        return value.to_records()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, pd.Period):
+        # e.g. the "Month" of the ERP weekly stats, sent as "2024-03"
+        return str(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+        # NaN floats are sent as null, like pandas' to_json
+        return None if isinstance(value, float) and value != value else value
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content to JSON bytes in one pass"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, default=_default).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded straight to bytes with orjson"""
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPES[0]
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+def encoded_response(request: Request, content: Any) -> Response:
+    """
+    Encode a route result as msgpack when the client accepts it, orjson otherwise.
+    Returning a Response skips FastAPI's jsonable_encoder walk over the payload.
+    """
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return MsgpackResponse(content)
+    return FastJSONResponse(content)
+
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    """Streaming is opt-in through ?stream=1 or an Accept: application/x-ndjson header"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_lines(batch):
+    return b"".join(dumps(record) + b"\n" for record in batch)
+
+
+async def ndjson_response(batches) -> StreamingResponse:
+    """
+    Stream an async iterator of record batches as NDJSON. The first batch is
+    fetched before the response starts so upstream errors still map to a
+    proper HTTP status instead of a truncated 200. A later failure ends the
+    stream with an {"error": ...} line so consumers can tell it is incomplete.
+    """
+    first_batch = await anext(batches, None)
+
+    async def body():
+        try:
+            if first_batch:
+                yield _ndjson_lines(first_batch)
+            async for batch in batches:
+                yield _ndjson_lines(batch)
+        except Exception as e:
+            # Headers are already sent: log and end the stream with an error line
+            print(f"Error while streaming records: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield dumps({"error": detail}) + b"\n"
+        finally:
+            await batches.aclose()
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def columnar_format(request: Request, format: Optional[str] = None) -> Optional[str]:
+    """'arrow' or 'parquet' when asked for through ?format= or the Accept header, else None"""
+    if format:
+        format = format.lower()
+        if format not in COLUMNAR_FORMATS:
+            return None
+    else:
+        accept = request.headers.get("accept", "")
+        format = next((name for name, media_type in COLUMNAR_FORMATS.items() if media_type in accept), None)
+        if format is None:
+            return None
+
+    if pa is None:
+        raise HTTPException(status_code=406, detail=f"{format} output requires pyarrow on the server")
+    return format
+
+
+def _frame_to_table(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Object columns mixing numbers and strings: send them as strings
+        df = df.copy()
+        for col in df.select_dtypes(include=['object']).columns:
+            df[col] = df[col].map(lambda v: None if v is None or v != v else str(v))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def encode_frame(df, format: str) -> bytes:
+    """Serialize a DataFrame as an Arrow IPC stream or a Parquet file"""
+    table = _frame_to_table(df)
+    sink = pa.BufferOutputStream()
+    if format == "parquet":
+        pq.write_table(table, sink, compression='snappy')
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def columnar_response(body: bytes, format: str) -> Response:
+    return Response(content=body, media_type=COLUMNAR_FORMATS[format])
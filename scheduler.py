@@ -0,0 +1,165 @@
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: every process acts as leader
+    fcntl = None
+
+from responses import dumps
+
+
+class ScheduledJob:
+    def __init__(self, name, fn, interval, leader_only=True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.leader_only = leader_only
+        self.task = None
+        self.lock_file = None
+
+        # Status
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+
+    @property
+    def is_leader(self):
+        return self.lock_file is not None
+
+    def status(self) -> dict:
+        return {
+            "interval": self.interval,
+            "leader_only": self.leader_only,
+            "leader": self.is_leader,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run,
+            "last_duration_ms": round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            "last_error": self.last_error
+        }
+
+
+class BackgroundScheduler:
+    """
+    Runs refresh jobs from the app lifespan and publishes their results as
+    pre-encoded JSON snapshots on disk, shared by all uvicorn workers.
+
+    Only the worker holding a job's leader lock (a non-blocking flock kept for
+    the life of the process) runs it; the others keep retrying the lock so a
+    job moves to another worker when its leader exits.
+    """
+    def __init__(self, snapshot_dir=None):
+        self.snapshot_dir = snapshot_dir or os.getenv(
+            "SCHEDULER_DIR",
+            os.path.join(tempfile.gettempdir(), "ringassur_snapshots")
+        )
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self.jobs = {}
+
+    def add_job(self, name, fn, interval, leader_only=True):
+        """Register an async callable returning the payload to publish (or a dict with an "error" key)"""
+        self.jobs[name] = ScheduledJob(name, fn, interval, leader_only)
+
+    def _snapshot_path(self, name):
+        return os.path.join(self.snapshot_dir, f"{name}.json")
+
+    def _try_lead(self, job):
+        """Take the job's leader lock if no other worker holds it"""
+        if job.is_leader or not job.leader_only:
+            return True
+        if fcntl is None:
+            job.lock_file = True
+            return True
+
+        lock_file = open(os.path.join(self.snapshot_dir, f"{job.name}.leader.lock"), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        job.lock_file = lock_file
+        print(f"Worker {os.getpid()} is now leader for job {job.name}")
+        return True
+
+    def _release(self, job):
+        if job.lock_file not in (None, True):
+            try:
+                fcntl.flock(job.lock_file, fcntl.LOCK_UN)
+                job.lock_file.close()
+            except Exception:
+                pass
+        job.lock_file = None
+
+    def publish(self, name, payload):
+        """Atomically replace the snapshot of a job"""
+        path = self._snapshot_path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(dumps(payload))
+        os.replace(tmp_path, path)
+
+    def snapshot(self, name, max_age=None):
+        """
+        (published_at, JSON bytes) of the latest snapshot, or None if missing
+        or older than max_age. Blocking: call it from a thread.
+        """
+        try:
+            # The open file stays the same snapshot even if publish replaces it meanwhile
+            with open(self._snapshot_path(name), 'rb') as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                if max_age is not None and time.time() - mtime > max_age:
+                    return None
+                return mtime, f.read()
+        except FileNotFoundError:
+            return None
+
+    async def _run_once(self, job):
+        started_at = time.monotonic()
+        job.last_run = datetime.now().isoformat()
+        try:
+            payload = await job.fn()
+            if isinstance(payload, dict) and "error" in payload:
+                raise Exception(payload["error"])
+            if payload is not None:
+                await asyncio.to_thread(self.publish, job.name, payload)
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"Scheduled job {job.name} failed: {str(e)}")
+        finally:
+            job.runs += 1
+            job.last_duration = time.monotonic() - started_at
+
+    async def _loop(self, job):
+        while True:
+            if self._try_lead(job):
+                await self._run_once(job)
+            await asyncio.sleep(job.interval)
+
+    def start(self):
+        for job in self.jobs.values():
+            if job.task is None:
+                job.task = asyncio.create_task(self._loop(job), name=f"job-{job.name}")
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.task is not None:
+                job.task.cancel()
+                try:
+                    await job.task
+                except asyncio.CancelledError:
+                    pass
+                job.task = None
+            self._release(job)
+
+    def status(self) -> dict:
+        return {name: job.status() for name, job in self.jobs.items()}
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BloomFilter:
+    """Fixed-size membership filter: no false negatives for ids added in this process"""
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class SeenIndex:
+    """
+    Ids of the CRM records already delivered, persisted in SQLite and shared
+    by all uvicorn workers, so incremental runs only return records that are
+    actually new.
+
+    claim() is atomic across workers (INSERT ... ON CONFLICT DO NOTHING
+    RETURNING): an id is handed out by exactly one run. A Bloom filter of the
+    ids this process has seen keeps known ids away from SQLite; ids inserted
+    by other workers are missing from it, which only costs a conflicting insert.
+    """
+    CHUNK_SIZE = 500
+
+    def __init__(self, path=None, retention=None, bloom_bits=None, namespace="ringassur"):
+        self.path = path or os.path.join(
+            os.getenv("CRM_SEEN_INDEX_DIR", tempfile.gettempdir()), f"{namespace}_seen_ids.sqlite"
+        )
+        # Ids older than this are forgotten; incremental runs never look back more than a day
+        self.retention = retention or int(os.getenv("CRM_SEEN_RETENTION", 7 * 24 * 3600))
+        self.bloom_bits = bloom_bits or int(os.getenv("CRM_SEEN_BLOOM_BITS", 8 * 1024 * 1024))
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.claimed = 0
+        self.dropped = 0
+        self.bloom_hits = 0
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_ids (
+                    id TEXT PRIMARY KEY,
+                    seen_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS seen_ids_seen_at ON seen_ids (seen_at)")
+        self.prune()
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success, rolled back on error, and always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _rebuild_bloom(self, conn):
+        bloom = BloomFilter(self.bloom_bits, 7)
+        for (record_id,) in conn.execute("SELECT id FROM seen_ids"):
+            bloom.add(record_id)
+        self.bloom = bloom
+
+    def prune(self):
+        """Forget ids past the retention and rebuild the filter from what is left"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM seen_ids WHERE seen_at < ?", (time.time() - self.retention,))
+            self._rebuild_bloom(conn)
+
+    def claim(self, ids):
+        """Record the given ids as delivered and return those that were not delivered before"""
+        ids = list(dict.fromkeys(str(record_id) for record_id in ids if record_id))
+        if not ids:
+            return set()
+
+        now = time.time()
+        fresh = set()
+        with self._lock, self._connect() as conn:
+            # Ids the filter knows are confirmed in SQLite (the filter has false positives)
+            maybe_known = [record_id for record_id in ids if record_id in self.bloom]
+            known = set()
+            for i in range(0, len(maybe_known), self.CHUNK_SIZE):
+                chunk = maybe_known[i:i + self.CHUNK_SIZE]
+                known.update(row[0] for row in conn.execute(
+                    f"SELECT id FROM seen_ids WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            self.bloom_hits += len(known)
+
+            candidates = [record_id for record_id in ids if record_id not in known]
+            for i in range(0, len(candidates), self.CHUNK_SIZE):
+                chunk = candidates[i:i + self.CHUNK_SIZE]
+                rows = conn.execute(
+                    f"INSERT INTO seen_ids (id, seen_at) VALUES {','.join(['(?, ?)'] * len(chunk))} "
+                    "ON CONFLICT (id) DO NOTHING RETURNING id",
+                    [value for record_id in chunk for value in (record_id, now)]
+                ).fetchall()
+                fresh.update(row[0] for row in rows)
+
+            for record_id in ids:
+                self.bloom.add(record_id)
+            self.claimed += len(fresh)
+            self.dropped += len(ids) - len(fresh)
+        return fresh
+
+    def release(self, ids):
+        """Forget ids claimed for a batch that was never delivered, so the next run hands them out again"""
+        ids = list(dict.fromkeys(str(record_id) for record_id in ids if record_id))
+        if not ids:
+            return
+        with self._lock, self._connect() as conn:
+            for i in range(0, len(ids), self.CHUNK_SIZE):
+                chunk = ids[i:i + self.CHUNK_SIZE]
+                conn.execute(f"DELETE FROM seen_ids WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            # The ids stay in the Bloom filter: a false positive only costs a SELECT
+            self.claimed -= len(ids)
+
+    def metrics(self) -> dict:
+        with self._connect() as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM seen_ids").fetchone()[0]
+        return {
+            "stored_ids": stored,
+            "claimed": self.claimed,
+            "dropped": self.dropped,
+            "bloom_hits": self.bloom_hits,
+            "retention": self.retention
+        }
@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to a process-local lock
+    fcntl = None
+
+
+# Client attributes holding CSRF tokens that are not plain cookies (e.g. NeoClient.csrf_token)
+TOKEN_ATTRIBUTES = ('csrf_token',)
+
+
+def _client_sessions(client):
+    """requests sessions owned by a client (JobsClient also owns the mcdesk one)"""
+    sessions = {'session': client.session}
+    mcdesk_client = getattr(client, 'mcdesk_client', None)
+    if mcdesk_client is not None and mcdesk_client.session is not None:
+        sessions['mcdesk'] = mcdesk_client.session
+    return sessions
+
+
+def _dump_cookies(session):
+    return [
+        {
+            'name': cookie.name,
+            'value': cookie.value,
+            'domain': cookie.domain,
+            'path': cookie.path,
+            'expires': cookie.expires,
+            'secure': cookie.secure
+        }
+        for cookie in session.cookies
+    ]
+
+
+def _load_cookies(session, cookies):
+    session.cookies.clear()
+    for cookie in cookies:
+        session.cookies.set(
+            cookie['name'],
+            cookie['value'],
+            domain=cookie['domain'],
+            path=cookie['path'],
+            expires=cookie['expires'],
+            secure=cookie['secure']
+        )
+
+
+class SharedSessionStore:
+    """
+    Authenticated session state (cookies, XSRF/CSRF tokens, login headers)
+    shared by all uvicorn workers through a SQLite file. Logins are serialized
+    with a file lock so only one process re-authenticates when a session expires.
+    The file holds live cookies: it is created readable by its owner only.
+    """
+    def __init__(self, path=None, max_age=None):
+        self.path = path or os.getenv(
+            "SESSION_STORE_PATH",
+            os.path.join(tempfile.gettempdir(), "ringassur_sessions.sqlite")
+        )
+        # Sessions older than this are not adopted at startup (seconds)
+        self.max_age = max_age if max_age is not None else int(os.getenv("SESSION_MAX_AGE", 6 * 3600))
+        # Generation of the shared session each client of this process is using,
+        # per (name, client): several clients can share one account (e.g. "crm")
+        self.generations = {}
+        self._thread_locks = {}
+        self._thread_locks_guard = threading.Lock()
+
+        # Owner-only before SQLite first opens it (its journal files copy these permissions)
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(self.path, 0o600)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    name TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success, rolled back on error, and always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _lock(self, name):
+        """Exclusive lock for one upstream account, across threads and processes"""
+        with self._thread_locks_guard:
+            thread_lock = self._thread_locks.setdefault(name, threading.Lock())
+
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.path}.{name}.lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, name):
+        """Get the stored state for a session name"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT state, generation, updated_at FROM sessions WHERE name = ?", (name,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"state": json.loads(row[0]), "generation": row[1], "updated_at": row[2]}
+
+    def save(self, name, client):
+        """Publish the client's current session state and bump its generation"""
+        state = {
+            'sessions': {
+                key: {'cookies': _dump_cookies(session), 'headers': dict(session.headers)}
+                for key, session in _client_sessions(client).items()
+            },
+            'tokens': {
+                attr: getattr(client, attr) for attr in TOKEN_ATTRIBUTES if getattr(client, attr, None)
+            }
+        }
+        with self._connect() as conn:
+            row = conn.execute("SELECT generation FROM sessions WHERE name = ?", (name,)).fetchone()
+            generation = (row[0] if row else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (name, state, generation, updated_at) VALUES (?, ?, ?, ?)",
+                (name, json.dumps(state), generation, time.time())
+            )
+        self.generations[(name, id(client))] = generation
+        return generation
+
+    def adopt(self, name, client, record):
+        """Apply a stored session state to the client (under its lock when it has one)"""
+        with getattr(client, 'lock', None) or nullcontext():
+            sessions = _client_sessions(client)
+            for key, stored in record["state"].get('sessions', {}).items():
+                session = sessions.get(key)
+                if session is None:
+                    continue
+                _load_cookies(session, stored['cookies'])
+                session.headers.update(stored['headers'])
+            for attr, value in record["state"].get('tokens', {}).items():
+                setattr(client, attr, value)
+        self.generations[(name, id(client))] = record["generation"]
+        print(f"Reusing shared {name} session (generation {record['generation']})")
+
+    def _login_and_save(self, name, client, login_fn):
+        success = login_fn()
+        if success:
+            self.save(name, client)
+        return success
+
+    def ensure_login(self, name, client, login_fn, check_fn=None):
+        """
+        Startup: reuse a fresh shared session, otherwise log in once for all
+        workers. An adopted session is probed with check_fn (the client's
+        check_login by default) and replaced by a new login if the upstream
+        no longer accepts it.
+        """
+        check_fn = check_fn or getattr(client, 'check_login', None)
+        with self._lock(name):
+            record = self.load(name)
+            if record and time.time() - record["updated_at"] < self.max_age:
+                self.adopt(name, client, record)
+                if check_fn is None or check_fn():
+                    return True
+                print(f"Shared {name} session was rejected by the upstream, logging in again")
+            return self._login_and_save(name, client, login_fn)
+
+    def relogin(self, name, client, login_fn, check_fn=None):
+        """
+        Session expired: if another worker already re-authenticated since this
+        client last synced, pick up its cookies (once check_fn, the client's
+        check_login by default, confirms them); otherwise log in and publish ours.
+        """
+        check_fn = check_fn or getattr(client, 'check_login', None)
+        known_generation = self.generations.get((name, id(client)), 0)
+        with self._lock(name):
+            record = self.load(name)
+            if record and record["generation"] > known_generation:
+                self.adopt(name, client, record)
+                if check_fn is None or check_fn():
+                    return True
+                print(f"Shared {name} session was rejected by the upstream, logging in again")
+            return self._login_and_save(name, client, login_fn)
@@ -0,0 +1,87 @@
+import json
+import os
+
+
+class CrmTenant:
+    """
+    One comunikcrm account: where it lives, how to log in and which campaign
+    group its exports cover. upstream names both its dispatcher pool and its
+    shared session; name is its cache namespace.
+    """
+    def __init__(self, name, base_url, account, campaign_group, upstream=None,
+                 username_env=None, password_env=None, default_username=None, default_password=None,
+                 form_model='-1', selected_qualifs=None, check_dashboard=False):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.account = account
+        self.campaign_group = campaign_group
+        self.upstream = upstream or name
+        self.username_env = username_env or f"{name.upper()}_USERNAME"
+        self.password_env = password_env or f"{name.upper()}_PASSWORD"
+        self.default_username = default_username
+        self.default_password = default_password
+        self.form_model = form_model
+        self.selected_qualifs = selected_qualifs
+        self.check_dashboard = check_dashboard
+
+    def credentials(self):
+        """(username, password) from the tenant's environment variables"""
+        return (
+            os.getenv(self.username_env, self.default_username),
+            os.getenv(self.password_env, self.default_password)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "account": self.account,
+            "campaign_group": self.campaign_group,
+            "upstream": self.upstream
+        }
+
+
+TENANTS = {}
+
+
+def register_tenant(tenant):
+    TENANTS[tenant.name] = tenant
+    return tenant
+
+
+register_tenant(CrmTenant(
+    "ringassur",
+    "https://ringassur.comunikcrm.info",
+    account="ringassur",
+    campaign_group="Prevoyance",
+    upstream="crm",
+    username_env="CRM_USERNAME",
+    password_env="CRM_PASSWORD",
+    selected_qualifs=['76', '523']
+))
+
+register_tenant(CrmTenant(
+    "formaexpert",
+    "https://formaexpert.comunikcrm.info",
+    account="formaexpert",
+    campaign_group="Energie_Rabat",
+    default_username="root",
+    default_password="P@ssW0rd@2024",
+    form_model=None,
+    check_dashboard=True
+))
+
+
+def _load_env_tenants():
+    """Extra tenants from CRM_TENANTS, a JSON list of CrmTenant keyword arguments"""
+    raw = os.getenv("CRM_TENANTS")
+    if not raw:
+        return
+    try:
+        for config in json.loads(raw):
+            register_tenant(CrmTenant(**config))
+    except Exception as e:
+        print(f"Error loading CRM_TENANTS: {str(e)}")
+
+
+_load_env_tenants()
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from cache import ResultCache, estimate_size
+
+
+def _key(name, end_date="2024-03-01 23:59:59"):
+    return ("data", "2024-03-01 00:00:00", end_date, name)
+
+
+def test_ttl_depends_on_range_end():
+    cache = ResultCache(past_ttl=3600, live_ttl=60)
+    today = datetime.now().strftime("%Y-%m-%d 23:59:59")
+    assert cache.ttl_for("2024-03-01 23:59:59") == 3600
+    assert cache.ttl_for(today) == 60
+    assert cache.ttl_for(None) == 60
+
+
+def test_expired_entries_are_dropped():
+    cache = ResultCache()
+    cache.set(_key("fresh"), [1, 2, 3])
+    cache.set(_key("stale"), [4, 5, 6], ttl=-1)
+
+    assert cache.peek(_key("fresh")) == [1, 2, 3]
+    assert cache.peek(_key("stale")) is None
+    assert cache.get(_key("stale")) is None
+    assert _key("stale") not in cache._entries
+    assert cache.bytes == estimate_size([1, 2, 3])
+    assert (cache.memory_hits, cache.misses) == (1, 1)
+
+
+def test_byte_budget_evicts_least_recently_used():
+    value = "x" * 1000
+    cache = ResultCache(max_bytes=estimate_size(value) * 2)
+    cache.set(_key("a"), value)
+    cache.set(_key("b"), value)
+    cache.get(_key("a"))
+    cache.set(_key("c"), value)
+
+    assert cache.peek(_key("b")) is None
+    assert cache.peek(_key("a")) == value
+    assert cache.peek(_key("c")) == value
+    assert cache.evictions == 1
+    assert cache.bytes <= cache.max_bytes
+
+    # Values larger than the whole budget are never kept in memory
+    cache.set(_key("big"), "x" * 5000)
+    assert cache.peek(_key("big")) is None
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    key = _key("a", (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d 23:59:59"))
+    ResultCache(disk_dir=str(tmp_path)).set(key, {"rows": [1, 2]})
+
+    cache = ResultCache(disk_dir=str(tmp_path))
+    assert cache.peek(key) is None
+    assert cache.get(key) == {"rows": [1, 2]}
+    assert cache.disk_hits == 1
+    assert cache.peek(key) == {"rows": [1, 2]}
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from planner import IntervalPlanner, plan_range
+
+
+def test_plan_range_days_keep_requested_bounds():
+    assert plan_range("2024-03-01 10:30:00", "2024-03-03 08:00:00", "day") == [
+        ("2024-03-01 10:30:00", "2024-03-01 23:59:59"),
+        ("2024-03-02 00:00:00", "2024-03-02 23:59:59"),
+        ("2024-03-03 00:00:00", "2024-03-03 08:00:00"),
+    ]
+
+
+def test_plan_range_hours():
+    assert plan_range("2024-03-01 22:15", "2024-03-02 00:10", "hour") == [
+        ("2024-03-01 22:15:00", "2024-03-01 22:59:59"),
+        ("2024-03-01 23:00:00", "2024-03-01 23:59:59"),
+        ("2024-03-02 00:00:00", "2024-03-02 00:10:00"),
+    ]
+
+
+def test_plan_range_single_shard_and_bad_input():
+    assert plan_range("2024-03-01", "2024-03-01 23:59:59", "day") == [
+        ("2024-03-01 00:00:00", "2024-03-01 23:59:59")
+    ]
+    assert plan_range("yesterday", "today", "day") == [("yesterday", "today")]
+    with pytest.raises(ValueError):
+        plan_range("2024-03-01", "2024-03-02", "week")
+
+
+def _planner(tmp_path, **kwargs):
+    return IntervalPlanner(path=str(tmp_path / "density.json"), **kwargs)
+
+
+def test_planner_never_crosses_midnight(tmp_path):
+    planner = _planner(tmp_path, target_rows=1000, max_window=6 * 3600)
+    start = datetime(2024, 3, 1, 22, 0)
+    assert planner.plan(start, datetime(2024, 3, 2, 3, 0)) == [
+        (start, datetime(2024, 3, 2)),
+        (datetime(2024, 3, 2), datetime(2024, 3, 2, 3, 0)),
+    ]
+
+
+def test_planner_respects_max_window(tmp_path):
+    planner = _planner(tmp_path, target_rows=1000, max_window=3600)
+    start = datetime(2024, 3, 1, 9, 0)
+    windows = planner.plan(start, start + timedelta(hours=3))
+    assert [end - begin for begin, end in windows] == [timedelta(hours=1)] * 3
+
+
+def test_planner_splits_dense_slots_down_to_min_window(tmp_path):
+    start = datetime(2024, 3, 1, 9, 0)
+    end = start + timedelta(minutes=15)
+
+    # 100 rows/minute over a quarter hour is 1500 rows: three windows of 500
+    planner = _planner(tmp_path, target_rows=500, min_window=60)
+    planner.observe(start, end, 1500)
+    assert [b - a for a, b in planner.plan(start, end)] == [timedelta(minutes=5)] * 3
+
+    # ... but never shorter than min_window
+    planner = _planner(tmp_path, target_rows=500, min_window=600)
+    planner.observe(start, end, 1500)
+    assert planner.plan(start, end) == [(start, start + timedelta(minutes=10)), (start + timedelta(minutes=10), end)]
+
+
+def test_planner_shares_densities_through_its_file(tmp_path):
+    start = datetime(2024, 3, 1, 9, 0)
+    first = _planner(tmp_path)
+    first.observe(start, start + timedelta(minutes=15), 300)
+    first.save()
+    assert _planner(tmp_path).expected_rows(start, start + timedelta(minutes=15)) == pytest.approx(300)
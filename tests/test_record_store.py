@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from record_store import RecordStore, _dedup
+
+
+def _frame(*rows):
+    return pd.DataFrame([{"CMK_S_FIELD_ID_UNIQUE": record_id, "ct_qualif": qualif} for record_id, qualif in rows])
+
+
+def _yesterday():
+    return (datetime.now() - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_dedup_keeps_last_row():
+    frame = _dedup(_frame(("a", "Rappel"), ("b", "Vente"), ("a", "Vente"), (None, "x"), (None, "y")))
+    assert frame.to_dict(orient="records") == [
+        {"CMK_S_FIELD_ID_UNIQUE": "b", "ct_qualif": "Vente"},
+        {"CMK_S_FIELD_ID_UNIQUE": "a", "ct_qualif": "Vente"},
+        {"CMK_S_FIELD_ID_UNIQUE": None, "ct_qualif": "x"},
+        {"CMK_S_FIELD_ID_UNIQUE": None, "ct_qualif": "y"},
+    ]
+
+
+def test_full_coverage_seals_and_compacts_closed_day(tmp_path):
+    store = RecordStore(root=str(tmp_path), namespace="test")
+    start = _yesterday()
+    day = start.strftime("%Y-%m-%d")
+
+    store.append(day, _frame(("a", "Rappel"), ("b", "Vente")))
+    store.mark_covered(start, start + timedelta(hours=12))
+    assert not store.is_sealed(day)
+
+    store.append(day, _frame(("a", "Vente")))
+    store.mark_covered(start + timedelta(hours=12), start + timedelta(days=1))
+    assert store.is_sealed(day)
+    assert len(store._parts(day)) == 1
+
+    records = store.read_day(day).set_index("CMK_S_FIELD_ID_UNIQUE")["ct_qualif"].to_dict()
+    assert records == {"a": "Vente", "b": "Vente"}
+
+
+def test_gaps_and_today_are_not_sealed(tmp_path):
+    store = RecordStore(root=str(tmp_path), namespace="test")
+    start = _yesterday()
+    store.mark_covered(start, start + timedelta(hours=10))
+    store.mark_covered(start + timedelta(hours=11), start + timedelta(days=1))
+    assert not store.is_sealed(start.strftime("%Y-%m-%d"))
+
+    today = start + timedelta(days=1)
+    store.mark_covered(today, today + timedelta(days=1))
+    assert not store.is_sealed(today.strftime("%Y-%m-%d"))
+
+
+def test_compact_rewrites_parts_as_one(tmp_path):
+    store = RecordStore(root=str(tmp_path), namespace="test")
+    day = _yesterday().strftime("%Y-%m-%d")
+    for qualif in ("Rappel", "Refus", "Vente"):
+        store.append(day, _frame(("a", qualif)))
+    assert len(store._parts(day)) == 3
+
+    assert store.compact(day)
+    assert not store.compact(day)
+    assert store.read_day(day).to_dict(orient="records") == [{"CMK_S_FIELD_ID_UNIQUE": "a", "ct_qualif": "Vente"}]
+
+
+def test_maintain_deletes_days_past_retention(tmp_path):
+    store = RecordStore(root=str(tmp_path), retention_days=30, namespace="test")
+    old_day = (datetime.now() - timedelta(days=40)).strftime("%Y-%m-%d")
+    recent_day = _yesterday().strftime("%Y-%m-%d")
+
+    # Days past the retention are never written...
+    store.append(old_day, _frame(("a", "Vente")))
+    assert store.days() == []
+
+    # ... and the ones left from before are deleted
+    os.makedirs(os.path.join(store.root, old_day))
+    store.write_day(recent_day, _frame(("b", "Vente")))
+    store.append(recent_day, _frame(("b", "Rappel")))
+    assert store.maintain() == {"compacted": 1, "deleted": 1}
+    assert store.days() == [recent_day]
@@ -0,0 +1,43 @@
+import pickle
+
+from records import RecordBatch
+
+
+def test_from_records_round_trip():
+    records = [{"id": "1", "agent": "Alice"}, {"id": "2", "qualif": "Vente"}]
+    batch = RecordBatch.from_records(records)
+    assert batch.columns == ("id", "agent", "qualif")
+    assert batch.to_records() == [
+        {"id": "1", "agent": "Alice", "qualif": None},
+        {"id": "2", "agent": None, "qualif": "Vente"},
+    ]
+    assert pickle.loads(pickle.dumps(batch)).to_records() == batch.to_records()
+
+
+def test_take_keeps_order_and_repeats():
+    batch = RecordBatch(("id", "agent"), [["1", "2", "3"], ["Alice", "Bob", "Alice"]])
+    assert batch.take([2, 0, 2]).to_records() == [
+        {"id": "3", "agent": "Alice"}, {"id": "1", "agent": "Alice"}, {"id": "3", "agent": "Alice"}
+    ]
+    assert len(batch.take([])) == 0
+
+
+def test_concat_fills_missing_columns():
+    first = RecordBatch(("id", "agent"), [["1"], ["Alice"]])
+    second = RecordBatch(("qualif", "id"), [["Vente", "Rappel"], ["2", "3"]])
+    merged = RecordBatch.concat([first, RecordBatch.empty(), second])
+    assert merged.columns == ("id", "agent", "qualif")
+    assert merged.to_records() == [
+        {"id": "1", "agent": "Alice", "qualif": None},
+        {"id": "2", "agent": None, "qualif": "Vente"},
+        {"id": "3", "agent": None, "qualif": "Rappel"},
+    ]
+    assert len(RecordBatch.concat([RecordBatch.empty()])) == 0
+
+
+def test_unique_skips_seen_and_empty_keys():
+    batch = RecordBatch(("id",), [["1", "", "2", "1", None]])
+    seen = {"2"}
+    assert batch.unique("id", seen).to_records() == [{"id": "1"}]
+    assert seen == {"1", "2"}
+    assert len(batch.unique("missing")) == 0
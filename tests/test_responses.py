@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import msgpack
+import numpy as np
+import pandas as pd
+
+from controllers import _daily_stats, _weekly_stats
+from responses import FastJSONResponse, MsgpackResponse, ndjson_response
+
+
+def _erp_payload():
+    """Same shape as ERPClient.get_contracts_as_json"""
+    stored_data = pd.DataFrame({
+        "Commercial": ["Alice", "Alice", "Bob"],
+        "Créer le": ["2024-03-01 10:00:00", "2024-03-09 11:30:00", "2024-04-02 09:15:00"],
+        "Montant": [120.5, np.nan, 80.0],
+    })
+    return {
+        "success": True,
+        "data": stored_data.to_dict(orient='records'),
+        "daily_stats": _daily_stats(stored_data),
+        "weekly_stats": _weekly_stats(stored_data),
+    }
+
+
+def test_erp_payload_json():
+    payload = json.loads(FastJSONResponse(_erp_payload()).body)
+    assert payload["weekly_stats"][0] == {
+        "Commercial": "Alice", "Month": "2024-03", "Relative Week Number": 1, "Weekly Sales": 1
+    }
+    assert payload["daily_stats"][0]["Créer le"] == "2024-03-01"
+    assert payload["data"][1]["Montant"] is None
+
+
+def test_erp_payload_msgpack():
+    payload = msgpack.unpackb(MsgpackResponse(_erp_payload()).body)
+    assert [stats["Month"] for stats in payload["weekly_stats"]] == ["2024-03", "2024-03", "2024-04"]
+
+
+def test_ndjson_stream_ends_with_error_line():
+    async def batches():
+        yield [{"id": "1"}]
+        raise Exception("Upstream 'crm' is busy")
+
+    async def collect():
+        response = await ndjson_response(batches())
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    lines = [json.loads(line) for line in asyncio.run(collect()).splitlines()]
+    assert lines == [{"id": "1"}, {"error": "Upstream 'crm' is busy"}]
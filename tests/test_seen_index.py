@@ -0,0 +1,33 @@
+from seen_index import SeenIndex
+
+
+def test_claim_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "seen.sqlite")
+    first, second = SeenIndex(path=path), SeenIndex(path=path)
+
+    assert first.claim(["a", "b", "b", ""]) == {"a", "b"}
+    # The second worker has never seen these ids in its Bloom filter
+    assert second.claim(["a", "b", "c"]) == {"c"}
+    assert first.claim(["c"]) == set()
+    assert second.metrics()["stored_ids"] == 3
+
+
+def test_release_makes_ids_claimable_again(tmp_path):
+    path = str(tmp_path / "seen.sqlite")
+    first, second = SeenIndex(path=path), SeenIndex(path=path)
+
+    assert first.claim([1, 2]) == {"1", "2"}
+    first.release([2])
+    # Still in the first instance's Bloom filter, but gone from SQLite
+    assert second.claim([1, 2]) == {"2"}
+    assert first.claim([2]) == set()
+
+
+def test_prune_forgets_ids_past_retention(tmp_path):
+    path = str(tmp_path / "seen.sqlite")
+    index = SeenIndex(path=path, retention=3600)
+    index.claim(["a"])
+
+    index.retention = -1
+    index.prune()
+    assert index.claim(["a"]) == {"a"}